@@ -0,0 +1 @@
+#marca a pasta como pacote de Python (python -m benchmarks.run)
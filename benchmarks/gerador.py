@@ -0,0 +1,42 @@
+#benchmarks/gerador.py
+#Gera conjuntos de dados sinteticos e deterministas (mesma semente = mesmos dados)
+import random
+from datetime import datetime, timedelta
+
+CATEGORIAS = ("supermercado", "restaurante", "transportes", "casa", "saude", "lazer", "salario", "outros")
+METODOS = ("MBWay", "cartao", "dinheiro", "transferencia")
+
+
+def gerar_movimentos(n, categorias=CATEGORIAS, inicio="2024-01-01", fim="2025-12-31", prop_receitas=0.1, seed=42):
+    """
+    Lista de n movimentos (dicts no formato do storage), por ordem cronológica e com ids 1..n.
+    As datas são distribuídas uniformemente entre `inicio` e `fim`.
+    """
+    rnd = random.Random(seed)
+    t0 = datetime.fromisoformat(inicio)
+    segundos = int((datetime.fromisoformat(fim) - t0).total_seconds())
+    instantes = sorted(rnd.randrange(segundos) for _ in range(n))
+    movimentos = []
+    for i, s in enumerate(instantes, start=1):
+        receita = rnd.random() < prop_receitas
+        movimentos.append({
+            "id": i,
+            "tipo": "receita" if receita else "despesa",
+            "data": (t0 + timedelta(seconds=s)).isoformat(timespec="seconds"),
+            "valor_cent": round((rnd.uniform(500, 2500) if receita else rnd.lognormvariate(3, 1) + 0.5) * 100),
+            "categoria": rnd.choice(categorias),
+            "descricao": f"movimento {i} {rnd.choice(('compras', 'jantar', 'renda', 'bilhete', 'farmacia'))}",
+            "metodo": rnd.choice(METODOS),
+        })
+    return movimentos
+
+
+def gerar_orcamentos(categorias=CATEGORIAS, seed=42):
+    """Um orçamento mensal ou semanal por categoria."""
+    rnd = random.Random(seed)
+    orcamentos = []
+    for i, cat in enumerate(categorias, start=1):
+        periodo = rnd.choice(("mensal", "semanal"))
+        limite = rnd.randint(200, 1500) if periodo == "mensal" else rnd.randint(50, 400)
+        orcamentos.append({"id": i, "categoria": cat, "limite_cent": limite * 100, "periodo": periodo})
+    return orcamentos
@@ -0,0 +1,108 @@
+#benchmarks/run.py
+#Mede as operacoes principais para varios tamanhos de dados e grava os tempos em JSON.
+#Exemplo: python -m benchmarks.run --tamanhos 1000 100000 --storage json journal
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from gestor.cli import STORAGES, classe_storage
+from gestor.models import Movimento
+from gestor.reports import Reports
+from gestor.service import FinanceService
+from .gerador import gerar_movimentos, gerar_orcamentos
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+def medir(funcao, repeticoes):
+    #Tempo (s) de cada execucao; devolve minimo, media e nº de repeticoes
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - t0)
+    return {"min": min(tempos), "media": sum(tempos) / len(tempos), "repeticoes": repeticoes}
+
+
+def correr(n, storage_nome, repeticoes, jobs=None):
+    """Cria um conjunto de n movimentos num diretório temporário e mede cada operação."""
+    base = tempfile.mkdtemp(prefix="gestor-bench-")
+    try:
+        movimentos = gerar_movimentos(n)
+        storage = classe_storage(storage_nome)(base)
+        storage.guardar_movimentos(movimentos)
+        storage.guardar_orcamentos(gerar_orcamentos())
+        s = FinanceService(storage)
+        r = Reports(storage, usar_rollups=False)
+        meio = movimentos[len(movimentos) // 2]["data"][:7]
+        inicio, fim = f"{meio}-01", f"{meio}-28T23:59:59"
+        despesa = Movimento.from_dict(next(m for m in reversed(movimentos) if m["tipo"] == "despesa"))
+
+        ops = {
+            "storage.carregar_movimentos": lambda: storage.carregar_movimentos(),
+            "service.listar_filtrado": lambda: s.listar_filtrado(inicio=inicio, fim=fim, cat="supermercado"),
+            "service.verificar_overspend_completo": lambda: s.verificar_overspend_completo(despesa),
+            "reports.totais_por_cat": lambda: r.totais_por_cat(),
+            "reports.cashflow_semanal": lambda: r.cashflow_semanal(),
+            "reports.top_categorias": lambda: r.top_categorias(),
+            "reports.alertas": lambda: r.alertas(),
+            "reports.todos": lambda: r.todos(),
+        }
+        if jobs and jobs > 1 and hasattr(storage, "iter_meses"):
+            # --jobs só divide o trabalho no particionado (cada processo lê os seus meses); comparar com reports.todos
+            r_jobs = Reports(storage, usar_rollups=False, jobs=jobs)
+            ops[f"reports.todos[jobs={jobs}]"] = lambda: r_jobs.todos()
+        res = {nome: medir(f, repeticoes) for nome, f in ops.items()}
+
+        # com índices/rollups construídos (caminho normal depois do primeiro add-mov)
+        res["service.reconstruir_indices"] = medir(s.reconstruir_indices, 1)
+        res["service.verificar_overspend"] = medir(lambda: s.verificar_overspend(despesa), repeticoes)
+        r_rollups = Reports(storage)
+        res["reports.todos[rollups]"] = medir(lambda: r_rollups.todos(inicio=inicio, fim=fim), repeticoes)
+        data = movimentos[-1]["data"]
+        res["service.add_movimento"] = medir(lambda: s.add_movimento("despesa", 999, "supermercado", data_iso=data), repeticoes)
+        return res
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="Benchmarks do Gestor de Despesas")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--storage", nargs="+", choices=sorted(STORAGES), default=["json"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=max(2, os.cpu_count() or 1),
+                        help="Processos para reports.todos[jobs=N] (só no storage particionado)")
+    parser.add_argument("--saida", help="Ficheiro JSON de resultados (por omissão benchmarks/resultados/<data>.json)")
+    args = parser.parse_args(argv)
+
+    resultados = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "resultados": [],
+    }
+    for storage_nome in args.storage:
+        for n in args.tamanhos:
+            print(f"[{storage_nome}] {n} movimentos...", flush=True)
+            tempos = correr(n, storage_nome, args.repeticoes, args.jobs)
+            for nome, t in tempos.items():
+                print(f"  {nome:40} {t['min'] * 1000:10.2f} ms")
+            resultados["resultados"].append({"storage": storage_nome, "n": n, "operacoes": tempos})
+
+    saida = args.saida or os.path.join(RESULTADOS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados: {saida}")
+
+
+if __name__ == "__main__":
+    main()
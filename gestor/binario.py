@@ -0,0 +1,226 @@
+#gestor/binario.py
+#Snapshot binario dos movimentos (data/movimentos.bin): colunas de tamanho fixo + tabela de strings,
+#lido com mmap. Arranque sem fazer parse de JSON; o movimentos.json continua a ser gravado para intercambio.
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from .models import MovimentoTable, FormatoAntigo
+from .storage import Storage, JournalStorage, escrever_atomico
+from . import perfil
+
+MAGIA = b"GSTB"
+VERSAO = 2  # 2: valores em cêntimos (int64)
+
+# magia, versão, nº de movimentos; depois, por secção, (posição, tamanho em bytes)
+CABECALHO = struct.Struct("<4sIq")
+SECCAO = struct.Struct("<qq")
+
+# secções pela ordem em que são gravadas, com o tipo dos elementos (códigos de array/memoryview)
+#  - ids/valores/despesa/cat/mes/semana: as colunas numéricas da MovimentoTable
+#  - datas/descricoes/metodos: códigos para a tabela de strings (offsets + textos em UTF-8)
+#  - meta: JSON com as listas de categorias e chaves (mês/semana) a que cat/mes/semana se referem
+SECCOES = (
+    ("ids", "q"), ("valores", "q"), ("despesa", "b"), ("cat", "i"), ("mes", "i"), ("semana", "i"),
+    ("datas", "i"), ("descricoes", "i"), ("metodos", "i"),
+    ("offsets", "q"), ("textos", "B"), ("meta", "B"),
+)
+
+_LITTLE = sys.byteorder == "little"
+
+
+def escrever_snapshot(path, movimentos, sincronizar=True):
+    """Grava `movimentos` (dicts no formato do storage) em `path`, de forma atómica."""
+    tab = MovimentoTable.from_dicts(movimentos)
+    textos = {}
+    codigos = {}
+    for nome in ("datas", "descricoes", "metodos"):
+        codigos[nome] = array("i", [textos.setdefault(s, len(textos)) for s in getattr(tab, nome)])
+    codificados = [s.encode("utf-8") for s in textos]
+    seccoes = {
+        "ids": tab.ids, "valores": tab.valores, "despesa": tab.despesa,
+        "cat": array("i", tab.cat), "mes": array("i", tab.mes), "semana": array("i", tab.semana),
+        **codigos,
+        "offsets": array("q", accumulate((len(b) for b in codificados), initial=0)),
+        "textos": b"".join(codificados),
+        "meta": json.dumps({"categorias": tab.categorias, "chaves": tab.chaves}, ensure_ascii=False).encode("utf-8"),
+    }
+    blocos = []
+    for nome, tipo in SECCOES:
+        dados = seccoes[nome]
+        if isinstance(dados, array):
+            if not _LITTLE:
+                dados = array(dados.typecode, dados)
+                dados.byteswap()
+            dados = dados.tobytes()
+        blocos.append(dados)
+
+    def escrever(f):
+        pos = CABECALHO.size + SECCAO.size * len(SECCOES)
+        indice = []
+        for b in blocos:
+            pos += -pos % 8  # secções alinhadas a 8 bytes
+            indice.append((pos, len(b)))
+            pos += len(b)
+        f.write(CABECALHO.pack(MAGIA, VERSAO, len(tab)))
+        for p, n in indice:
+            f.write(SECCAO.pack(p, n))
+        escrito = CABECALHO.size + SECCAO.size * len(SECCOES)
+        for (p, n), b in zip(indice, blocos):
+            f.write(b"\0" * (p - escrito))
+            f.write(b)
+            escrito = p + n
+
+    escrever_atomico(path, escrever, binario=True, sincronizar=sincronizar)
+
+
+class ColunaTexto:
+    """
+    Coluna de strings sobre o snapshot (códigos para a tabela de strings), descodificada só
+    quando é lida. Aceita append/extend (os valores novos ficam numa lista à parte).
+    """
+
+    __slots__ = ("snapshot", "codigos", "extra")
+
+    def __init__(self, snapshot, codigos):
+        self.snapshot = snapshot
+        self.codigos = codigos
+        self.extra = []
+
+    def __len__(self):
+        return len(self.codigos) + len(self.extra)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self.codigos)
+        if i < 0:
+            i += len(self)
+        if i >= n:
+            return self.extra[i - n]
+        return self.snapshot.textos[self.codigos[i]]
+
+    def __iter__(self):
+        textos = self.snapshot.textos
+        for c in self.codigos:
+            yield textos[c]
+        yield from self.extra
+
+    def append(self, valor):
+        self.extra.append(valor)
+
+    def extend(self, valores):
+        self.extra.extend(valores)
+
+
+class SnapshotBinario:
+    """Leitura de um ficheiro gravado por escrever_snapshot, mapeado em memória (mmap)."""
+
+    def __init__(self, path):
+        perfil.ficheiro_lido(path)
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mv = memoryview(self._mm)
+        magia, versao, self.n = CABECALHO.unpack_from(mv, 0)
+        if magia != MAGIA or versao != VERSAO:
+            raise ValueError(f"Snapshot binário inválido ou de outra versão: {path} (uma versão antiga é convertida com 'migrar')")
+        self.colunas = {}
+        for k, (nome, tipo) in enumerate(SECCOES):
+            pos, tamanho = SECCAO.unpack_from(mv, CABECALHO.size + k * SECCAO.size)
+            col = mv[pos:pos + tamanho]
+            if tipo != "B":
+                if _LITTLE:
+                    col = col.cast(tipo)  # sem cópia: lido diretamente do ficheiro mapeado
+                else:
+                    col = array(tipo, col.tobytes())
+                    col.byteswap()
+            self.colunas[nome] = col
+        meta = json.loads(bytes(self.colunas["meta"]).decode("utf-8"))
+        self.categorias, self.chaves = meta["categorias"], meta["chaves"]
+        self._textos = None
+
+    @property
+    def textos(self):
+        # tabela de strings descodificada uma vez, só quando alguma string é precisa
+        if self._textos is None:
+            blob = bytes(self.colunas["textos"])
+            offsets = self.colunas["offsets"]
+            self._textos = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        return self._textos
+
+    def tabela(self):
+        c = self.colunas
+        colunas = {nome: c[nome] for nome in ("ids", "valores", "despesa", "cat", "mes", "semana")}
+        for nome in ("datas", "descricoes", "metodos"):
+            colunas[nome] = ColunaTexto(self, c[nome])
+        return MovimentoTable.de_colunas(colunas, self.categorias, self.chaves)
+
+    def dicts(self):
+        """Gerador com os movimentos no formato do storage."""
+        c, textos, categorias = self.colunas, self.textos, self.categorias
+        for i, desp, d, v, cat, desc, met in zip(c["ids"], c["despesa"], c["datas"], c["valores"], c["cat"],
+                                                 c["descricoes"], c["metodos"]):
+            yield {"id": i, "tipo": "despesa" if desp else "receita", "data": textos[d], "valor_cent": v,
+                   "categoria": categorias[cat], "descricao": textos[desc], "metodo": textos[met]}
+
+
+class BinarioStorage(JournalStorage):
+    """
+    Como o JournalStorage (diário append-only + snapshot), mas o snapshot é data/movimentos.bin
+    (ver escrever_snapshot), lido com mmap: as colunas numéricas da tabela são usadas sem cópia.
+
+    O movimentos.json continua a ser gravado a cada compactação, como formato de intercâmbio
+    (é o que os outros storages leem). Na primeira utilização o .bin é criado a partir dele
+    (com os dados ainda em euros, só depois de migrar_centimos).
+    """
+
+    def __init__(self, base_dir, limite_diario=None):
+        super().__init__(base_dir, limite_diario)
+        self.bin_path = os.path.join(self.base_dir, "movimentos.bin")
+        if not os.path.exists(self.bin_path):
+            with self.bloqueio():
+                if not os.path.exists(self.bin_path):
+                    try:
+                        escrever_snapshot(self.bin_path, Storage.carregar_movimentos(self))
+                    except FormatoAntigo:
+                        pass
+
+    def _snapshot(self):
+        try:
+            return SnapshotBinario(self.bin_path)
+        except FileNotFoundError:  # não foi criado no __init__: o movimentos.json ainda está em euros
+            raise FormatoAntigo(f"{self.bin_path} por criar: execute 'migrar' para converter os dados para cêntimos.") from None
+
+    def ficheiros_dados(self):
+        return [self.bin_path, self.diario_path, self.orcamentos_path]
+
+    def _movimentos_a_migrar(self):
+        # o .bin pode ser de uma versão antiga: o movimentos.json (intercâmbio) tem o mesmo conteúdo
+        return Storage.carregar_movimentos(self) + self._carregar_diario()
+
+    def _carregar_snapshot(self):
+        return list(self._snapshot().dicts())
+
+    def _guardar_snapshot(self, movimentos_lista):
+        escrever_snapshot(self.bin_path, movimentos_lista)
+        JournalStorage._guardar_snapshot(self, movimentos_lista)  # intercâmbio
+
+    def iter_movimentos(self, inicio=None, fim=None):
+        # o mmap do .bin e o diário são obtidos sob o bloqueio (ver JournalStorage.iter_movimentos)
+        with self.bloqueio():
+            snapshot = self._snapshot()
+            diario = self._carregar_diario()
+        yield from snapshot.dicts()
+        yield from diario
+
+    def carregar_tabela(self):
+        with self.bloqueio():
+            snapshot = self._snapshot()
+            diario = self._carregar_diario()
+        tab = snapshot.tabela()
+        if diario:
+            tab.extend(diario)
+        return tab
@@ -0,0 +1,72 @@
+#gestor/cache.py
+#Cache persistente de resultados (data/cache/): usado pelos Reports para nao recalcular um relatorio
+#enquanto os dados nao mudarem (a chave inclui Storage.versao_dados) e para nao regravar exportacoes iguais.
+import hashlib
+import json
+import os
+from .storage import escrever_json
+
+
+class CacheResultados:
+    """
+    Um ficheiro JSON por entrada, data/cache/<sha1 da chave>.json, com a chave e o valor.
+    A chave é qualquer valor JSON (ex.: ["relatorio", versão dos dados, tipo, parâmetros]).
+
+    LRU limitado: cada acerto atualiza a data de modificação do ficheiro e, ao gravar, as entradas
+    usadas há mais tempo são apagadas até ficarem no máximo `max_entradas` e `max_bytes`.
+    Entradas de versões antigas dos dados deixam de ser usadas e saem assim.
+    """
+
+    def __init__(self, base_dir, max_entradas=256, max_bytes=16 << 20):
+        self.pasta = os.path.join(base_dir, "cache")
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _texto(chave):
+        return json.dumps(chave, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+    def _path(self, texto):
+        return os.path.join(self.pasta, hashlib.sha1(texto.encode("utf-8")).hexdigest() + ".json")
+
+    def obter(self, chave, padrao=None):
+        texto = self._texto(chave)
+        path = self._path(texto)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entrada = json.load(f)
+            if self._texto(entrada["chave"]) != texto:
+                return padrao
+            os.utime(path)  # usada agora (LRU)
+        except (OSError, ValueError, KeyError, TypeError):
+            return padrao  # não existe, apagada entretanto por outro processo ou corrompida
+        return entrada["valor"]
+
+    def guardar(self, chave, valor):
+        os.makedirs(self.pasta, exist_ok=True)
+        escrever_json(self._path(self._texto(chave)), {"chave": chave, "valor": valor}, indent=None, sincronizar=False)
+        self._limitar()
+
+    def _entradas(self):
+        try:
+            return [n for n in os.listdir(self.pasta) if n.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _limitar(self):
+        entradas = []
+        for nome in self._entradas():
+            try:
+                st = os.stat(os.path.join(self.pasta, nome))
+            except FileNotFoundError:
+                continue
+            entradas.append((st.st_mtime_ns, st.st_size, nome))
+        entradas.sort(reverse=True)  # mais recentes primeiro
+        total = 0
+        for i, (_, tamanho, nome) in enumerate(entradas):
+            total += tamanho
+            if i >= self.max_entradas or total > self.max_bytes:
+                try:
+                    os.remove(os.path.join(self.pasta, nome))
+                except FileNotFoundError:
+                    pass
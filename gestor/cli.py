@@ -1,80 +1,175 @@
 #gestor/cli.py
 #Ler comandos e argumentos no terminal e realizar os pedidos
-import os, argparse
-from .storage import Storage
-from .service import FinanceService
-from .models import TipoMovimento, Movimento
-from .reports import Reports
+#Cada comando importa so o que usa (storage, service, reports, ...): o arranque de um comando
+#simples nao paga o import de asyncio, multiprocessing, sqlite3, csv, etc.
+import os, sys, argparse
+from importlib import import_module
+from .cliente import encaminhar
 
-BASE_DATA=os.path.join(os.path.dirname(os.path.dirname(__file__)),'data')
+BASE_DATA=os.environ.get('GESTOR_DATA') or os.path.join(os.path.dirname(os.path.dirname(__file__)),'data')
+
+# GESTOR_STORAGE escolhe o armazenamento: 'json' (padrão, ficheiro único), 'journal' (append-only),
+# 'particionado' (um ficheiro por mês), 'sqlite' ou 'binario' (journal com snapshot binário, mmap)
+# (nome -> 'módulo:Classe', importado só quando é usado)
+STORAGES = {
+    'json': 'gestor.storage:Storage',
+    'journal': 'gestor.storage:JournalStorage',
+    'particionado': 'gestor.storage:ParticionadoStorage',
+    'sqlite': 'gestor.sqlite_storage:SqliteStorage',
+    'binario': 'gestor.binario:BinarioStorage',
+}
+
+def classe_storage(nome):
+    if nome not in STORAGES:
+        raise ValueError(f"Storage inválido: '{nome}'. Opções: {', '.join(STORAGES)}.")
+    modulo, classe = STORAGES[nome].split(':')
+    return getattr(import_module(modulo), classe)
+
+def build_storage():
+    nome = (os.environ.get('GESTOR_STORAGE') or 'json').lower()
+    return classe_storage(nome)(BASE_DATA)
+
+# no modo servidor (gestor serve) todos os comandos usam o mesmo serviço, com os dados em memória
+_SERVICO_ATIVO = None
 
 def build_service():
-    return FinanceService(Storage(BASE_DATA))
+    if _SERVICO_ATIVO is not None:
+        return _SERVICO_ATIVO
+    from .service import FinanceService
+    return FinanceService(build_storage())
+
+# valores: em cêntimos (int) a partir daqui; os argumentos em euros são convertidos pelo argparse
+def valor_euros(texto):
+    from .models import centimos
+    return centimos(texto.replace(",", "."))
+
+def _alerta_texto(alerta):
+    from .models import euros
+    return (f"Orçamento EXCEDIDO em {alerta['referencia']} para '{alerta['categoria']}' "
+            f"(limite {euros(alerta['limite'])}, gasto {euros(alerta['gasto'])}, excesso {euros(alerta['excesso'])})")
+
+def _linha_texto(linha):
+    # linha de um relatório, com os valores em euros: {'categoria': 'casa', 'despesa': 12.50, ...}
+    from decimal import Decimal
+    from .reports import em_euros
+    return "{" + ", ".join(f"{k!r}: {v if isinstance(v, Decimal) else repr(v)}" for k, v in em_euros(linha).items()) + "}"
 
 # --------- comandos movimentos ---------
 def cmd_add_mov(args):
+    from .models import TipoMovimento, euros
     s=build_service()
     mov, alerta =s.add_movimento(
         tipo=(TipoMovimento(args.tipo) if args.tipo in ("despesa", "receita") else TipoMovimento("despesa")),
-        valor=args.valor,
+        valor_cent=args.valor,
         categoria=args.cat,
         descricao=args.desc or "",
         metodo_pagamento=args.metodo or "",
         data_iso=None
     )
-    print(f"Criado movimento #{mov.id}: {mov.tipo.value} {mov.valor:.2f} [{mov.categoria}] em {mov.data_iso}")
+    print(f"Criado movimento #{mov.id}: {mov.tipo.value} {euros(mov.valor_cent)} [{mov.categoria}] em {mov.data_iso}")
     if alerta:
-        print(f"Orçamento EXCEDIDO em {alerta['referencia']} para '{alerta['categoria']}' "
-              f"(limite {alerta['limite']:.2f}, gasto {alerta['gasto']:.2f}, excesso {alerta['excesso']:.2f})")
+        print(_alerta_texto(alerta))
 
 def cmd_list_mov(args):
+    from .models import euros
     s=build_service()
-    if args.inicio or args.fim or args.cat or args.tipo or args.texto:
-        movimentos = s.listar_filtrado(
+    if args.relevancia:
+        if not args.texto:
+            raise ValueError("--relevancia exige --texto.")
+        movimentos = (m for _, m in s.pesquisar(args.texto, inicio=args.inicio, fim=args.fim, cat=args.cat, tipo=args.tipo))
+    else:
+        # gerador: cada movimento é impresso logo que é lido
+        movimentos = s.iter_filtrado(
             inicio=args.inicio, fim=args.fim, cat=args.cat, tipo=args.tipo, texto=args.texto
         )
-    else:
-        movimentos = s.listar()
 
-    if not movimentos:
-        print("Sem movimentos registados.")
+    if args.exportar:
+        from .reports import Reports
+        # exportação em streaming: os movimentos vão para o ficheiro à medida que são lidos
+        path = Reports(s.storage).exportar((m.to_dict() for m in movimentos), tipo_rel="movimentos",
+                                           formato=args.exportar, comprimir=args.gzip)
+        print(f"Ficheiro exportado: {path}")
         return
+
+    vazio = True
     for m in movimentos:
-        print(f"#{m.id} {m.data_iso} | {m.tipo.value.upper():7} | {m.valor:8.2f} | {m.categoria} | {m.metodo_pagamento} | {m.descricao}")
+        vazio = False
+        print(f"#{m.id} {m.data_iso} | {m.tipo.value.upper():7} | {euros(m.valor_cent):>8} | {m.categoria} | {m.metodo_pagamento} | {m.descricao}")
+    if vazio:
+        print("Sem movimentos registados.")
+
+def cmd_import_mov(args):
+    from .importador import ler_extrato
+    s = build_service()
+    registos = ler_extrato(args.ficheiro, formato=args.formato, categoria_padrao=args.cat)
+    movs, alertas = s.add_movimentos_bulk(registos)
+    if not movs:
+        print("Nenhum movimento importado.")
+        return
+    print(f"Importados {len(movs)} movimentos (#{movs[0].id} a #{movs[-1].id}).")
+    for alerta in alertas:
+        print(_alerta_texto(alerta))
 
 # --------- comandos orçamentos ---------
 def cmd_add_orc(args):
+    from .models import euros
     s = build_service()
-    orc, status = s.add_orcamento(categoria=args.cat, limite=args.limite, periodo=args.periodo or "mensal")
-    print(f"Orçamento {status}: #{orc.id} {orc.categoria} (periodo={orc.periodo}, limite={orc.limite:.2f})")
+    orc, status = s.add_orcamento(categoria=args.cat, limite_cent=args.limite, periodo=args.periodo or "mensal")
+    print(f"Orçamento {status}: #{orc.id} {orc.categoria} (periodo={orc.periodo}, limite={euros(orc.limite_cent)})")
 
 def cmd_list_orc(args):
+    from .models import euros
     s = build_service()
     orcs = s.listar_orcamentos(periodo=args.periodo)
     if not orcs:
         print("Sem orçamentos.")
         return
     for o in orcs:
-        print(f"#{o.id} {o.categoria} | período={o.periodo} | limite={o.limite:.2f}")
+        print(f"#{o.id} {o.categoria} | período={o.periodo} | limite={euros(o.limite_cent)}")
 
 # --------- comandos relatorios ---------
 def cmd_relatorio(args):
+    from .reports import Reports
     s = build_service()
-    r = Reports(s.storage)
+    r = Reports(s.storage, jobs=args.jobs, cache=not args.sem_cache)
 
     tipo = args.tipo
     inicio = args.inicio
     fim = args.fim
     saida = (args.saida or 'json').lower()
-    if saida not in ('json', 'csv'):
-        raise ValueError("Formato de saída inválido. Use 'json' ou 'csv'.")
+    if saida not in ('json', 'csv', 'ndjson'):
+        raise ValueError("Formato de saída inválido. Use 'json', 'ndjson' ou 'csv'.")
     
+    if args.desde_checkpoint:
+        if tipo != "alertas":
+            raise ValueError("--desde-checkpoint só se aplica a --tipo alertas.")
+        if inicio or fim:
+            raise ValueError("--desde-checkpoint não aceita --inicio/--fim (considera todos os movimentos).")
+
+    if tipo == "all":
+        # todos os relatórios numa só passagem pelos movimentos
+        resultados = r.todos(inicio=inicio, fim=fim, n=args.top or 5, tipo=args.mov_tipo or "despesa")
+        for nome, dados in resultados.items():
+            print(f"== {nome} ==")
+            if not dados:
+                print("Relatório vazio.")
+            for linha in dados:
+                print(_linha_texto(linha))
+        paths = r.exportar_todos(resultados, formato=saida, comprimir=args.gzip)
+        print("\nFicheiros exportados:")
+        for path in paths.values():
+            print(path)
+        return
+
     if tipo == "totais-por-cat":
         dados = r.totais_por_cat(inicio=inicio, fim=fim)
     elif tipo == "cashflow-semanal":
         dados = r.cashflow_semanal(inicio=inicio, fim=fim)
     elif tipo == "top-categorias":
         dados = r.top_categorias(n=args.top or 5, tipo=args.mov_tipo or "despesa", inicio=inicio, fim=fim)
+    elif tipo == "alertas" and args.desde_checkpoint:
+        # só os alertas novos ou alterados desde a última execução com --desde-checkpoint
+        dados = r.alertas_desde_checkpoint()
     elif tipo == "alertas":
         dados = r.alertas(inicio=inicio, fim=fim)
     else:
@@ -85,20 +180,77 @@ def cmd_relatorio(args):
         print("Relatório vazio.")
     else:
         for linha in dados:
-            print(linha)
+            print(_linha_texto(linha))
 
-    path = r.exportar(dados, tipo_rel=tipo, formato=saida)
+    path = r.exportar(dados, tipo_rel=tipo, formato=saida, comprimir=args.gzip)
     print(f"\nFicheiro exportado: {path}")
 
+def cmd_total(args):
+    from .models import euros
+    s = build_service()
+    total = s.total_periodo(inicio=args.inicio, fim=args.fim, cat=args.cat, tipo=args.tipo)
+    print(f"Total de {args.tipo}" + (f" em '{args.cat}'" if args.cat else "") + f": {euros(total)}")
+
+# --------- comandos índices ---------
+def cmd_reindexar(args):
+    s = build_service()
+    if args.verificar:
+        movimentos = s.storage.carregar_movimentos()
+        for nome, indice in s.indices().items():
+            ok = indice.verificar(movimentos)
+            print(f"Índice '{nome}': " + ("coerente." if ok else "DESATUALIZADO (use reindexar)."))
+        return
+    s.reconstruir_indices()
+    print(f"Índices reconstruídos (até ao movimento #{s.indice_gastos().ultimo_id}).")
+
+def cmd_migrar(args):
+    # dados gravados em euros -> cêntimos; os índices (somas em euros) são reconstruídos
+    from .service import FinanceService
+    storage = build_storage()
+    n = storage.migrar_centimos()
+    s = FinanceService(storage)
+    s.reconstruir_indices()
+    print(f"Registos convertidos para cêntimos: {n}. Índices reconstruídos.")
+
+# --------- servidor ---------
+def cmd_serve(args):
+    import asyncio
+    from .service import FinanceService
+    from .servidor import MemoriaStorage, Servidor
+    global _SERVICO_ATIVO
+    _SERVICO_ATIVO = FinanceService(MemoriaStorage(build_storage()))
+    try:
+        servidor = Servidor(_SERVICO_ATIVO, lambda argv: main(argv, encaminhar_servidor=False),
+                            porta=args.porta, atraso_escrita=args.atraso_escrita)
+        asyncio.run(servidor.correr())
+    finally:
+        _SERVICO_ATIVO = None
+
 # --------- MAIN ---------
-def main(argv=None):
+def main(argv=None, encaminhar_servidor=True):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # se houver um servidor a correr (gestor serve), o comando é executado lá
+    # (serve e migrar correm sempre localmente: migrar regrava os ficheiros, que o servidor relê a seguir)
+    if encaminhar_servidor and argv[:1] not in (['serve'], ['migrar']) and not os.environ.get('GESTOR_SEM_SERVIDOR'):
+        resposta = encaminhar(BASE_DATA, argv)
+        if resposta is not None:
+            saida, erro, codigo = resposta
+            print(saida, end='')
+            if erro:
+                print(erro, end='', file=sys.stderr)
+            if codigo:
+                sys.exit(codigo)
+            return
+
     parser = argparse.ArgumentParser(prog='finance', description='Gestor de Despesas e Orçamentos')
+    parser.add_argument('--profile', action='store_true', help="Mostrar no fim (stderr) o tempo de cada operação e os contadores")
+    parser.add_argument('--profile-json', metavar='FICHEIRO', help="Gravar o perfil como trace JSON (chrome://tracing, Perfetto)")
     sub=parser.add_subparsers(required=True)
 
     # add-mov
     p_add=sub.add_parser("add-mov", help="Adicionar novo movimento")
     p_add.add_argument("--tipo", choices=["despesa", "receita"], required=True)
-    p_add.add_argument("--valor", type=float, required=True)
+    p_add.add_argument("--valor", type=valor_euros, required=True, help="Valor em euros (ex.: 12.50)")
     p_add.add_argument("--cat", required=True, help="Categoria")
     p_add.add_argument("--desc", help="Descrição")
     p_add.add_argument("--metodo", help="Método de pagamento (ex.: MBWay, cartao, dinheiro)")
@@ -110,13 +262,23 @@ def main(argv=None):
     p_list.add_argument('--fim', help="ISO final (ex: 2025-08-31T23:59:59)")
     p_list.add_argument('--cat', help="Categoria")
     p_list.add_argument('--tipo', choices=['despesa','receita'])
-    p_list.add_argument('--texto', help="Texto a procurar na descrição")
+    p_list.add_argument('--texto', help="Texto a procurar na descrição, categoria ou método de pagamento")
+    p_list.add_argument('--relevancia', action='store_true', help="Ordenar os resultados de --texto por relevância")
+    p_list.add_argument('--exportar', choices=['json','ndjson','csv'], help="Gravar os movimentos num ficheiro em vez de os mostrar")
+    p_list.add_argument('--gzip', action='store_true', help="Comprimir o ficheiro exportado")
     p_list.set_defaults(func=cmd_list_mov)
 
+    # import-mov
+    p_imp = sub.add_parser("import-mov", help="Importar movimentos de um extrato (CSV ou OFX)")
+    p_imp.add_argument("--ficheiro", required=True, help="Caminho do extrato")
+    p_imp.add_argument("--formato", choices=["csv", "ofx"], help="Por omissão, deduzido da extensão")
+    p_imp.add_argument("--cat", help="Categoria para linhas sem categoria (OFX: 'importado')")
+    p_imp.set_defaults(func=cmd_import_mov)
+
      # add-orc
     p_aorc = sub.add_parser('add-orc', help="Criar/atualizar orçamento por categoria")
     p_aorc.add_argument('--cat', required=True)
-    p_aorc.add_argument('--limite', type=float, required=True)
+    p_aorc.add_argument('--limite', type=valor_euros, required=True, help="Limite em euros")
     p_aorc.add_argument('--periodo', choices=["mensal","semanal"], default="mensal")
     p_aorc.set_defaults(func=cmd_add_orc)
 
@@ -127,17 +289,57 @@ def main(argv=None):
 
     # --- relatorio ---
     p_rep = sub.add_parser('relatorio', help="Gerar relatórios e exportar para CSV/JSON")
-    p_rep.add_argument('--tipo', required=True, choices=['totais-por-cat','cashflow-semanal','top-categorias','alertas'])
+    p_rep.add_argument('--tipo', required=True, choices=['totais-por-cat','cashflow-semanal','top-categorias','alertas','all'])
     p_rep.add_argument('--inicio', help="ISO inicial (ex: 2025-08-01)")
     p_rep.add_argument('--fim', help="ISO final (ex: 2025-08-31T23:59:59)")
-    p_rep.add_argument('--saida', choices=['json','csv'], default='json')
+    p_rep.add_argument('--saida', choices=['json','ndjson','csv'], default='json')
+    p_rep.add_argument('--gzip', action='store_true', help="Comprimir os ficheiros exportados")
     # específicos do top-categorias:
     p_rep.add_argument('--top', type=int, help="Top N categorias (apenas para top-categorias)")
     p_rep.add_argument('--mov-tipo', choices=['despesa','receita'], help="Tipo de movimento para top-categorias")
+    p_rep.add_argument('--jobs', type=int, default=1, help="Nº de processos para somar os movimentos (padrão: 1)")
+    p_rep.add_argument('--sem-cache', action='store_true', help="Recalcular sempre (não usar nem guardar resultados em data/cache/)")
+    p_rep.add_argument('--desde-checkpoint', action='store_true',
+                       help="Alertas: só os novos ou alterados desde a última execução (lê só os movimentos novos)")
     p_rep.set_defaults(func=cmd_relatorio)
 
+    # --- total ---
+    p_tot = sub.add_parser('total', help="Total de despesas/receitas num intervalo de datas (por categoria ou geral)")
+    p_tot.add_argument('--inicio', help="ISO inicial (ex: 2025-08-01)")
+    p_tot.add_argument('--fim', help="ISO final (ex: 2025-08-31T23:59:59)")
+    p_tot.add_argument('--cat', help="Categoria (por omissão, todas)")
+    p_tot.add_argument('--tipo', choices=['despesa','receita'], default='despesa')
+    p_tot.set_defaults(func=cmd_total)
+
+    # --- reindexar ---
+    p_idx = sub.add_parser('reindexar', help="Reconstruir os índices auxiliares (gastos, rollups e pesquisa por texto)")
+    p_idx.add_argument('--verificar', action='store_true', help="Apenas comparar o índice com um recálculo completo")
+    p_idx.set_defaults(func=cmd_reindexar)
+
+    # --- migrar ---
+    p_mig = sub.add_parser('migrar', help="Converter dados gravados em euros (versões anteriores) para cêntimos")
+    p_mig.set_defaults(func=cmd_migrar)
+
+    # --- serve ---
+    p_srv = sub.add_parser('serve', help="Manter os dados em memória e atender os comandos da CLI por socket local")
+    p_srv.add_argument('--porta', type=int, default=0, help="Porta TCP em 127.0.0.1 (0 = escolhida pelo sistema)")
+    p_srv.add_argument('--atraso-escrita', type=float, default=0.2, help="Segundos a agrupar escritas antes de gravar em disco")
+    p_srv.set_defaults(func=cmd_serve)
+
     args=parser.parse_args(argv)
-    args.func(args)
+    # GESTOR_PROFILE=1 (resumo) ou GESTOR_PROFILE=ficheiro.json (trace), para não mudar os comandos de um script
+    env = os.environ.get('GESTOR_PROFILE', '')
+    destino = args.profile_json or (env if env.lower().endswith('.json') else None)
+    if not (args.profile or destino or env.lower() in ('1', 'true', 'sim')):
+        args.func(args)
+        return
+    from . import perfil
+    with perfil.perfilar() as p:
+        try:
+            with p.span(f"cli.{args.func.__name__}"):
+                args.func(args)
+        finally:
+            perfil.emitir(p, destino)
 
 if __name__=='__main__':
     main()
\ No newline at end of file
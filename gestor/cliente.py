@@ -0,0 +1,43 @@
+#gestor/cliente.py
+#Lado cliente do modo servidor: enviar um comando da CLI ao servidor (ver servidor.py), se houver um
+#a correr. Fica num modulo a parte, leve, porque e usado no arranque de todos os comandos.
+import os
+
+FICHEIRO_SERVIDOR = "servidor.json"
+
+
+def _caminhos_absolutos(argv):
+    # ficheiros indicados na linha de comando são relativos à pasta do cliente, não do servidor
+    res, anterior = [], None
+    for a in argv:
+        if anterior in ("--ficheiro", "--profile-json"):
+            a = os.path.abspath(a)
+        elif a.startswith(("--ficheiro=", "--profile-json=")):
+            opcao, valor = a.split("=", 1)
+            a = opcao + "=" + os.path.abspath(valor)
+        res.append(a)
+        anterior = a
+    return res
+
+
+def encaminhar(base_dir, argv, timeout=30):
+    """
+    Envia o comando ao servidor, se houver um a correr para `base_dir`.
+    Retorna None se não houver servidor; senão (saida, erro, codigo).
+    """
+    info_path = os.path.join(base_dir, FICHEIRO_SERVIDOR)
+    if not os.path.exists(info_path):
+        return None
+    import json, socket
+    try:
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        with socket.create_connection(("127.0.0.1", int(info["porta"])), timeout=timeout) as sock:
+            pedido = {"token": info["token"], "argv": _caminhos_absolutos(argv)}
+            sock.sendall((json.dumps(pedido, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as f:
+                resposta = json.loads(f.readline())
+    except (OSError, ValueError, KeyError):
+        # servidor parado (ficheiro antigo) ou inacessível: o comando corre localmente
+        return None
+    return resposta.get("saida", ""), resposta.get("erro"), int(resposta.get("codigo", 0))
@@ -0,0 +1,109 @@
+#gestor/importador.py
+#Ler extratos bancarios (CSV ou OFX) e converter em registos para FinanceService.add_movimentos_bulk
+import csv
+import re
+from datetime import datetime
+from .models import centimos
+
+# nomes de coluna aceites no CSV -> campo do registo
+COLUNAS_CSV = {
+    "data": "data_iso", "date": "data_iso",
+    "tipo": "tipo",
+    "valor": "valor", "montante": "valor", "amount": "valor",
+    "categoria": "categoria", "cat": "categoria",
+    "descricao": "descricao", "descrição": "descricao", "description": "descricao",
+    "metodo": "metodo_pagamento", "método": "metodo_pagamento",
+}
+
+def _valor(texto):
+    # cêntimos; aceita '12.50', '12,50', '1.234,56' e '1,234.56'
+    # (o último de ',' ou '.' é o separador decimal, o outro é de milhares)
+    texto = str(texto).strip().replace(" ", "").replace("€", "")
+    decimal = max(",.", key=texto.rfind)
+    if texto.rfind(decimal) < 0:
+        return centimos(texto)
+    milhares = "." if decimal == "," else ","
+    inteira, _, fracao = texto.rpartition(decimal)
+    if decimal in inteira:
+        raise ValueError(f"Valor ambíguo: {texto!r}")
+    return centimos(inteira.replace(milhares, "") + "." + fracao)
+
+def _data(texto):
+    # ISO ('2025-08-01[T..]'), 'DD/MM/AAAA' ou OFX ('AAAAMMDD[HHMMSS]')
+    texto = (texto or "").strip()
+    if not texto:
+        return None
+    if re.fullmatch(r"\d{2}/\d{2}/\d{4}", texto):
+        return datetime.strptime(texto, "%d/%m/%Y").isoformat(timespec="seconds")
+    ofx = re.match(r"\d{8}(\d{6})?", texto)
+    if ofx:
+        digitos = ofx.group(0)
+        fmt = "%Y%m%d%H%M%S" if len(digitos) == 14 else "%Y%m%d"
+        return datetime.strptime(digitos, fmt).isoformat(timespec="seconds")
+    return datetime.fromisoformat(texto.replace("Z", "")).isoformat(timespec="seconds")
+
+def _registo(valor, tipo=None, **campos):
+    # valor negativo sem tipo indicado = despesa (convenção dos extratos)
+    valor = _valor(valor)
+    if not tipo:
+        tipo = "despesa" if valor < 0 else "receita"
+    campos.update(tipo=str(tipo).strip().lower(), valor_cent=abs(valor))
+    return campos
+
+def ler_csv(path, categoria_padrao=""):
+    """
+    Lê um CSV com cabeçalho (data, tipo, valor, categoria, descricao, metodo; separador ',' ';' ou tab).
+    Retorna lista de dicts com os argumentos de add_movimento.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+        except csv.Error:
+            dialeto = csv.excel
+        registos = []
+        for n, linha in enumerate(csv.DictReader(f, dialect=dialeto), start=2):
+            campos = {COLUNAS_CSV[k.strip().lower()]: (v or "").strip()
+                      for k, v in linha.items() if k and k.strip().lower() in COLUNAS_CSV}
+            if "valor" not in campos or not campos["valor"]:
+                raise ValueError(f"Linha {n}: falta o valor.")
+            try:
+                campos["data_iso"] = _data(campos.get("data_iso"))
+                if not campos.get("categoria"):
+                    campos["categoria"] = categoria_padrao
+                registos.append(_registo(**campos))
+            except ValueError as e:
+                raise ValueError(f"Linha {n}: {e}") from e
+    return registos
+
+def ler_ofx(path, categoria_padrao="importado"):
+    """
+    Lê as transações (<STMTTRN>) de um ficheiro OFX/QFX (SGML ou XML).
+    Usa TRNAMT (sinal = tipo), DTPOSTED, NAME/MEMO como descrição e TRNTYPE como método.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        texto = f.read()
+    registos = []
+    for bloco in re.findall(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|</BANKTRANLIST>)", texto, re.S | re.I):
+        tags = {k.upper(): v.strip() for k, v in re.findall(r"<(\w+)>([^<\r\n]*)", bloco)}
+        if "TRNAMT" not in tags:
+            continue
+        descricao = " - ".join(x for x in (tags.get("NAME"), tags.get("MEMO")) if x)
+        registos.append(_registo(
+            tags["TRNAMT"],
+            data_iso=_data(tags.get("DTPOSTED")),
+            categoria=categoria_padrao,
+            descricao=descricao,
+            metodo_pagamento=tags.get("TRNTYPE", ""),
+        ))
+    return registos
+
+def ler_extrato(path, formato=None, categoria_padrao=None):
+    """Escolhe o leitor pelo formato ('csv'/'ofx') ou pela extensão do ficheiro."""
+    formato = (formato or path.rsplit(".", 1)[-1]).lower()
+    if formato in ("ofx", "qfx"):
+        return ler_ofx(path, categoria_padrao or "importado")
+    if formato == "csv":
+        return ler_csv(path, categoria_padrao or "")
+    raise ValueError("Formato de importação inválido. Use 'csv' ou 'ofx'.")
@@ -0,0 +1,306 @@
+#gestor/indices.py
+#Indices/agregados persistidos ao lado dos dados, atualizados a cada movimento novo
+import re
+from .models import chave_mes, chave_semana
+
+# campos do movimento (dict) pesquisados por texto, com o peso de cada um na relevância
+CAMPOS_TEXTO = (("descricao", 3), ("categoria", 2), ("metodo", 1))
+
+_PALAVRA = re.compile(r"\w+")
+
+def palavras(texto):
+    """Palavras (sequências de letras/dígitos) de `texto`, em minúsculas."""
+    return _PALAVRA.findall((texto or "").lower())
+
+
+def versao_storage(storage):
+    """
+    Versão dos movimentos (Storage.versao_movimentos) com o nome do storage: data/versao.json é
+    partilhado por todos os da pasta. As escritas dos orçamentos não a mudam.
+    """
+    if not hasattr(storage, "versao_movimentos"):
+        return None
+    return f"{type(storage).__name__}:{storage.versao_movimentos()}"
+
+
+class IndiceIncremental:
+    """
+    Base dos índices guardados em data/indices/<NOME>.json.
+
+    Cada índice guarda o maior id já contabilizado (`ultimo_id`), para se saber se está
+    coerente com os movimentos guardados. As subclasses definem CAMPOS (os dicts persistidos)
+    e _somar(movimento_dict).
+    """
+
+    NOME = None
+    CAMPOS = ()
+
+    def __init__(self, storage):
+        self.storage = storage
+        dados = storage.carregar_indice(self.NOME) or {}
+        self.ultimo_id = int(dados.get("ultimo_id", 0))
+        self.versao = dados.get("versao")  # versão dos dados quando foi gravado (só alguns índices a guardam, ver Rollups)
+        for campo in self.CAMPOS:
+            setattr(self, campo, dados.get(campo, {}))
+
+    def registar(self, movimento_dict):
+        self.ultimo_id = max(self.ultimo_id, int(movimento_dict["id"]))
+        self._somar(movimento_dict)
+
+    def _somar(self, movimento_dict):
+        raise NotImplementedError
+
+    def reconstruir(self, movimentos):
+        #Recalcula tudo a partir da lista de movimentos (dicts)
+        self.ultimo_id = 0
+        for campo in self.CAMPOS:
+            setattr(self, campo, {})
+        for m in movimentos:
+            self.registar(m)
+
+    def _estado(self):
+        return {"ultimo_id": self.ultimo_id, **{campo: getattr(self, campo) for campo in self.CAMPOS}}
+
+    def verificar(self, movimentos):
+        """True se o índice coincide com um recálculo completo a partir de `movimentos`."""
+        novo = type(self).__new__(type(self))
+        novo.reconstruir(movimentos)
+        return novo._estado() == self._estado()
+
+    def guardar(self):
+        self.storage.guardar_indice(self.NOME, self._estado())
+
+
+class IndiceGastos(IndiceIncremental):
+    """Total de despesas (em cêntimos) por (categoria, 'YYYY-MM') e por (categoria, 'YYYY-Www')."""
+
+    NOME = "gastos"
+    CAMPOS = ("mensal", "semanal")
+
+    def _somar(self, movimento_dict):
+        #Soma uma despesa aos contadores do seu mes e da sua semana
+        if movimento_dict.get("tipo") != "despesa":
+            return
+        cat = movimento_dict["categoria"]
+        valor = movimento_dict["valor_cent"]
+        por_mes = self.mensal.setdefault(cat, {})
+        mes = chave_mes(movimento_dict["data"])
+        por_mes[mes] = por_mes.get(mes, 0) + valor
+        por_semana = self.semanal.setdefault(cat, {})
+        semana = chave_semana(movimento_dict["data"])
+        por_semana[semana] = por_semana.get(semana, 0) + valor
+
+    def gasto(self, categoria, periodo, referencia):
+        tabela = self.mensal if periodo == "mensal" else self.semanal
+        return tabela.get(categoria, {}).get(referencia, 0)
+
+
+class CheckpointAlertas(IndiceGastos):
+    """
+    Estado dos alertas incrementais (relatorio --tipo alertas --desde-checkpoint): os gastos por
+    categoria/mês e categoria/semana até `ultimo_id` (como IndiceGastos), mais
+      - limites: {categoria: {periodo: limite}} dos orçamentos avaliados na última vez
+      - emitidos: {categoria: {periodo: {referencia: [limite, gasto]}}} dos alertas já emitidos
+
+    Não é atualizado a cada movimento: só quando os alertas são pedidos (ver avaliar).
+    """
+
+    NOME = "alertas"
+    CAMPOS = ("mensal", "semanal", "limites", "emitidos")
+
+    def avaliar(self, novos, orcamentos):
+        """
+        Soma os movimentos `novos` (dicts, ids acima de ultimo_id) e devolve só os alertas novos
+        ou alterados (gasto ou limite diferente do último emitido), no formato de service._alerta.
+        Só são vistos os períodos tocados pelos movimentos novos, exceto nas categorias cujos
+        orçamentos mudaram (criados, alterados ou removidos), que são reavaliadas por inteiro.
+        """
+        tocados = {}
+        for m in novos:
+            self.registar(m)
+            if m.get("tipo") == "despesa":
+                tocados.setdefault((m["categoria"], "mensal"), set()).add(chave_mes(m["data"]))
+                tocados.setdefault((m["categoria"], "semanal"), set()).add(chave_semana(m["data"]))
+
+        limites = {}
+        for o in orcamentos:
+            if o.get("periodo", "mensal") in ("mensal", "semanal"):
+                limites.setdefault(o["categoria"], {})[o.get("periodo", "mensal")] = int(o["limite_cent"])
+        mudadas = {c for c in set(limites) | set(self.limites) if limites.get(c) != self.limites.get(c)}
+        for cat in mudadas:
+            if cat not in limites:
+                self.emitidos.pop(cat, None)  # orçamento removido
+
+        res = []
+        for cat, por_periodo in limites.items():
+            for periodo, limite in por_periodo.items():
+                gastos = self.mensal if periodo == "mensal" else self.semanal
+                emitidos = self.emitidos.setdefault(cat, {}).setdefault(periodo, {})
+                if cat in mudadas:
+                    refs = set(gastos.get(cat, {})) | set(emitidos)
+                else:
+                    refs = tocados.get((cat, periodo), ())
+                for ref in refs:
+                    gasto = self.gasto(cat, periodo, ref)
+                    if gasto <= limite:
+                        emitidos.pop(ref, None)  # deixou de exceder: volta a ser novo se exceder outra vez
+                    elif emitidos.get(ref) != [limite, gasto]:
+                        emitidos[ref] = [limite, gasto]
+                        res.append({"categoria": cat, "periodo": periodo, "limite": limite, "gasto": gasto,
+                                    "excesso": gasto - limite, "referencia": ref})
+            for periodo in set(self.emitidos.get(cat, {})) - set(por_periodo):
+                del self.emitidos[cat][periodo]
+        self.limites = limites
+        self.emitidos = {c: {p: e for p, e in ps.items() if e} for c, ps in self.emitidos.items() if any(ps.values())}
+        res.sort(key=lambda x: (-x["excesso"], x["categoria"], x["periodo"], x["referencia"]))
+        return res
+
+
+class Rollups(IndiceIncremental):
+    """
+    Totais materializados para os relatórios (em cêntimos):
+      - mes:    {'YYYY-MM':  {categoria: [receita, despesa]}}
+      - semana: {'YYYY-Www': {categoria: [receita, despesa]}}
+    Os relatórios usam-nos para os meses/semanas inteiramente dentro do intervalo pedido.
+    """
+
+    NOME = "rollups"
+    CAMPOS = ("mes", "semana")
+
+    def guardar(self):
+        # com a versão dos dados a que correspondem (ver versao_storage): enquanto for a atual, os
+        # relatórios sabem que estão atualizados sem contar os movimentos (proximo_id pode ler tudo)
+        self.versao = versao_storage(self.storage)
+        self.storage.guardar_indice(self.NOME, {**self._estado(), "versao": self.versao})
+
+    def _somar(self, movimento_dict):
+        tipo = movimento_dict.get("tipo")
+        if tipo not in ("receita", "despesa"):
+            return
+        i = 0 if tipo == "receita" else 1
+        cat = movimento_dict["categoria"]
+        valor = movimento_dict["valor_cent"]
+        for tabela, chave in ((self.mes, chave_mes(movimento_dict["data"])),
+                              (self.semana, chave_semana(movimento_dict["data"]))):
+            totais = tabela.setdefault(chave, {}).setdefault(cat, [0, 0])
+            totais[i] += valor
+
+
+class IndiceTexto(IndiceIncremental):
+    """
+    Índice invertido para a pesquisa por texto: palavras: {palavra: [ids]}, com as palavras
+    da descrição, categoria e método de pagamento (ver CAMPOS_TEXTO).
+
+    A pesquisa é por substring: cada palavra do texto procurado tem de estar contida numa
+    palavra do movimento, por isso basta percorrer o vocabulário (pequeno) e juntar os ids.
+    O resultado é um superconjunto; quem chama confirma a substring nos movimentos candidatos.
+
+    É bem maior que os outros índices, por isso:
+      - data/indices/texto.json só guarda ultimo_id; as palavras ficam em texto-palavras.json
+        e só são lidas quando são precisas (pesquisa, reconstrução, regravação)
+      - os movimentos novos são acrescentados a um diário (texto.jsonl, se o storage tiver
+        acrescentar_indice) e o ficheiro das palavras é regravado de LIMITE_DIARIO em LIMITE_DIARIO
+    """
+
+    NOME = "texto"
+    CAMPOS = ()
+    LIMITE_DIARIO = 1000
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self._palavras = None  # carregado na primeira utilização
+        self._pendentes = []   # registos do diário ainda não aplicados a _palavras
+        self._novos = []       # registos ainda não gravados
+        self._completo = False  # depois de reconstruir é preciso regravar tudo
+        self._linhas_diario = 0
+        if hasattr(storage, "iter_indice_diario"):
+            for registo in storage.iter_indice_diario(self.NOME):
+                self._linhas_diario += 1
+                if int(registo["id"]) > self.ultimo_id:
+                    self.ultimo_id = int(registo["id"])
+                    self._pendentes.append(registo)
+
+    @property
+    def palavras(self):
+        if self._palavras is None:
+            dados = self.storage.carregar_indice(self.NOME + "-palavras") or {}
+            self._palavras = dados.get("palavras", {})
+            incluido = int(dados.get("ultimo_id", 0))
+            for registo in self._pendentes:
+                if int(registo["id"]) > incluido:
+                    self._indexar(int(registo["id"]), registo["palavras"])
+            self._pendentes = []
+        return self._palavras
+
+    def _indexar(self, i, lista):
+        for p in lista:
+            self._palavras.setdefault(p, []).append(i)
+
+    def _somar(self, movimento_dict):
+        vistas = set()
+        for campo, _ in CAMPOS_TEXTO:
+            vistas.update(palavras(movimento_dict.get(campo)))
+        registo = {"id": int(movimento_dict["id"]), "palavras": sorted(vistas)}
+        if self._palavras is None:
+            self._pendentes.append(registo)  # aplicado quando as palavras forem lidas
+        else:
+            self._indexar(registo["id"], registo["palavras"])
+        self._novos.append(registo)
+
+    def reconstruir(self, movimentos):
+        self._palavras, self._pendentes, self._novos = {}, [], []
+        super().reconstruir(movimentos)
+        self._novos, self._completo = [], True
+
+    def _estado(self):
+        return {"ultimo_id": self.ultimo_id, "palavras": self.palavras}
+
+    def guardar(self):
+        diario = hasattr(self.storage, "acrescentar_indice")
+        if not diario or self._completo or self._linhas_diario + len(self._novos) >= self.LIMITE_DIARIO:
+            # palavras primeiro: se falhar a meio, o diário continua lá e volta a ser aplicado
+            self.storage.guardar_indice(self.NOME + "-palavras", self._estado())
+            self.storage.guardar_indice(self.NOME, {"ultimo_id": self.ultimo_id})  # (descarta o diário)
+            self._linhas_diario = 0
+        elif self._novos:
+            self.storage.acrescentar_indice(self.NOME, self._novos)
+            self._linhas_diario += len(self._novos)
+        self._novos, self._completo = [], False
+
+    def candidatos(self, texto):
+        """Ids que podem conter `texto`; None se o texto não tiver palavras (o índice não ajuda)."""
+        termos = set(palavras(texto))
+        if not termos:
+            return None
+        res = None
+        for termo in sorted(termos, key=len, reverse=True):  # os mais longos filtram mais
+            ids = set()
+            for p, lista in self.palavras.items():
+                if termo in p:
+                    ids.update(lista)
+            res = ids if res is None else res & ids
+            if not res:
+                break
+        return res
+
+
+def contem_texto(movimento_dict, texto):
+    """True se `texto` (em minúsculas) aparece na descrição, categoria ou método do movimento."""
+    return any(texto in (movimento_dict.get(campo) or "").lower() for campo, _ in CAMPOS_TEXTO)
+
+
+def relevancia(movimento_dict, texto):
+    """
+    Pontuação de um movimento para a pesquisa `texto` (em minúsculas): ocorrências da substring
+    e palavras inteiras em comum, pesadas pelo campo (descrição > categoria > método).
+    """
+    termos = set(palavras(texto))
+    pontos = 0
+    for campo, peso in CAMPOS_TEXTO:
+        valor = (movimento_dict.get(campo) or "").lower()
+        pontos += peso * (valor.count(texto) + len(termos.intersection(palavras(valor))))
+    return pontos
+
+
+# índices mantidos pelo FinanceService a cada movimento novo
+INDICES = (IndiceGastos, Rollups, IndiceTexto)
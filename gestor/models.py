@@ -1,7 +1,10 @@
 #gestor/models.py
 #Criar uma classe e validar com if/raise
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, date
+from functools import lru_cache
+from array import array
+from bisect import bisect_left, bisect_right
 
 class TipoMovimento(str, Enum):
     DESPESA = "despesa"
@@ -14,7 +17,228 @@ def _is_iso_datetime(value):
         return True
     except ValueError:
         return False
-       
+
+_EPOCH = datetime(1970, 1, 1)
+
+def parse_iso(date_iso):
+    """datetime de uma data ISO (aceita 'YYYY-MM-DD' e 'YYYY-MM-DDTHH:MM[:SS]', com ou sem 'Z')."""
+    return datetime.fromisoformat(date_iso.replace("Z",""))
+
+@lru_cache(maxsize=8192)
+def _chaves_dia(dia):
+    # ('YYYY-MM', 'YYYY-Www') de um dia 'YYYY-MM-DD'. Em memória: muitos movimentos partilham o mesmo dia
+    d = date.fromisoformat(dia)
+    iso_year, iso_week, _ = d.isocalendar()  # ISO: semana começa à segunda
+    return d.strftime("%Y-%m"), f"{iso_year}-W{iso_week:02d}"
+
+def _dia(date_iso):
+    # 'YYYY-MM-DD' sem fazer parse quando a data já começa nesse formato
+    if len(date_iso) >= 10 and date_iso[4] == "-" and date_iso[7] == "-":
+        return date_iso[:10]
+    return parse_iso(date_iso).date().isoformat()
+
+def chave_mes(date_iso):
+    """'YYYY-MM' de uma data ISO."""
+    return _chaves_dia(_dia(date_iso))[0]
+
+def chave_semana(date_iso):
+    """Semana ISO 'YYYY-Www' de uma data ISO."""
+    return _chaves_dia(_dia(date_iso))[1]
+
+@lru_cache(maxsize=4096)
+def limites_periodo(chave):
+    """
+    (início, fim) canónicos de um mês 'YYYY-MM' ou semana ISO 'YYYY-Www'.
+    O fim é o último segundo do período (precisão com que as datas são gravadas).
+    """
+    if "-W" in chave:
+        ano, semana = chave.split("-W")
+        primeiro = date.fromisocalendar(int(ano), int(semana), 1)
+        ultimo = date.fromordinal(primeiro.toordinal() + 6)
+    else:
+        primeiro = date.fromisoformat(chave + "-01")
+        seguinte = date(primeiro.year + primeiro.month // 12, primeiro.month % 12 + 1, 1)
+        ultimo = date.fromordinal(seguinte.toordinal() - 1)
+    return primeiro.isoformat() + "T00:00:00.000000", ultimo.isoformat() + "T23:59:59.000000"
+
+def data_canonica(date_iso):
+    """
+    Data ISO normalizada para 'YYYY-MM-DDTHH:MM:SS.ffffff' (sem fuso).
+    Duas datas canónicas comparam-se como texto pela mesma ordem que como datetime.
+    """
+    if len(date_iso) == 19 and date_iso[10] == "T":
+        return date_iso + ".000000"
+    return parse_iso(date_iso).isoformat(timespec="microseconds")[:26]
+
+def filtrar_periodo(movs, inicio=None, fim=None):
+    """
+    Gerador com os movimentos (dicts) de `movs` cuja data está em [inicio, fim].
+    Datas e limites são comparados na forma canónica (= como datetime), em todos os caminhos
+    (listagens, relatórios, tabelas), para 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM' e afins darem o mesmo.
+    """
+    if not inicio and not fim:
+        yield from movs
+        return
+    c_inicio = data_canonica(inicio) if inicio else None
+    c_fim = data_canonica(fim) if fim else None
+    for m in movs:
+        d = data_canonica(m["data"])
+        if c_inicio and d < c_inicio:
+            continue
+        if c_fim and d > c_fim:
+            continue
+        yield m
+
+class OrdemDatas:
+    """
+    Posições (de uma MovimentoTable) ordenadas por data, para consultas por intervalo com bisect.
+
+    Os movimentos chegam quase sempre por ordem cronológica: os que respeitam a ordem são
+    acrescentados ao fim de `chaves`/`posicoes`; os que chegam fora de ordem vão para uma
+    lista de remendos, também ordenada (normalmente pequena).
+    As chaves são datas canónicas (ver data_canonica).
+    """
+
+    __slots__ = ("chaves", "posicoes", "remendos", "n")
+
+    def __init__(self):
+        self.chaves, self.posicoes = [], []
+        self.remendos = []  # [(chave, posição)] ordenado
+        self.n = 0          # nº de posições já ordenadas
+
+    def acrescentar(self, datas):
+        #Ordena as datas novas (posicoes n, n+1, ...)
+        chaves, posicoes = self.chaves, self.posicoes
+        ultima = chaves[-1] if chaves else ""
+        fora = []
+        for i, data in enumerate(datas, start=self.n):
+            c = data_canonica(data)
+            if c >= ultima:
+                chaves.append(c)
+                posicoes.append(i)
+                ultima = c
+            else:
+                fora.append((c, i))
+            self.n += 1
+        if fora:
+            self.remendos = sorted(self.remendos + fora)
+
+    def intervalo(self, inicio=None, fim=None):
+        """Posições (por ordem crescente) com data em [inicio, fim]."""
+        c_inicio = data_canonica(inicio) if inicio else None
+        c_fim = data_canonica(fim) if fim else None
+        a = bisect_left(self.chaves, c_inicio) if c_inicio else 0
+        b = bisect_right(self.chaves, c_fim) if c_fim else len(self.chaves)
+        res = self.posicoes[a:b]
+        if self.remendos:
+            a = bisect_left(self.remendos, (c_inicio,)) if c_inicio else 0
+            # (c_fim + "~",): depois de todas as chaves iguais a c_fim
+            b = bisect_right(self.remendos, (c_fim + "~",)) if c_fim else len(self.remendos)
+            res = sorted(res + [p for _, p in self.remendos[a:b]])
+        return res
+
+class SomasAcumuladas:
+    """
+    Somas acumuladas (prefix sums) dos valores de uma MovimentoTable, por data, para totais de
+    intervalos quaisquer: duas pesquisas binárias e uma subtração, sem percorrer os movimentos.
+
+    Uma série por (despesa, código da categoria) e por despesa (todas as categorias, código None):
+    `chaves` (datas canónicas, ordenadas) e `acum` (array('q'), acum[k] = soma das k primeiras).
+    Os movimentos por ordem cronológica são acrescentados ao fim da série; um fora de ordem fica
+    pendente e a série é reordenada na consulta seguinte.
+    """
+
+    __slots__ = ("series", "n")
+
+    def __init__(self):
+        self.series = {}  # (despesa, cod_cat ou None) -> [chaves, acum, pendentes]
+        self.n = 0        # nº de posições já contabilizadas
+
+    def acrescentar(self, datas, valores, despesa, cat):
+        #Contabiliza as posicoes n, n+1, ... (colunas a partir da posicao n)
+        series = self.series
+        for data, v, d, c in zip(datas, valores, despesa, cat):
+            k = data_canonica(data)
+            for chave in ((d, c), (d, None)):
+                serie = series.get(chave)
+                if serie is None:
+                    serie = series[chave] = [[], array("q", (0,)), []]
+                chaves, acum, pendentes = serie
+                if not pendentes and (not chaves or k >= chaves[-1]):
+                    chaves.append(k)
+                    acum.append(acum[-1] + v)
+                else:
+                    pendentes.append((k, v))
+            self.n += 1
+
+    @staticmethod
+    def _reordenar(serie):
+        # junta os pendentes e recalcula a série inteira
+        chaves, acum, pendentes = serie
+        pares = [(k, acum[i + 1] - acum[i]) for i, k in enumerate(chaves)] + pendentes
+        pares.sort(key=lambda p: p[0])  # estável: datas iguais ficam pela ordem de chegada
+        novo = array("q", (0,))
+        total = 0
+        for _, v in pares:
+            total += v
+            novo.append(total)
+        serie[:] = [[k for k, _ in pares], novo, []]
+
+    def total(self, despesa, cod_cat=None, inicio=None, fim=None):
+        """Soma (cêntimos) da série com data em [inicio, fim]; cod_cat None = todas as categorias."""
+        serie = self.series.get((despesa, cod_cat))
+        if serie is None:
+            return 0
+        if serie[2]:
+            self._reordenar(serie)
+        chaves, acum, _ = serie
+        a = bisect_left(chaves, data_canonica(inicio)) if inicio else 0
+        b = bisect_right(chaves, data_canonica(fim)) if fim else len(chaves)
+        return acum[b] - acum[a] if b > a else 0
+
+@lru_cache(maxsize=8192)
+def _epoch_dia(dia):
+    return float((date.fromisoformat(dia) - _EPOCH.date()).days * 86400)
+
+def epoch(date_iso):
+    """Segundos desde 1970-01-01 (a data/hora é tratada como está, sem conversão de fuso)."""
+    if len(date_iso) == 19 and date_iso[10] == "T":
+        # 'YYYY-MM-DDTHH:MM:SS' (o formato gravado pelo serviço): sem datetime
+        return _epoch_dia(date_iso[:10]) + int(date_iso[11:13]) * 3600 + int(date_iso[14:16]) * 60 + int(date_iso[17:19])
+    return (parse_iso(date_iso).replace(tzinfo=None) - _EPOCH).total_seconds()
+
+# Valores monetários: inteiros em cêntimos em todo o lado (storage, modelos, índices, somas).
+# Só a entrada (CLI, importação) e a saída (impressão, exportação) passam por euros, com Decimal
+class FormatoAntigo(ValueError):
+    """Dados gravados em euros, antes dos cêntimos (ver Storage.migrar_centimos / comando 'migrar')."""
+
+def _formato_antigo(d):
+    return FormatoAntigo(f"Registo #{d.get('id')} ainda tem o valor em euros: execute 'migrar' para converter os dados para cêntimos.")
+
+def centimos(valor):
+    """Cêntimos (int) de um valor em euros (texto, int, float ou Decimal), arredondado a 2 casas (metade para cima)."""
+    from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+    try:
+        d = Decimal(str(valor).strip())
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {valor!r}") from None
+    if not d.is_finite():
+        raise ValueError(f"Valor inválido: {valor!r}")
+    return int((d * 100).to_integral_value(ROUND_HALF_UP))
+
+def euros(cent):
+    """Decimal em euros (2 casas) de um valor em cêntimos."""
+    from decimal import Decimal
+    return Decimal(int(cent)).scaleb(-2)
+
+def _cent(valor):
+    # cêntimos já inteiros (um float, mesmo 5.0, é quase sempre um valor em euros por engano)
+    if isinstance(valor, float):
+        raise ValueError(f"Valor em cêntimos tem de ser inteiro: {valor!r}")
+    return int(valor)
+
+_TIPOS = {t.value: t for t in TipoMovimento}
+
 class Movimento:
 
     """
@@ -25,26 +249,44 @@ class Movimento:
       - tipo: TipoMovimento
       - data_iso: str no formato ISO 8601. NOTA: será, por omissão, a data/hora atual
                   no momento do comando (definido na CLI/serviço).
-      - valor: float (> 0)
+      - valor_cent: int, em cêntimos (> 0)
       - categoria: str (obrigatório)
       - descricao: str (opcional)
       - metodo_pagamento: str (opcional, ex.: 'MBWay', 'cartao', 'dinheiro', ...)
       - tags: lista de strings (opcional)
     """
 
-    def __init__(self, id_, tipo, valor, categoria, descricao="", metodo_pagamento="",data_iso=None):
+    __slots__ = ("id", "tipo", "valor_cent", "categoria", "descricao", "metodo_pagamento", "data_iso", "_ts")
+
+    def __init__(self, id_, tipo, valor_cent, categoria, descricao="", metodo_pagamento="",data_iso=None):
         self.id = int(id_)
         self.tipo = ( tipo if isinstance(tipo, TipoMovimento) else TipoMovimento(str(tipo)))
-        self.valor = float(valor)
+        self.valor_cent = _cent(valor_cent)
         self.categoria = str(categoria).strip()
         self.descricao = str(descricao or "")
         self.metodo_pagamento = str(metodo_pagamento or "").strip()
         self.data_iso = data_iso or ""
+        self._ts = None
+
+    # chaves de data calculadas uma vez (mês/semana vêm de uma cache por dia)
+    @property
+    def mes(self):
+        return chave_mes(self.data_iso)
+
+    @property
+    def semana(self):
+        return chave_semana(self.data_iso)
+
+    @property
+    def ts(self):
+        if self._ts is None:
+            self._ts = epoch(self.data_iso)
+        return self._ts
     
     def validar(self):
         if not isinstance(self.tipo, TipoMovimento):
             raise ValueError("Tipo de movimento inválido.")
-        if self.valor <= 0:
+        if self.valor_cent <= 0:
             raise ValueError("O valor deve ser maior que zero.")
         if not self.categoria:
             raise ValueError("A categoria é obrigatória.")        
@@ -55,7 +297,7 @@ class Movimento:
             "id": self.id,
             "tipo": self.tipo.value,
             "data": self.data_iso,
-            "valor": self.valor,
+            "valor_cent": self.valor_cent,
             "categoria": self.categoria,
             "descricao": self.descricao,
             "metodo": self.metodo_pagamento
@@ -63,10 +305,12 @@ class Movimento:
 
     def from_dict(d):
         #Cria a tarefa a partir do diconario (Quando carregarmos o ficheiro JSON)
+        if "valor_cent" not in d and "valor" in d:
+            raise _formato_antigo(d)
         return Movimento(
             id_=int(d["id"]),
-            tipo=TipoMovimento(d.get("tipo", "despesa")),
-            valor=float(d.get("valor", 0.0)),
+            tipo=_TIPOS.get(d.get("tipo", "despesa")) or TipoMovimento(d.get("tipo")),
+            valor_cent=d.get("valor_cent", 0),
             categoria=d.get("categoria", "").strip(),
             descricao=d.get("descricao", ""),
             metodo_pagamento=d.get("metodo", ""),
@@ -75,18 +319,20 @@ class Movimento:
     
 class Orcamento:
     """
-    Orçamento por categoria e período.   
+    Orçamento por categoria e período (limite_cent em cêntimos).
     """
-    def __init__(self,id_,categoria,limite,periodo="mensal"):
+    __slots__ = ("id", "categoria", "limite_cent", "periodo")
+
+    def __init__(self,id_,categoria,limite_cent,periodo="mensal"):
         self.id = int(id_)
         self.categoria = str(categoria).strip()
-        self.limite = float(limite)
+        self.limite_cent = _cent(limite_cent)
         self.periodo = str(periodo or "mensal").strip().lower()
     
     def validar(self):
         if not self.categoria:
             raise ValueError("A categoria do orçamento é obrigatória.")
-        if self.limite <= 0:
+        if self.limite_cent <= 0:
             raise ValueError("O limite do orçamento deve ser maior que zero.")
         if self.periodo not in ("mensal","semanal"):
             raise ValueError("Período inválido. Suportado: 'mensal' ou 'semanal.")
@@ -95,14 +341,209 @@ class Orcamento:
         return {
             "id": self.id,
             "categoria": self.categoria,
-            "limite": self.limite,
+            "limite_cent": self.limite_cent,
             "periodo": self.periodo,
         }
     
     def from_dict(d):
+        if "limite_cent" not in d and "limite" in d:
+            raise _formato_antigo(d)
         return Orcamento(
             id_=int(d["id"]),
             categoria=d.get("categoria", "").strip(),
-            limite=float(d.get("limite", 0.0)),
+            limite_cent=d.get("limite_cent", 0),
             periodo=d.get("periodo", "mensal"),
-        )
\ No newline at end of file
+        )
+
+
+class MovimentoTable:
+    """
+    Coleção colunar de movimentos (em vez de um objeto Movimento por registo).
+
+    Colunas (posição i = i-ésimo movimento):
+      - ids: array('q'); valores: array('q') em cêntimos; despesa: array('b') (1 despesa, 0 receita)
+      - cat: array('l') com códigos para `categorias` (strings internadas, uma por categoria)
+      - mes, semana: array('l') com códigos para `chaves` ('YYYY-MM' / 'YYYY-Www')
+      - datas, descricoes, metodos: listas de strings
+      - ts: array('d') com os timestamps (calculado só quando é preciso)
+      - ordem: OrdemDatas, para os filtros por data (construída na primeira consulta e
+        atualizada com os movimentos acrescentados depois)
+      - somas: SomasAcumuladas, para os totais por intervalo de datas (idem)
+    """
+
+    __slots__ = ("ids", "valores", "despesa", "cat", "mes", "semana", "datas", "descricoes", "metodos",
+                 "_cod_cat", "_cod_chave", "_ts", "_ordem", "_somas")
+
+    COLUNAS = ("ids", "valores", "despesa", "cat", "mes", "semana", "datas", "descricoes", "metodos")
+
+    def __init__(self, cod_cat=None, cod_chave=None):
+        self.ids = array("q")
+        self.valores = array("q")
+        self.despesa = array("b")
+        self.cat = array("l")
+        self.mes = array("l")
+        self.semana = array("l")
+        self.datas = []
+        self.descricoes = []
+        self.metodos = []
+        # string -> código; partilhados com as tabelas filtradas
+        self._cod_cat = {} if cod_cat is None else cod_cat
+        self._cod_chave = {} if cod_chave is None else cod_chave
+        self._ts = None
+        self._ordem = None
+        self._somas = None
+
+    @property
+    def categorias(self):
+        return list(self._cod_cat)
+
+    @property
+    def chaves(self):
+        return list(self._cod_chave)
+
+    @property
+    def ts(self):
+        if self._ts is None or len(self._ts) != len(self.datas):
+            self._ts = array("d", map(epoch, self.datas))
+        return self._ts
+
+    @property
+    def ordem(self):
+        if self._ordem is None:
+            self._ordem = OrdemDatas()
+        if self._ordem.n < len(self.datas):
+            self._ordem.acrescentar(self.datas[self._ordem.n:])
+        return self._ordem
+
+    @property
+    def somas(self):
+        if self._somas is None:
+            self._somas = SomasAcumuladas()
+        n = self._somas.n
+        if n < len(self.datas):
+            self._somas.acrescentar(self.datas[n:], self.valores[n:], self.despesa[n:], self.cat[n:])
+        return self._somas
+
+    def total_periodo(self, inicio=None, fim=None, cat=None, tipo="despesa"):
+        """Soma (cêntimos) dos movimentos de `tipo` (e da categoria `cat`) com data em [inicio, fim]."""
+        cod = None
+        if cat:
+            cod = self._cod_cat.get(cat)
+            if cod is None:
+                return 0
+        return self.somas.total(1 if tipo == "despesa" else 0, cod, inicio, fim)
+
+    @classmethod
+    def from_dicts(cls, movimentos):
+        tab = cls()
+        tab.extend(movimentos)
+        return tab
+
+    @classmethod
+    def de_colunas(cls, colunas, categorias, chaves):
+        """
+        Tabela a partir de colunas já prontas ({nome: sequência}, ver COLUNAS), sem copiar:
+        as numéricas podem ser memoryviews (ex.: sobre um ficheiro mapeado, ver binario.py).
+        São copiadas para arrays só se forem acrescentados movimentos.
+        """
+        tab = cls({c: i for i, c in enumerate(categorias)}, {k: i for i, k in enumerate(chaves)})
+        for nome in cls.COLUNAS:
+            setattr(tab, nome, colunas[nome])
+        return tab
+
+    def extend(self, movimentos):
+        #Acrescenta movimentos (dicts no formato do storage). Colunas montadas em listas e convertidas no fim
+        for nome in ("ids", "valores", "despesa", "cat", "mes", "semana"):
+            col = getattr(self, nome)
+            if isinstance(col, memoryview):  # só de leitura (ver de_colunas)
+                setattr(self, nome, array(col.format, col.tobytes()))
+        cod_cat, cod_chave = self._cod_cat, self._cod_chave
+        dias = {}
+        ids, valores, despesa, cat, mes, semana = [], [], [], [], [], []
+        datas, descricoes, metodos = self.datas, self.descricoes, self.metodos
+        d = {}
+        try:
+            for d in movimentos:
+                data = d.get("data", "")
+                chs = dias.get(data[:10])
+                if chs is None:
+                    m, w = _chaves_dia(_dia(data))
+                    chs = dias[data[:10]] = (cod_chave.setdefault(m, len(cod_chave)), cod_chave.setdefault(w, len(cod_chave)))
+                ids.append(int(d["id"]))
+                valores.append(d["valor_cent"])
+                despesa.append(d.get("tipo", "despesa") == "despesa")
+                c = d.get("categoria", "").strip()
+                cat.append(cod_cat.setdefault(c, len(cod_cat)))
+                mes.append(chs[0])
+                semana.append(chs[1])
+                datas.append(data)
+                descricoes.append(d.get("descricao", ""))
+                metodos.append(d.get("metodo", ""))
+        except KeyError as e:
+            if e.args == ("valor_cent",) and "valor" in d:
+                raise _formato_antigo(d) from None
+            raise
+        self.ids.extend(ids)
+        self.valores.extend(valores)
+        self.despesa.extend(despesa)
+        self.cat.extend(cat)
+        self.mes.extend(mes)
+        self.semana.extend(semana)
+
+    def append(self, d):
+        self.extend((d,))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        categorias = self.categorias
+        return Movimento(
+            id_=self.ids[i],
+            tipo=TipoMovimento.DESPESA if self.despesa[i] else TipoMovimento.RECEITA,
+            valor_cent=self.valores[i],
+            categoria=categorias[self.cat[i]],
+            descricao=self.descricoes[i],
+            metodo_pagamento=self.metodos[i],
+            data_iso=self.datas[i],
+        )
+
+    def movimentos(self, posicoes=None):
+        """Objetos Movimento das posições dadas (todas, por omissão)."""
+        categorias = self.categorias
+        if posicoes is None:
+            posicoes = range(len(self.ids))
+        return [
+            Movimento(self.ids[i], TipoMovimento.DESPESA if self.despesa[i] else TipoMovimento.RECEITA,
+                      self.valores[i], categorias[self.cat[i]], self.descricoes[i], self.metodos[i], self.datas[i])
+            for i in posicoes
+        ]
+
+    def __iter__(self):
+        return iter(self.movimentos())
+
+    def posicoes(self, inicio=None, fim=None, cat=None, tipo=None):
+        """Posições dos movimentos que passam os filtros (intervalo de datas por bisect, ver OrdemDatas)."""
+        res = range(len(self.ids))
+        if inicio or fim:
+            res = self.ordem.intervalo(inicio, fim)
+        if cat:
+            cod = self._cod_cat.get(cat, -1)
+            col = self.cat
+            res = [i for i in res if col[i] == cod]
+        if tipo:
+            flag = 1 if tipo == "despesa" else 0
+            col = self.despesa
+            res = [i for i in res if col[i] == flag]
+        return list(res)
+
+    def selecionar(self, posicoes):
+        """Nova tabela só com as posições dadas (partilha os códigos de categorias/chaves)."""
+        tab = MovimentoTable(self._cod_cat, self._cod_chave)
+        for nome in self.COLUNAS:
+            col = getattr(self, nome)
+            getattr(tab, nome).extend(col[i] for i in posicoes)
+        return tab
+
+    def filtrar(self, inicio=None, fim=None, cat=None, tipo=None):
+        return self.selecionar(self.posicoes(inicio, fim, cat, tipo))
@@ -0,0 +1,221 @@
+#gestor/perfil.py
+#Instrumentacao opcional (--profile / --profile-json / GESTOR_PROFILE): tempo de cada operacao do
+#storage, do FinanceService, dos Reports e dos indices, e contadores (movimentos e bytes lidos/escritos).
+#Desligada nao custa nada: os metodos so sao envolvidos durante perfilar(); os contadores espalhados
+#pelo codigo sao uma comparacao com None.
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+import types
+
+# Perfil em curso (None = instrumentação desligada)
+ATIVO = None
+
+# métodos dos storages instrumentados -> contador de registos (None = só o tempo)
+METODOS_STORAGE = {
+    "carregar_movimentos": "movimentos_lidos", "iter_movimentos": "movimentos_lidos",
+    "carregar_tabela": "movimentos_lidos", "iter_meses": "movimentos_lidos",
+    "consultar_movimentos": "movimentos_lidos",
+    "guardar_movimentos": "movimentos_escritos", "adicionar_movimentos": "movimentos_escritos",
+    "adicionar_movimento": None, "compactar": None, "somar_movimentos": None, "proximo_id": None,
+    "carregar_orcamentos": None, "guardar_orcamentos": None,
+    "carregar_indice": None, "guardar_indice": None, "acrescentar_indice": None, "flush": None,
+}
+# dos Reports, além dos públicos
+METODOS_REPORTS = ("_load_movs", "_load_tabela", "_agregar", "_agregar_rollups", "_somas_paralelo", "_rollups")
+METODOS_INDICES = ("registar", "reconstruir", "verificar", "guardar", "candidatos")
+
+
+def contar(nome, n=1):
+    if ATIVO is not None:
+        ATIVO.contar(nome, n)
+
+
+def ficheiro_lido(path):
+    #Soma o tamanho de `path` a bytes_lidos (so com a instrumentacao ligada)
+    if ATIVO is not None:
+        with contextlib.suppress(OSError):
+            ATIVO.contar("bytes_lidos", os.path.getsize(path))
+
+
+class Perfil:
+    """
+    Tempos por operação (chamadas, tempo total e próprio, i.e. sem as operações chamadas por ela),
+    contadores e os eventos para o trace JSON (formato Chrome trace / Perfetto).
+    Uma só thread: a CLI e o servidor (que atende um pedido de cada vez).
+    """
+
+    def __init__(self):
+        self.operacoes = {}  # nome -> [chamadas, total, próprio] (segundos)
+        self.contadores = {}
+        self.eventos = []
+        self._filhos = []  # por operação aberta: tempo já gasto nas operações chamadas por ela
+        self._contando = set()  # contadores de registos com uma operação aberta (conta só a mais exterior)
+        self.inicio = time.perf_counter()
+        self.fim = None
+
+    def contar(self, nome, n=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + n
+
+    def entrar(self):
+        self._filhos.append(0.0)
+        return time.perf_counter()
+
+    def sair(self, nome, t0, chamada=True):
+        dur = time.perf_counter() - t0
+        filhos = self._filhos.pop()
+        if self._filhos:
+            self._filhos[-1] += dur
+        op = self.operacoes.get(nome)
+        if op is None:
+            op = self.operacoes[nome] = [0, 0.0, 0.0]
+        op[0] += chamada
+        op[1] += dur
+        op[2] += dur - filhos
+        return dur
+
+    def evento(self, nome, t0, dur, **args):
+        ev = {"name": nome, "ph": "X", "pid": os.getpid(), "tid": 0,
+              "ts": round((t0 - self.inicio) * 1e6, 1), "dur": round(dur * 1e6, 1)}
+        if args:
+            ev["args"] = args
+        self.eventos.append(ev)
+
+    @contextlib.contextmanager
+    def span(self, nome):
+        t0 = self.entrar()
+        try:
+            yield
+        finally:
+            self.evento(nome, t0, self.sair(nome, t0))
+
+    def envolver(self, nome, func, contador=None):
+        perfil = self
+
+        @functools.wraps(func)
+        def medido(*args, **kwargs):
+            contar = contador is not None and contador not in perfil._contando
+            if contar:
+                perfil._contando.add(contador)
+            t0 = perfil.entrar()
+            try:
+                res = func(*args, **kwargs)
+            finally:
+                dur = perfil.sair(nome, t0)
+                if contar:
+                    perfil._contando.discard(contador)
+            if isinstance(res, types.GeneratorType):
+                # o trabalho é feito ao consumir: mede cada next() e conta os registos produzidos
+                return perfil._gerador(nome, res, t0, dur, contador if contar else None)
+            if contar:
+                n = len(args[1]) if contador == "movimentos_escritos" else len(res)
+                perfil.contar(contador, n)
+            perfil.evento(nome, t0, dur)
+            return res
+
+        return medido
+
+    def _gerador(self, nome, gen, t0, dur, contador):
+        n = 0
+        if contador is not None:
+            self._contando.add(contador)
+        try:
+            while True:
+                t = self.entrar()
+                try:
+                    item = next(gen)
+                except StopIteration:
+                    return
+                finally:
+                    dur += self.sair(nome, t, chamada=False)
+                n += 1
+                if contador is not None:
+                    self._contando.discard(contador)
+                yield item
+                if contador is not None:
+                    self._contando.add(contador)
+        finally:
+            gen.close()
+            if contador is not None:
+                self._contando.discard(contador)
+                self.contar(contador, n)
+            self.evento(nome, t0, dur, registos=n)
+
+    # ------------- saída -------------
+    def resumo(self):
+        """Tabela de texto: operações por tempo total (desc.) e contadores."""
+        total = ((self.fim or time.perf_counter()) - self.inicio) * 1000
+        linhas = [f"Perfil: {total:.1f} ms no total",
+                  f"{'operação':<44}{'chamadas':>9}{'total ms':>11}{'próprio ms':>12}"]
+        for nome, (n, t, p) in sorted(self.operacoes.items(), key=lambda x: (-x[1][1], x[0])):
+            linhas.append(f"{nome:<44}{n:>9}{t * 1000:>11.2f}{p * 1000:>12.2f}")
+        if self.contadores:
+            linhas.append("")
+            linhas.extend(f"{nome:<44}{n:>9}" for nome, n in sorted(self.contadores.items()))
+        return "\n".join(linhas)
+
+    def trace(self):
+        """Trace JSON (abre em chrome://tracing ou ui.perfetto.dev), com o resumo e os contadores."""
+        return {
+            "traceEvents": self.eventos,
+            "displayTimeUnit": "ms",
+            "operacoes": {nome: {"chamadas": n, "total_ms": round(t * 1000, 3), "proprio_ms": round(p * 1000, 3)}
+                          for nome, (n, t, p) in self.operacoes.items()},
+            "contadores": dict(self.contadores),
+        }
+
+
+def _classes():
+    # (classe, {método: contador}) a instrumentar
+    from .storage import Storage, JournalStorage, ParticionadoStorage
+    from .sqlite_storage import SqliteStorage
+    from .binario import BinarioStorage
+    from .servidor import MemoriaStorage
+    from .service import FinanceService
+    from .reports import Reports
+    from .indices import IndiceIncremental, IndiceGastos, Rollups, IndiceTexto
+    for cls in (Storage, JournalStorage, ParticionadoStorage, SqliteStorage, BinarioStorage, MemoriaStorage):
+        yield cls, METODOS_STORAGE
+    publicos = lambda cls: {n: None for n, f in vars(cls).items() if not n.startswith("_") and isinstance(f, types.FunctionType)}
+    yield FinanceService, publicos(FinanceService)
+    yield Reports, {**publicos(Reports), **dict.fromkeys(METODOS_REPORTS)}
+    for cls in (IndiceIncremental, IndiceGastos, Rollups, IndiceTexto):
+        yield cls, dict.fromkeys(METODOS_INDICES)
+
+
+@contextlib.contextmanager
+def perfilar():
+    """Liga a instrumentação durante o bloco (envolve os métodos e repõe-os no fim). Produz o Perfil."""
+    global ATIVO
+    if ATIVO is not None:  # já ligada (ex.: comando executado dentro de outro)
+        yield ATIVO
+        return
+    perfil = Perfil()
+    originais = []
+    for cls, metodos in _classes():
+        for nome, contador in metodos.items():
+            func = vars(cls).get(nome)
+            if isinstance(func, types.FunctionType):
+                originais.append((cls, nome, func))
+                setattr(cls, nome, perfil.envolver(f"{cls.__name__}.{nome}", func, contador))
+    ATIVO = perfil
+    try:
+        yield perfil
+    finally:
+        ATIVO = None
+        perfil.fim = time.perf_counter()
+        for cls, nome, func in originais:
+            setattr(cls, nome, func)
+
+
+def emitir(perfil, destino=None):
+    #Resumo em stderr, ou o trace JSON no ficheiro `destino`
+    if destino:
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(perfil.trace(), f, ensure_ascii=False)
+        print(f"Perfil gravado em: {destino}", file=sys.stderr)
+    else:
+        print(perfil.resumo(), file=sys.stderr)
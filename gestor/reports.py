@@ -4,115 +4,464 @@
 import os
 import json
 import csv
+import gzip
+from itertools import chain
 from datetime import datetime
 from collections import defaultdict
 from .storage import Storage
+from .models import parse_iso, chave_mes, chave_semana, data_canonica, limites_periodo, filtrar_periodo, MovimentoTable, euros
+from .indices import Rollups, CheckpointAlertas, versao_storage
+
+# colunas (e ordem) de cada tipo de relatório nos ficheiros exportados
+ESQUEMAS = {
+    "totais-por-cat": ("categoria", "despesa", "receita", "saldo"),
+    "cashflow-semanal": ("semana", "receita", "despesa", "saldo"),
+    "top-categorias": ("categoria", "total"),
+    "alertas": ("categoria", "periodo", "referencia", "limite", "gasto", "excesso"),
+    "movimentos": ("id", "data", "tipo", "valor", "categoria", "descricao", "metodo"),
+}
+
+# campos em cêntimos (int) nos resultados e movimentos -> nome com que são exportados/mostrados, em euros
+CENTIMOS = {"valor_cent": "valor", "despesa": "despesa", "receita": "receita", "saldo": "saldo", "total": "total",
+            "limite": "limite", "gasto": "gasto", "excesso": "excesso"}
+
+def em_euros(linha):
+    """Cópia de uma linha (dict) com os campos em cêntimos convertidos para euros (Decimal, ver CENTIMOS)."""
+    return {CENTIMOS.get(k, k): (euros(v) if k in CENTIMOS and v is not None else v) for k, v in linha.items()}
+
+# formato -> extensão
+FORMATOS_EXPORTACAO = {"json": "json", "csv": "csv", "ndjson": "ndjson"}
+
+_SEM_VALOR = object()  # falta na cache (um relatório vazio também é um resultado)
+
+# NumPy é opcional: com ele instalado, os movimentos são agrupados por categoria/semana/mês de forma
+# vetorizada (ver _somas_colunas_np). Só compensa o custo do import a partir de algumas dezenas de milhar
+LIMIAR_NUMPY = 20000
+
+def _numpy(usar=None, n=0):
+    """
+    Módulo numpy para as somas, ou None para as fazer em Python.
+    usar: True (obrigatório), False (nunca) ou None (se estiver instalado e houver pelo menos LIMIAR_NUMPY movimentos).
+    """
+    if usar is False or (usar is None and n < LIMIAR_NUMPY):
+        return None
+    try:
+        import numpy
+    except ImportError:
+        if usar:
+            raise ValueError("Foi pedido o NumPy para os relatórios, mas não está instalado.")
+        return None
+    return numpy
+
+def _somas_colunas(cat, despesa, valores, mes, semana, nomes, chaves, numpy=None):
+    """
+    Somas (em cêntimos) de uma parte dos movimentos (colunas de uma MovimentoTable), já com os nomes descodificados.
+    Retorna {campo de _Agregados: {chave: soma}}; as chaves de gastos_* são (categoria, referência).
+    `numpy`: ver _numpy. Somas de inteiros: o resultado é o mesmo com e sem NumPy, em série ou em paralelo.
+    """
+    np = _numpy(numpy, len(valores))
+    if np is not None:
+        return _somas_colunas_np(np, cat, despesa, valores, mes, semana, nomes, chaves)
+    # uma soma por (tipo, categoria, mês, semana): são poucas combinações, espalhadas depois pelos totais
+    grupos = defaultdict(int)
+    for k, v in zip(zip(despesa, cat, mes, semana), valores):
+        grupos[k] += v
+    return _expandir(grupos.items(), nomes, chaves)
+
+def _somas_colunas_np(np, cat, despesa, valores, mes, semana, nomes, chaves):
+    # como _somas_colunas, com as colunas em arrays NumPy (sem cópia quando são array/memoryview):
+    # os grupos saem de uma ordenação em C e cada um é somado em int64 (np.add.reduceat)
+    cat, mes, semana = (np.asarray(col).astype(np.int64, copy=False) for col in (cat, mes, semana))
+    desp = (np.asarray(despesa) != 0).astype(np.int64)
+    ncat, n = max(len(nomes), 1), max(len(chaves), 1)
+    chave = ((desp * ncat + cat) * n + mes) * n + semana
+    ordem = np.argsort(chave)
+    chave = chave[ordem]
+    valores = np.asarray(valores).astype(np.int64, copy=False)[ordem]
+    grupos = []
+    if len(chave):
+        inicios = np.flatnonzero(np.concatenate(([True], chave[1:] != chave[:-1])))
+        for k, v in zip(chave[inicios].tolist(), np.add.reduceat(valores, inicios).tolist()):
+            k, wk = divmod(k, n)
+            k, ym = divmod(k, n)
+            d, c = divmod(k, ncat)
+            grupos.append(((d, c, ym, wk), v))
+    return _expandir(grupos, nomes, chaves)
+
+def _expandir(grupos, nomes, chaves):
+    # ((despesa, cat, mês, semana), soma) -> somas por campo de _Agregados, com os nomes descodificados
+    rec_cat, des_cat = defaultdict(int), defaultdict(int)
+    rec_sem, des_sem = defaultdict(int), defaultdict(int)
+    g_mes, g_sem = defaultdict(int), defaultdict(int)
+    for (desp, c, ym, wk), v in grupos:
+        c, wk = nomes[c], chaves[wk]
+        if desp:
+            des_cat[c] += v
+            des_sem[wk] += v
+            g_sem[(c, wk)] += v
+            g_mes[(c, chaves[ym])] += v
+        else:
+            rec_cat[c] += v
+            rec_sem[wk] += v
+    return {campo: dict(somas) for campo, somas in (
+        ("rec_cat", rec_cat), ("des_cat", des_cat), ("rec_sem", rec_sem), ("des_sem", des_sem),
+        ("gastos_mensal", g_mes), ("gastos_semanal", g_sem))}
+
+def _somas_tabela(tab, posicoes=None, inicio=0, fim=None, numpy=None):
+    colunas = [tab.cat, tab.despesa, tab.valores, tab.mes, tab.semana]
+    np = _numpy(numpy, len(tab) if posicoes is None else len(posicoes))
+    if np is not None:
+        colunas = [np.asarray(col) for col in colunas]
+        if posicoes is not None:
+            posicoes = np.asarray(posicoes, dtype=np.intp)
+            colunas = [col[posicoes] for col in colunas]
+    elif posicoes is not None:
+        colunas = [[col[i] for i in posicoes] for col in colunas]
+    colunas = [col[inicio:fim] for col in colunas]
+    return _somas_colunas(*colunas, tab.categorias, tab.chaves, numpy=numpy if np is None else True)
+
+def _somas_meses(classe_storage, base_dir, meses, inicio=None, fim=None, numpy=None):
+    # corre num processo à parte: lê só os meses indicados (ParticionadoStorage.iter_meses)
+    storage = classe_storage(base_dir)
+    movs = Reports._filtro_periodo(storage.iter_meses(meses), inicio, fim)
+    return _somas_tabela(MovimentoTable.from_dicts(movs), numpy=numpy)
+
+def _dividir(lista, n):
+    # n fatias contíguas (de tamanhos parecidos) de `lista`, sem fatias vazias
+    return [f for f in (lista[i * len(lista) // n:(i + 1) * len(lista) // n] for i in range(n)) if len(f)]
+
+class _Agregados:
+    # somas (em cêntimos) acumuladas numa passagem: por categoria, por semana e gastos por categoria/mês e categoria/semana
+    def __init__(self, semanas=True, meses=True):
+        self.semanas = semanas
+        self.meses = meses
+        self.rec_cat = defaultdict(int)
+        self.des_cat = defaultdict(int)
+        self.rec_sem = defaultdict(int)
+        self.des_sem = defaultdict(int)
+        self.gastos_mensal  = defaultdict(lambda: defaultdict(int))
+        self.gastos_semanal = defaultdict(lambda: defaultdict(int))
+
+    def somar(self, cat, tipo, data, valor):
+        wk = Reports._isoweek_key(data) if self.semanas else None
+        if tipo == "receita":
+            self.rec_cat[cat] += valor
+            if wk:
+                self.rec_sem[wk] += valor
+        elif tipo == "despesa":
+            self.des_cat[cat] += valor
+            if wk:
+                self.des_sem[wk] += valor
+                self.gastos_semanal[cat][wk] += valor
+            if self.meses:
+                self.gastos_mensal[cat][Reports._yyyymm(data)] += valor
+
+    def somar_mes(self, cat, mes, receita, despesa):
+        # totais já agregados de uma categoria num mês (rollups); só os tipos presentes
+        if receita:
+            self.rec_cat[cat] += receita
+        if despesa:
+            self.des_cat[cat] += despesa
+            self.gastos_mensal[cat][mes] += despesa
+
+    def somar_semana(self, cat, semana, receita, despesa):
+        if receita:
+            self.rec_sem[semana] += receita
+        if despesa:
+            self.des_sem[semana] += despesa
+            self.gastos_semanal[cat][semana] += despesa
+
+    def somar_tabela(self, tab, posicoes=None):
+        # mesma soma que somar(), mas sobre uma MovimentoTable: as chaves já vêm como códigos
+        self.somar_partes([_somas_tabela(tab, posicoes)])
+
+    def somar_partes(self, partes):
+        # junta resultados de _somas_colunas (uma ou várias partes dos movimentos)
+        for parte in partes:
+            for campo in ("rec_cat", "des_cat", "rec_sem", "des_sem"):
+                alvo = getattr(self, campo)
+                for chave, v in parte[campo].items():
+                    alvo[chave] += v
+            for campo in ("gastos_mensal", "gastos_semanal"):
+                alvo = getattr(self, campo)
+                for (cat, ref), v in parte[campo].items():
+                    alvo[cat][ref] += v
 
 class Reports:
-    def __init__(self,storage:Storage):
+    def __init__(self,storage:Storage, usar_rollups=True, jobs=1, numpy=None, cache=False):
         self.storage = storage
+        self.usar_rollups = usar_rollups
+        self.jobs = max(1, int(jobs or 1))  # processos para somar os movimentos (ver _somas_paralelo)
+        self.numpy = numpy  # somas com NumPy: True, False ou None = se instalado e compensar (ver _numpy)
+        # resultados guardados em data/cache/ enquanto os dados não mudarem (ver _em_cache)
+        self.cache = None
+        if cache:
+            from .cache import CacheResultados
+            self.cache = CacheResultados(storage.base_dir)
         self.base_dir = storage.base_dir
-        self.rel_dir = os.path.join(self.base_dir, "relatorios")
-        os.makedirs(self.rel_dir, exist_ok=True)
+        self.rel_dir = os.path.join(self.base_dir, "relatorios")  # criado só ao exportar
+        self._consultas = None  # (versão dos dados, tabela) reutilizada por total_periodo
 
-    @staticmethod
-    def _parse_dt(iso_str):
-         # aceita 'YYYY-MM-DD' ou 'YYYY-MM-DDTHH:MM[:SS]'
-        return datetime.fromisoformat(iso_str.replace("Z", ""))
-    
-    @staticmethod
-    def _yyyymm(iso_str):
-        return Reports._parse_dt(iso_str).strftime("%Y-%m")
-    
-    @staticmethod
-    def _isoweek_key(iso_str):
-        dt = Reports._parse_dt(iso_str)
-        iso_year, iso_week, _ = dt.isocalendar()
-        return f"{iso_year}-W{iso_week:02d}"
-    
-    def _filtro_periodo(self, movs, inicio=None, fim=None):
-        if not inicio and not fim:
-            return movs
-        out = []
-        dt_inicio = self._parse_dt(inicio) if inicio else None
-        dt_fim = self._parse_dt(fim) if fim else None
-        for m in movs:
-            dt = self._parse_dt(m["data"])
-            if dt_inicio and dt < dt_inicio:
-                continue
-            if dt_fim and dt > dt_fim:
-                continue
-            out.append(m)
-        return out
+    # aceitam 'YYYY-MM-DD' ou 'YYYY-MM-DDTHH:MM[:SS]' (ver models: as chaves de mês/semana ficam em cache)
+    _parse_dt = staticmethod(parse_iso)
+    _yyyymm = staticmethod(chave_mes)
+    _isoweek_key = staticmethod(chave_semana)
+    # gerador: filtra à medida que os movimentos chegam (mesma comparação que o FinanceService)
+    _filtro_periodo = staticmethod(filtrar_periodo)
     
     def _load_movs(self, inicio=None, fim=None):
-        movs = self.storage.carregar_movimentos()
+        # leitura em streaming: só os movimentos do período ficam em memória
+        movs = self.storage.iter_movimentos(inicio=inicio, fim=fim)
         return self._filtro_periodo(movs,inicio,fim)
     
+    def _load_tabela(self, inicio=None, fim=None):
+        # (tabela colunar, posições a considerar ou None = todas)
+        if not inicio and not fim:
+            return self.storage.carregar_tabela(), None
+        if getattr(self.storage, "TABELA_EM_MEMORIA", False):
+            # tabela já carregada (modo servidor): o intervalo sai por bisect (ver models.OrdemDatas)
+            tab = self.storage.carregar_tabela()
+            return tab, tab.posicoes(inicio, fim)
+        return MovimentoTable.from_dicts(self._load_movs(inicio, fim)), None
+
+    def _usa_sql(self):
+        # storages com base de dados (SqliteStorage) fazem os filtros e as somas por nós
+        return hasattr(self.storage, "somar_movimentos")
+
+    def _somar(self, por, inicio=None, fim=None, tipo=None, cat=None):
+        # os limites comparam-se como datas (a base de dados refina as pontas, ver somar_movimentos)
+        return self.storage.somar_movimentos(por, inicio=inicio, fim=fim, cat=cat, tipo=tipo)
+
+    def _tabela_consultas(self):
+        # tabela carregada uma vez e reutilizada (com as suas somas acumuladas) enquanto os dados não mudarem
+        if getattr(self.storage, "TABELA_EM_MEMORIA", False) or not hasattr(self.storage, "versao_dados"):
+            return self.storage.carregar_tabela()
+        versao = self.storage.versao_dados()
+        if self._consultas is None or self._consultas[0] != versao:
+            self._consultas = (versao, self.storage.carregar_tabela())
+        return self._consultas[1]
+
+    def _em_cache(self, relatorio, calcular, **params):
+        # resultado guardado para (versão dos dados, relatório, parâmetros); senão calcula-o e guarda-o.
+        # A versão é lida antes de calcular: uma escrita a meio muda-a, e o resultado fica numa chave já sem uso
+        versao = self.storage.versao_dados() if self.cache is not None and hasattr(self.storage, "versao_dados") else None
+        if versao is None:
+            return calcular()
+        chave = ["relatorio", versao, self._assinatura_dados(), relatorio, params]
+        res = self.cache.obter(chave, _SEM_VALOR)
+        if res is _SEM_VALOR:
+            res = calcular()
+            self.cache.guardar(chave, res)
+        return res
+
+    def _assinatura_dados(self):
+        # além da versão: o storage (data/versao.json é o mesmo para todos os storages da pasta) e o
+        # tamanho/data de modificação dos ficheiros de dados (apanha edições feitas à mão)
+        storage = self.storage
+        res = [type(storage).__name__]
+        if hasattr(storage, "base"):  # MemoriaStorage: os dados em memória vêm deste
+            res.append(type(storage.base).__name__)
+        for path in (storage.ficheiros_dados() if hasattr(storage, "ficheiros_dados") else ()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            res.append([os.path.basename(path), st.st_size, st.st_mtime_ns])
+        return res
+
     def _load_orcs(self):
         return self.storage.carregar_orcamentos() if hasattr(self.storage, "carregar_orcamentos") else []
 
-    # ------------- Relatórios -------------
-    def totais_por_cat(self, inicio=None, fim=None):
+    # ------------- Agregação (uma passagem) -------------
+    def _agregar(self, inicio=None, fim=None, semanas=True, meses=True):
         """
-        Soma por categoria separando despesa/receita e calcula saldo.
-        Retorna lista de dicts: {categoria, despesa, receita, saldo}
+        Percorre os movimentos do período UMA vez e acumula todas as somas usadas pelos relatórios.
+        `semanas`/`meses` permitem saltar o cálculo das chaves que o relatório pedido não usa.
         """
-        movs = self._load_movs(inicio, fim)
-        soma_rec = defaultdict(float)
-        soma_des = defaultdict(float)
-        for m in movs:
-            if m["tipo"] == "receita":
-                soma_rec[m["categoria"]] += float(m["valor"])
-            elif m["tipo"] == "despesa":
-                soma_des[m["categoria"]] += float(m["valor"])
-        cats = sorted(set(list(soma_rec.keys()) + list(soma_des.keys())))
+        rollups = self._rollups()
+        if rollups is not None:
+            return self._agregar_rollups(rollups, inicio, fim)
+        ag = _Agregados(semanas=semanas, meses=meses)
+        if self._usa_sql():
+            # a base de dados já devolve somas por categoria/tipo/dia
+            for cat, tipo, dia, total in self._somar(("categoria", "tipo", "dia"), inicio, fim):
+                ag.somar(cat, tipo, dia, total)
+        else:
+            partes = self._somas_paralelo(inicio, fim) if self.jobs > 1 else None
+            ag.somar_partes(partes or [_somas_tabela(*self._load_tabela(inicio, fim), numpy=self.numpy)])
+        return ag
+
+    def _somas_paralelo(self, inicio=None, fim=None):
+        """
+        Somas dos movimentos em `jobs` processos, por intervalos de meses: só no ParticionadoStorage,
+        em que cada processo lê os seus próprios ficheiros. Nos restantes storages o processo principal
+        teria de ler tudo e enviar as colunas aos outros (mais lento que somar em série): retorna None
+        e o cálculo é feito em série, tal como quando não há pelo menos dois grupos de meses.
+        """
+        if not isinstance(self.storage, Storage) or not hasattr(self.storage, "iter_meses"):
+            return None  # (inclui o storage em memória do modo servidor)
+        grupos = _dividir(self.storage.meses(inicio, fim), self.jobs)
+        if len(grupos) < 2:
+            return None
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing: só quando é usado
+        with ProcessPoolExecutor(max_workers=len(grupos)) as ex:
+            futuros = [ex.submit(_somas_meses, type(self.storage), self.base_dir, g, inicio, fim, self.numpy) for g in grupos]
+            return [f.result() for f in futuros]
+
+    def _rollups(self):
+        # rollups (ver indices.Rollups) só se existirem e cobrirem todos os movimentos guardados
+        if not self.usar_rollups or self._usa_sql():
+            return None
+        rollups = Rollups(self.storage)
+        if rollups.ultimo_id == 0:
+            return None
+        versao = versao_storage(self.storage)
+        if versao is not None and rollups.versao == versao:
+            return rollups  # nada foi gravado desde que foram atualizados
+        with self.storage.bloqueio():
+            # outra escrita (ex.: orçamentos, compactação): relidos e confirmados pelos ids. Uma regravação
+            # dos movimentos apaga-os (ver Storage.guardar_movimentos); a versão só é registada por quem os atualiza
+            rollups = Rollups(self.storage)
+            if rollups.ultimo_id == 0 or rollups.ultimo_id != self.storage.proximo_id() - 1:
+                return None
+        return rollups
+
+    def _agregar_rollups(self, rollups, inicio=None, fim=None):
+        """
+        Igual a _agregar, mas com os totais materializados para os meses/semanas inteiramente
+        dentro de [inicio, fim]; só os movimentos dos períodos incompletos nas pontas são lidos.
+        """
+        c_inicio = data_canonica(inicio) if inicio else None
+        c_fim = data_canonica(fim) if fim else None
+
+        def cheio(chave):
+            ini, fi = limites_periodo(chave)
+            return (c_inicio is None or c_inicio <= ini) and (c_fim is None or c_fim >= fi)
+
+        meses = sorted(m for m in rollups.mes if cheio(m))
+        semanas = sorted(w for w in rollups.semana if cheio(w))
+        ag = _Agregados()
+        for m in meses:
+            for cat, (receita, despesa) in rollups.mes[m].items():
+                ag.somar_mes(cat, m, receita, despesa)
+        for w in semanas:
+            for cat, (receita, despesa) in rollups.semana[w].items():
+                ag.somar_semana(cat, w, receita, despesa)
+        if not inicio and not fim:
+            return ag
+
+        # pontas: fora de [cobertura_ini, cobertura_fim], onde mês e semana estão ambos nos rollups
+        cobertura_ini = cobertura_fim = None
+        if meses and semanas:
+            cobertura_ini = max(limites_periodo(meses[0])[0], limites_periodo(semanas[0])[0])
+            cobertura_fim = min(limites_periodo(meses[-1])[1], limites_periodo(semanas[-1])[1])
+        if cobertura_ini is not None and cobertura_ini <= cobertura_fim:
+            pontas = [(inicio, cobertura_ini), (cobertura_fim, fim)]
+        else:
+            cobertura_ini = cobertura_fim = None
+            pontas = [(inicio, fim)]
+        meses, semanas = set(meses), set(semanas)
+        if len(pontas) > 1 and not (hasattr(self.storage, "meses") or getattr(self.storage, "TABELA_EM_MEMORIA", False)):
+            # storages que não saltam dados por data leriam tudo uma vez por ponta: uma só passagem
+            fonte = self._load_movs(inicio, fim)
+        else:
+            fonte = chain.from_iterable(self._load_movs(a, b) for a, b in pontas)
+        for m in fonte:
+            if cobertura_ini is not None and cobertura_ini <= data_canonica(m["data"]) <= cobertura_fim:
+                continue
+            valor = m["valor_cent"]
+            receita = valor if m["tipo"] == "receita" else 0
+            despesa = valor if m["tipo"] == "despesa" else 0
+            mes, semana = self._yyyymm(m["data"]), self._isoweek_key(m["data"])
+            if mes not in meses:
+                ag.somar_mes(m["categoria"], mes, receita, despesa)
+            if semana not in semanas:
+                ag.somar_semana(m["categoria"], semana, receita, despesa)
+        return ag
+
+    @staticmethod
+    def _res_totais(ag):
+        cats = sorted(set(list(ag.rec_cat.keys()) + list(ag.des_cat.keys())))
         res = []
         for c in cats:
-            receita = round(soma_rec[c], 2)
-            despesa = round(soma_des[c], 2)
-            saldo   = round(receita - despesa, 2)
+            receita = ag.rec_cat.get(c, 0)
+            despesa = ag.des_cat.get(c, 0)
+            saldo   = receita - despesa
             res.append({"categoria": c, "despesa": despesa, "receita": receita, "saldo": saldo})
         res.sort(key=lambda x: (-abs(x["saldo"]), x["categoria"]))
         return res
+
+    @staticmethod
+    def _res_cashflow(ag):
+        semanas = sorted(set(list(ag.rec_sem.keys()) + list(ag.des_sem.keys())))
+        res = []
+        for s in semanas:
+            receita = ag.rec_sem.get(s, 0)
+            despesa = ag.des_sem.get(s, 0)
+            saldo   = receita - despesa
+            res.append({"semana": s, "receita": receita, "despesa": despesa, "saldo": saldo})
+        res.sort(key=lambda x: x['semana'])
+        return res
+
+    @staticmethod
+    def _res_top(ag, n, tipo):
+        soma = ag.rec_cat if tipo == "receita" else ag.des_cat if tipo == "despesa" else {}
+        pares = [{'categoria': c, 'total': v} for c, v in soma.items()]
+        # empates por nome: a ordem não depende da ordem em que os movimentos foram somados
+        pares.sort(key=lambda x: (-x['total'], x['categoria']))
+        return pares[: max(0,int(n))]
+
+    @staticmethod
+    def _res_alertas(ag, orcs):
+        res = []
+        for o in orcs:
+            cat = o['categoria']
+            limite = int(o['limite_cent'])
+            periodo = o.get('periodo','mensal')
+            if periodo == 'mensal':
+                gastos = ag.gastos_mensal.get(cat) or {}
+            elif periodo == 'semanal':
+                gastos = ag.gastos_semanal.get(cat) or {}
+            else:
+                continue
+            for ref, valor in gastos.items():
+                if valor > limite:
+                    res.append({
+                        "categoria": cat,
+                        "periodo": periodo,
+                        "referencia": ref,
+                        "limite": limite,
+                        "gasto": valor,
+                        "excesso": valor - limite,
+                    })
+        res.sort(key=lambda x: (-x["excesso"], x["categoria"], x["periodo"], x["referencia"]))
+        return res
+
+    # ------------- Relatórios -------------
+    # (valores em cêntimos; em euros só ao exportar ou mostrar, ver em_euros)
+    def totais_por_cat(self, inicio=None, fim=None):
+        """
+        Soma por categoria separando despesa/receita e calcula saldo.
+        Retorna lista de dicts: {categoria, despesa, receita, saldo}
+        """
+        return self._em_cache("totais-por-cat", lambda: self._res_totais(self._agregar(inicio, fim, semanas=False, meses=False)),
+                              inicio=inicio, fim=fim)
     
     def cashflow_semanal(self, inicio=None, fim=None):
         """
         Agrega por semana ISO (YYYY-Www): receita, despesa e saldo.
         Retorna lista de dicts: {semana, receita, despesa, saldo}
         """
-        movs = self._load_movs(inicio,fim)
-        rec = defaultdict(float)
-        des = defaultdict(float)
-        for m in movs:
-            wk = self._isoweek_key(m['data'])
-            if m["tipo"] == "receita":
-                rec[wk] += float(m["valor"])
-            elif m["tipo"] == "despesa":
-                des[wk] += float(m["valor"])
-        semanas = sorted(set(list(rec.keys()) + list(des.keys())))
-        res = []
-        for s in semanas:
-            receita = round(rec[s], 2)
-            despesa = round(des[s], 2)
-            saldo   = round(receita - despesa, 2)
-            res.append({"semana": s, "receita": receita, "despesa": despesa, "saldo": saldo})
-        res.sort(key=lambda x: x['semana'])
-        return res
+        return self._em_cache("cashflow-semanal", lambda: self._res_cashflow(self._agregar(inicio, fim, meses=False)),
+                              inicio=inicio, fim=fim)
     
     def top_categorias(self, n=5, tipo='despesa', inicio=None, fim=None):
         """
         Top N categorias por soma (por tipo: despesa/receita).
         Retorna lista de dicts: {categoria, total}
         """
-        movs = self._load_movs(inicio,fim)
-        soma = defaultdict(float)
-        for m in movs:
-             if m['tipo'] == tipo:
-                 soma[m['categoria']] += float(m['valor'])
-        pares = [{'categoria': c, 'total': round(v,2)} for c, v in soma.items()]
-        pares.sort(key=lambda x: x['total'], reverse=True)
-        return pares[: max(0,int(n))]
+        return self._em_cache("top-categorias", lambda: self._res_top(self._agregar(inicio, fim, semanas=False, meses=False), n, tipo),
+                              inicio=inicio, fim=fim, n=n, tipo=tipo)
     
     def alertas(self, inicio=None, fim=None):
         """
@@ -120,75 +469,142 @@ class Reports:
         Produz entradas como:
         {categoria, periodo, referencia, limite, gasto, excesso}
         """
-        movs = self._load_movs(inicio, fim)
-        orcs = self._load_orcs()
-        if not orcs:
-            return []
-        
-        gastos_mensal  = defaultdict(lambda: defaultdict(float))
-        gastos_semanal = defaultdict(lambda: defaultdict(float))
+        def calcular():
+            orcs = self._load_orcs()
+            return self._res_alertas(self._agregar(inicio, fim), orcs) if orcs else []
+        return self._em_cache("alertas", calcular, inicio=inicio, fim=fim)
 
-        for m in movs:
-            if m['tipo'] != 'despesa':
-                continue
-            cat = m['categoria']
-            gastos_mensal[cat][self._yyyymm(m['data'])] += float(m['valor'])
-            gastos_semanal[cat][self._isoweek_key(m["data"])] += float(m["valor"])
-
-        res = []
-        for o in orcs:
-            cat = o['categoria']
-            limite = float(o['limite'])
-            periodo = o.get('periodo','mensal')
-            if periodo == 'mensal':
-                for ref, valor in (gastos_mensal.get(cat) or {}).items():
-                    if valor > limite:
-                        res.append({
-                            "categoria": cat,
-                            "periodo": "mensal",
-                            "referencia": ref,
-                            "limite": round(limite, 2),
-                            "gasto": round(valor, 2),
-                            "excesso": round(valor - limite, 2),
-                        })
-            elif periodo == 'semanal':
-                for ref, valor in (gastos_semanal.get(cat) or {}).items():
-                    if valor > limite:
-                        res.append({
-                            "categoria": cat,
-                            "periodo": "semanal",
-                            "referencia": ref,
-                            "limite": round(limite, 2),
-                            "gasto": round(valor, 2),
-                            "excesso": round(valor - limite, 2),
-                        })
-        res.sort(key=lambda x: x["excesso"], reverse=True)
+    def alertas_desde_checkpoint(self):
+        """
+        Modo incremental dos alertas (para correr periodicamente): só os movimentos gravados desde
+        a última chamada são lidos e só os alertas novos ou alterados desde então são devolvidos
+        (mesmo formato que alertas). O estado fica em data/indices/alertas.json (ver CheckpointAlertas);
+        uma mudança de orçamento (add_orcamento) só faz reavaliar a categoria desse orçamento.
+        """
+        with self.storage.bloqueio():
+            checkpoint = CheckpointAlertas(self.storage)
+            if checkpoint.ultimo_id > self.storage.proximo_id() - 1:
+                checkpoint.reconstruir([])  # movimentos regravados (ids reutilizados): recomeçar do zero
+            if hasattr(self.storage, "iter_movimentos_desde"):
+                novos = self.storage.iter_movimentos_desde(checkpoint.ultimo_id)
+            else:
+                novos = (m for m in self.storage.iter_movimentos() if int(m["id"]) > checkpoint.ultimo_id)
+            res = checkpoint.avaliar(novos, self._load_orcs())
+            checkpoint.guardar()
         return res
+
+    def todos(self, inicio=None, fim=None, n=5, tipo='despesa'):
+        """
+        Todos os relatórios numa só passagem pelos movimentos.
+        Retorna dict {tipo de relatório: dados}, com as mesmas chaves usadas na CLI.
+        """
+        def calcular():
+            ag = self._agregar(inicio, fim)
+            orcs = self._load_orcs()
+            return {
+                "totais-por-cat": self._res_totais(ag),
+                "cashflow-semanal": self._res_cashflow(ag),
+                "top-categorias": self._res_top(ag, n, tipo),
+                "alertas": self._res_alertas(ag, orcs) if orcs else [],
+            }
+        return self._em_cache("all", calcular, inicio=inicio, fim=fim, n=n, tipo=tipo)
+
+    def total_periodo(self, inicio=None, fim=None, cat=None, tipo="despesa"):
+        """
+        Total (cêntimos) dos movimentos de `tipo` com data em [inicio, fim], da categoria `cat`
+        ou de todas. Pensado para muitas consultas seguidas com intervalos quaisquer: a primeira
+        carrega a tabela e as somas acumuladas (ver models.SomasAcumuladas), as seguintes são
+        duas pesquisas binárias. No sqlite a soma é feita pela base de dados.
+        """
+        if self._usa_sql():
+            return sum(r[-1] or 0 for r in self._somar(("tipo",), inicio, fim, tipo=tipo, cat=cat))
+        return self._tabela_consultas().total_periodo(inicio, fim, cat=cat, tipo=tipo)
+
+    # exportações já feitas: o mesmo conteúdo no mesmo formato não é regravado (só com cache)
+    def _chave_exportacao(self, dados, tipo_rel, formato, comprimir):
+        if self.cache is None or not isinstance(dados, (list, dict)):
+            return None  # geradores: só se sabe o conteúdo depois de os percorrer
+        return ["exportacao", tipo_rel, formato, bool(comprimir), dados]
+
+    def _exportado(self, chave):
+        # caminho de uma exportação anterior de `chave`, se o ficheiro ainda estiver como foi gravado
+        anterior = self.cache.obter(chave) if chave is not None else None
+        if not anterior:
+            return None
+        try:
+            st = os.stat(anterior["path"])
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (anterior["tamanho"], anterior["mtime_ns"]):
+            return None
+        return anterior["path"]
+
+    def _registar_exportacao(self, chave, path):
+        if chave is not None:
+            st = os.stat(path)
+            self.cache.guardar(chave, {"path": path, "tamanho": st.st_size, "mtime_ns": st.st_mtime_ns})
     
-    def exportar(self, dados, tipo_rel, formato='json', nome=None):
+    def exportar(self, dados, tipo_rel, formato='json', nome=None, comprimir=False):
         """
-        Escreve ficheiro no diretório 'relatorios'.
-        - formato: 'json' ou 'csv'
-        - nome: opcional; se None gera automaticamente.
-        Retorna o caminho do ficheiro criado.
+        Escreve ficheiro no diretório 'relatorios', linha a linha à medida que `dados` é percorrido
+        (pode ser um gerador: memória constante, seja qual for o número de linhas).
+        - formato: 'json' (lista, um registo por linha), 'ndjson' (um objeto JSON por linha) ou 'csv'
+        - colunas: as de ESQUEMAS[tipo_rel] (ordem fixa); para outros tipos, as do primeiro registo
+        - os valores em cêntimos são escritos em euros (ver em_euros)
+        - nome: opcional; se None gera automaticamente. comprimir: gzip (acrescenta '.gz')
+        Retorna o caminho do ficheiro criado (com cache e sem `nome`: o de uma exportação igual anterior, se houver).
         """
+        if formato not in FORMATOS_EXPORTACAO:
+            raise ValueError("Formato de exportação inválido. Use 'json', 'ndjson' ou 'csv'.")
+        chave = self._chave_exportacao(dados, tipo_rel, formato, comprimir)
+        anterior = self._exportado(chave) if nome is None else None
+        if anterior:
+            return anterior
         ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-        ext = 'json' if formato == 'json' else 'csv'
-        fname = nome or f"{tipo_rel}_{ts}.{ext}"
+        fname = nome or f"{tipo_rel}_{ts}.{FORMATOS_EXPORTACAO[formato]}"
+        if comprimir and not fname.endswith(".gz"):
+            fname += ".gz"
         path = os.path.join(self.rel_dir,fname)
+        os.makedirs(self.rel_dir, exist_ok=True)
+
+        linhas = map(em_euros, [dados] if isinstance(dados, dict) else dados)
+        colunas = ESQUEMAS.get(tipo_rel)
+        if colunas is None:
+            primeira = next(linhas, None)
+            colunas = tuple(primeira) if primeira else ()
+            linhas = chain([primeira], linhas) if primeira else linhas
+
+        abrir = gzip.open if comprimir else open
+        with abrir(path, 'wt', newline='', encoding='utf-8') as f:
+            if formato == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(colunas)
+                for r in linhas:
+                    writer.writerow([r.get(c, "") for c in colunas])
+            elif formato == 'ndjson':
+                for r in linhas:
+                    f.write(json.dumps({c: r.get(c) for c in colunas}, ensure_ascii=False, default=float) + "\n")
+            else: #json
+                f.write("[")
+                sep = "\n"
+                for r in linhas:
+                    f.write(sep + json.dumps({c: r.get(c) for c in colunas}, ensure_ascii=False, default=float))
+                    sep = ",\n"
+                f.write("\n]\n")
+        self._registar_exportacao(chave, path)
+        return path
 
-        if formato == 'json':
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, ensure_ascii=False, indent=2)
-        else: #csv
-            rows = dados if isinstance(dados,list) else [dados]
-            headers = set()
-            for r in rows:
-                headers.update(r.keys())
-            headers = list(headers)
-            with open(path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                for r in rows:
-                    writer.writerow(r)
-        return path
\ No newline at end of file
+    def exportar_todos(self, resultados, formato='json', comprimir=False):
+        """
+        Exporta o resultado de todos(): um ficheiro por relatório, com o mesmo carimbo de tempo
+        (os que já foram exportados iguais, com cache, não são regravados).
+        Retorna dict {tipo de relatório: caminho}.
+        """
+        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        ext = FORMATOS_EXPORTACAO.get(formato, formato)
+        return {
+            tipo_rel: self._exportado(self._chave_exportacao(dados, tipo_rel, formato, comprimir))
+                      or self.exportar(dados, tipo_rel=tipo_rel, formato=formato, nome=f"{tipo_rel}_{ts}.{ext}",
+                                       comprimir=comprimir)
+            for tipo_rel, dados in resultados.items()
+        }
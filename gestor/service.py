@@ -1,77 +1,192 @@
 #gestor/service.py
-from .models import Movimento, TipoMovimento, Orcamento
+from .models import Movimento, TipoMovimento, Orcamento, chave_mes, chave_semana, filtrar_periodo
 from .storage import Storage
+from .indices import IndiceGastos, IndiceTexto, INDICES, contem_texto, relevancia
 from datetime import datetime
 
-def _yyyymm(date_iso):
-    # extrai 'YYYY-MM' do ISO (suporta 'YYYY-MM-DD' e 'YYYY-MM-DDTHH:MM:SS')
-    return datetime.fromisoformat(date_iso.replace("Z","")).strftime("%Y-%m")
+# extrai 'YYYY-MM' / 'YYYY-Www' do ISO (suporta 'YYYY-MM-DD' e 'YYYY-MM-DDTHH:MM:SS')
+_yyyymm = chave_mes
+_isoweek_key = chave_semana
 
-def _isoweek_key(date_iso):
-    dt = datetime.fromisoformat(date_iso.replace("Z",""))
-    iso_year, iso_week, _ = dt.isocalendar()  # ISO: semana começa à segunda
-    return f"{iso_year}-W{iso_week:02d}"
+def _alerta(orc, periodo, ref, gasto):
+    # orçamento excedido; limite, gasto e excesso em cêntimos
+    return {
+        "categoria": orc.categoria,
+        "periodo": periodo,
+        "limite": orc.limite_cent,
+        "gasto": gasto,
+        "excesso": gasto - orc.limite_cent,
+        "referencia": ref,
+    }
 
 class FinanceService:
     def __init__(self,storage):
         self.storage = storage
+        self._indices = None
+        self._reescrita = None  # versao_reescrita do storage quando os índices foram carregados
+        self._reports = None  # para total_periodo (mantém a tabela e as somas acumuladas entre consultas)
     
-    def add_movimento(self,tipo,valor,categoria,descricao="",metodo_pagamento="",data_iso=None):
-        novo_id = self.storage.proximo_id()
+    def add_movimento(self,tipo,valor_cent,categoria,descricao="",metodo_pagamento="",data_iso=None):
         if data_iso is None:
             data_iso = datetime.now().isoformat(timespec="seconds")
 
-        mov = Movimento(novo_id,tipo,valor,categoria,descricao,metodo_pagamento,data_iso)
-        mov.validar()
+        #Bloqueio: outro processo/thread nao pode atribuir o mesmo id entre proximo_id e a escrita
+        with self.storage.bloqueio():
+            novo_id = self.storage.proximo_id()
+            mov = Movimento(novo_id,tipo,valor_cent,categoria,descricao,metodo_pagamento,data_iso)
+            mov.validar()
 
-        movimentos = self.storage.carregar_movimentos()
-        movimentos.append(mov.to_dict())
-        self.storage.guardar_movimentos(movimentos)
+            indices = self.indices(ultimo_id=novo_id - 1)
+            self.storage.adicionar_movimento(mov.to_dict())
+            for indice in indices.values():
+                indice.registar(mov.to_dict())
+                indice.guardar()
+            gastos = indices[IndiceGastos.NOME]
+        self.storage.sincronizar()
 
         alerta = None
         if mov.tipo == TipoMovimento.DESPESA:
-            alerta = self.verificar_overspend(mov)
+            alerta = self.verificar_overspend(mov, gastos)
 
         return mov, alerta
 
+    def add_movimentos_bulk(self, registos):
+        """
+        Adiciona vários movimentos de uma vez (ex.: importação de extratos).
+        `registos`: lista de dicts com os argumentos de add_movimento (tipo, valor_cent, categoria, ...).
+        Valida tudo antes de gravar; os ids são atribuídos em bloco e o storage é escrito uma vez.
+        Retorna (movimentos, alertas), com um alerta por orçamento/período excedido pelo lote.
+        """
+        agora = datetime.now().isoformat(timespec="seconds")
+        with self.storage.bloqueio():
+            primeiro_id = self.storage.proximo_id()
+            movs = []
+            for n, r in enumerate(registos):
+                try:
+                    mov = Movimento(primeiro_id + n, r.get("tipo", "despesa"), r["valor_cent"], r.get("categoria", ""),
+                                    r.get("descricao", ""), r.get("metodo_pagamento", ""), r.get("data_iso") or agora)
+                    mov.validar()
+                except ValueError as e:
+                    raise ValueError(f"Registo {n + 1}: {e}") from e
+                movs.append(mov)
+            if not movs:
+                return [], []
+
+            dicts = [m.to_dict() for m in movs]
+            indices = self.indices(ultimo_id=primeiro_id - 1)
+            self.storage.adicionar_movimentos(dicts)
+            # uma passagem pelo lote: atualizar os índices e recolher os períodos tocados por despesas
+            tocados = {}
+            for m, d in zip(movs, dicts):
+                for indice in indices.values():
+                    indice.registar(d)
+                if m.tipo == TipoMovimento.DESPESA:
+                    tocados.setdefault(m.categoria, set()).update({("mensal", m.mes), ("semanal", m.semana)})
+            for indice in indices.values():
+                indice.guardar()
+            gastos = indices[IndiceGastos.NOME]
+        self.storage.sincronizar()
+
+        alertas = []
+        for orc in self.listar_orcamentos():
+            for periodo, ref in sorted(tocados.get(orc.categoria, ())):
+                if periodo != orc.periodo:
+                    continue
+                gasto = gastos.gasto(orc.categoria, periodo, ref)
+                if gasto > orc.limite_cent:
+                    alertas.append(_alerta(orc, periodo, ref, gasto))
+        return movs, alertas
+
     def listar(self):
-        #Carregar dicionarios e converter para objeto Movimento
-        return [Movimento.from_dict(d) for d in self.storage.carregar_movimentos()]
+        #Objetos Movimento construidos a partir das colunas da tabela (sem passar por um dict por registo)
+        return self.tabela().movimentos()
     
-    def listar_filtrado(self, inicio=None, fim=None, cat=None, tipo=None, texto=None):
-        movs = self.listar()
-        res = []
-        for m in movs:
-            if inicio and m.data_iso < inicio:
-                continue
-            if fim and m.data_iso > fim:
-                continue
-            if cat and m.categoria != cat:
-                continue
-            if tipo and m.tipo.value != tipo:
+    def tabela(self):
+        #Todos os movimentos em formato colunar (MovimentoTable)
+        return self.storage.carregar_tabela()
+
+    def total_periodo(self, inicio=None, fim=None, cat=None, tipo="despesa"):
+        """Total (cêntimos) de `tipo` em [inicio, fim], da categoria `cat` ou de todas (ver Reports.total_periodo)."""
+        if self._reports is None:
+            from .reports import Reports
+            self._reports = Reports(self.storage)
+        return self._reports.total_periodo(inicio, fim, cat=cat, tipo=tipo)
+
+    def iter_filtrado(self, inicio=None, fim=None, cat=None, tipo=None, texto=None):
+        """
+        Gerador com os movimentos que passam os filtros. Os registos são lidos do storage
+        um a um e só os que passam viram Movimento (memória limitada, resultados imediatos).
+        As datas comparam-se como nos relatórios (models.filtrar_periodo), não como texto.
+        `texto` é procurado na descrição, categoria e método de pagamento (sem distinguir maiúsculas);
+        com o índice de texto, só os movimentos candidatos são comparados. Só são lidos os candidatos
+        no sqlite (pelos ids) e no particionado (só os meses que os podem conter, iter_movimentos_ids);
+        nos restantes os movimentos são todos lidos, e o índice poupa apenas a comparação do texto.
+        """
+        texto = texto.lower() if texto else None
+        candidatos, indexados = None, 0
+        if texto:
+            # ids acima de indice.ultimo_id (ainda não indexados) são sempre comparados
+            indice = IndiceTexto(self.storage)
+            candidatos, indexados = indice.candidatos(texto), indice.ultimo_id
+        if hasattr(self.storage, "consultar_movimentos"):
+            # a base de dados filtra por data/categoria/tipo usando os índices (e pelos candidatos do texto)
+            ids = None
+            if candidatos is not None:
+                ids = candidatos | set(range(indexados + 1, self.storage.proximo_id()))
+                if len(ids) > self.storage.MAX_IDS:
+                    ids = None
+            # a base de dados compara texto: alarga-se aos dias inteiros e a comparação exata é feita abaixo
+            fonte = self.storage.consultar_movimentos(inicio=inicio[:10] if inicio else None,
+                                                      fim=(fim[:10] + "\uffff") if fim else None,
+                                                      cat=cat, tipo=tipo, ids=ids)
+        elif candidatos is not None and hasattr(self.storage, "iter_movimentos_ids"):
+            ids = candidatos | set(range(indexados + 1, self.storage.proximo_id()))
+            fonte = self.storage.iter_movimentos_ids(ids, inicio=inicio, fim=fim)
+        else:
+            fonte = self.storage.iter_movimentos(inicio=inicio, fim=fim)
+        for d in filtrar_periodo(fonte, inicio, fim):
+            if cat and d.get("categoria", "").strip() != cat:
                 continue
-            if texto and (texto.lower() not in (m.descricao or "").lower()):
+            if tipo and d.get("tipo", "despesa") != tipo:
                 continue
-            res.append(m)
+            if texto:
+                if candidatos is not None and int(d["id"]) <= indexados and int(d["id"]) not in candidatos:
+                    continue
+                if not contem_texto(d, texto):
+                    continue
+            yield Movimento.from_dict(d)
+
+    def pesquisar(self, texto, inicio=None, fim=None, cat=None, tipo=None):
+        """
+        Como iter_filtrado com `texto`, mas ordenado por relevância (ver indices.relevancia).
+        Retorna lista de (pontuação, Movimento), da mais relevante para a menos.
+        """
+        encontrados = self.iter_filtrado(inicio=inicio, fim=fim, cat=cat, tipo=tipo, texto=texto)
+        res = [(relevancia(m.to_dict(), texto.lower()), m) for m in encontrados]
+        res.sort(key=lambda x: (-x[0], x[1].id))
         return res
+
+    def listar_filtrado(self, inicio=None, fim=None, cat=None, tipo=None, texto=None):
+        return list(self.iter_filtrado(inicio=inicio, fim=fim, cat=cat, tipo=tipo, texto=texto))
     
-    def add_orcamento(self,categoria, limite, periodo="mensal"):
-        novo_id = self.storage.proximo_id_orcamento()
-        orc = Orcamento(novo_id,categoria,limite,periodo)
-        orc.validar()
-
-        orcs = self.storage.carregar_orcamentos()
-        updated = False
-        for o in orcs:
-            if o.get("categoria") == orc.categoria and o.get("periodo") == orc.periodo:
-                o["limite"] = orc.limite
-                updated = True
-                break
-
-        if not updated:
-            orcs.append(orc.to_dict())
-
-        self.storage.guardar_orcamentos(orcs)
+    def add_orcamento(self,categoria, limite_cent, periodo="mensal"):
+        with self.storage.bloqueio():
+            novo_id = self.storage.proximo_id_orcamento()
+            orc = Orcamento(novo_id,categoria,limite_cent,periodo)
+            orc.validar()
+
+            orcs = self.storage.carregar_orcamentos()
+            updated = False
+            for o in orcs:
+                if o.get("categoria") == orc.categoria and o.get("periodo") == orc.periodo:
+                    o["limite_cent"] = orc.limite_cent
+                    updated = True
+                    break
+
+            if not updated:
+                orcs.append(orc.to_dict())
+
+            self.storage.guardar_orcamentos(orcs)
         return orc, ("atualizado" if updated else "criado")
     
     def listar_orcamentos(self, periodo=None):
@@ -80,11 +195,78 @@ class FinanceService:
             orcs = [o for o in orcs if o.periodo == periodo]
         return orcs
     
-    def verificar_overspend(self, movimento: Movimento):
+    def indices(self, ultimo_id=None):
+        """
+        Índices incrementais (ver indices.INDICES), por nome.
+        Os que não correspondem aos movimentos guardados (até `ultimo_id`) são relidos do disco
+        (outro processo pode tê-los atualizado) e, se continuarem desatualizados, reconstruídos.
+        Depois de os movimentos serem regravados (versao_reescrita diferente) são todos relidos:
+        o ultimo_id pode coincidir com movimentos editados ou removidos.
+        """
+        if ultimo_id is None:
+            ultimo_id = self.storage.proximo_id() - 1
+        reescrita = self.storage.versao_reescrita() if hasattr(self.storage, "versao_reescrita") else None
+        if self._indices is None or reescrita != self._reescrita:
+            self._indices = {cls.NOME: cls(self.storage) for cls in INDICES}
+            self._reescrita = reescrita
+        for nome, indice in list(self._indices.items()):
+            if indice.ultimo_id != ultimo_id:
+                self._indices[nome] = type(indice)(self.storage)
+        desatualizados = [i for i in self._indices.values() if i.ultimo_id != ultimo_id]
+        if desatualizados:
+            # sob o bloqueio: uma regravação a meio não pode ficar com índices dos dados antigos
+            with self.storage.bloqueio():
+                movimentos = self.storage.carregar_movimentos()
+                for indice in desatualizados:
+                    indice.reconstruir(movimentos)
+                    indice.guardar()
+        return self._indices
+
+    def indice_gastos(self, ultimo_id=None):
+        """Índice de gastos por categoria/mês e categoria/semana (ver IndiceGastos)."""
+        return self.indices(ultimo_id)[IndiceGastos.NOME]
+
+    def reconstruir_indices(self):
+        with self.storage.bloqueio():
+            self._indices = {cls.NOME: cls(self.storage) for cls in INDICES}
+            self._reescrita = self.storage.versao_reescrita() if hasattr(self.storage, "versao_reescrita") else None
+            movimentos = self.storage.carregar_movimentos()
+            for indice in self._indices.values():
+                indice.reconstruir(movimentos)
+                indice.guardar()
+
+    def verificar_overspend(self, movimento: Movimento, gastos=None):
         """
         Verifica se a despesa excede o orçamento 'mensal' ou 'semanal' da categoria do movimento.
         Retorna None se não houver orçamento ou não excedeu.
-        Caso exceda, retorna dict com detalhes: {categoria, periodo, limite, gasto, excesso}.
+        Caso exceda, retorna dict com detalhes: {categoria, periodo, limite, gasto, excesso} (em cêntimos).
+        Os gastos vêm do índice incremental `gastos` (por omissão, self.indice_gastos()).
+        """
+        if movimento.tipo != TipoMovimento.DESPESA:
+            return None
+
+        orcs = [o for o in self.listar_orcamentos() if o.categoria == movimento.categoria]
+        if not orcs:
+            return None
+
+        if gastos is None:
+            gastos = self.indice_gastos()
+        refs = {"mensal": _yyyymm(movimento.data_iso), "semanal": _isoweek_key(movimento.data_iso)}
+
+        alerta_encontrado = None
+        for orc in orcs:
+            if orc.periodo not in refs:
+                continue
+            ref = refs[orc.periodo]
+            gasto = gastos.gasto(orc.categoria, orc.periodo, ref)
+            if gasto > orc.limite_cent:
+                alerta_encontrado = _alerta(orc, orc.periodo, ref, gasto)
+        return alerta_encontrado
+
+    def verificar_overspend_completo(self, movimento: Movimento):
+        """
+        Mesmo resultado que verificar_overspend, mas percorrendo todos os movimentos
+        (sem índice). Serve de referência para validar o índice.
         """
         if movimento.tipo != TipoMovimento.DESPESA:
             return None
@@ -93,43 +275,22 @@ class FinanceService:
         if not orcs:
             return None
         
-        movs = self.listar()
-
-        ref_mes = _yyyymm(movimento.data_iso)
-        ref_sem = _isoweek_key(movimento.data_iso)
+        # somas sobre as colunas da tabela: só as despesas da categoria, comparando o código do mês/semana
+        tab = self.tabela()
+        posicoes = tab.posicoes(cat=movimento.categoria, tipo=TipoMovimento.DESPESA.value)
+        chaves, valores = {k: i for i, k in enumerate(tab.chaves)}, tab.valores
+        refs = {"mensal": _yyyymm(movimento.data_iso), "semanal": _isoweek_key(movimento.data_iso)}
 
         alerta_encontrado = None
 
         for orc in orcs:
-            if orc.periodo == "mensal":
-                # soma despesas da MESMA categoria e MESMO YYYY-MM
-                gasto = 0.0
-                for m in movs:
-                    if m.tipo == TipoMovimento.DESPESA and m.categoria == orc.categoria and _yyyymm(m.data_iso) == ref_mes:
-                        gasto += m.valor
-                if gasto > orc.limite:
-                    alerta_encontrado = {
-                        "categoria": orc.categoria,
-                        "periodo": "mensal",
-                        "limite": orc.limite,
-                        "gasto": round(gasto, 2),
-                        "excesso": round(gasto - orc.limite, 2),
-                        "referencia": ref_mes,
-                    }
-            elif orc.periodo == "semanal":
-                # soma despesas da MESMA categoria e MESMA SEMANA ISO (YYYY-Www)
-                gasto = 0.0
-                for m in movs:
-                    if m.tipo == TipoMovimento.DESPESA and m.categoria == orc.categoria and _isoweek_key(m.data_iso) == ref_sem:
-                        gasto += m.valor
-                if gasto > orc.limite:
-                    alerta_encontrado = {
-                        "categoria": orc.categoria,
-                        "periodo": "semanal",
-                        "limite": orc.limite,
-                        "gasto": round(gasto, 2),
-                        "excesso": round(gasto - orc.limite, 2),
-                        "referencia": ref_sem,  
-                    }
+            if orc.periodo not in refs:
+                continue
+            # mesmo YYYY-MM (mensal) ou mesma semana ISO YYYY-Www (semanal)
+            ref = refs[orc.periodo]
+            col, cod = (tab.mes if orc.periodo == "mensal" else tab.semana), chaves.get(ref, -1)
+            gasto = sum(valores[i] for i in posicoes if col[i] == cod)
+            if gasto > orc.limite_cent:
+                alerta_encontrado = _alerta(orc, orc.periodo, ref, gasto)
 
         return alerta_encontrado
\ No newline at end of file
@@ -0,0 +1,284 @@
+#gestor/servidor.py
+#Modo servidor (gestor serve): os dados ficam carregados em memoria e os comandos da CLI
+#sao enviados por socket local. As escritas em disco sao agrupadas e feitas em lote.
+import asyncio
+import contextlib
+import io
+import json
+import os
+import secrets
+import signal
+from .models import MovimentoTable
+from .cliente import FICHEIRO_SERVIDOR
+
+
+class MemoriaStorage:
+    """
+    Storage com os dados em memória à frente de outro storage (o "real").
+
+    Leituras são servidas da memória. Os movimentos e orçamentos são gravados logo no storage
+    real (sob o bloqueio dele, por isso os ids atribuídos são definitivos), mas sem esperar pelo
+    fsync; o fsync (sincronizar) e a gravação dos índices ficam pendentes até flush(), feito em lote.
+    """
+
+    # a tabela colunar está sempre carregada: os relatórios filtram por bisect em vez de reler movimentos
+    TABELA_EM_MEMORIA = True
+
+    def __init__(self, storage):
+        self.base = storage
+        self.base_dir = storage.base_dir
+        self.indices = {}
+        self._indices_sujos = {}  # nome -> True, pela ordem em que foram gravados
+        self._por_sincronizar = False
+        with storage.bloqueio():
+            self._recarregar()
+
+    def _recarregar(self):
+        # tudo a partir do storage real (sob o bloqueio dele)
+        self.movimentos = self.base.carregar_movimentos()
+        self.orcamentos = self.base.carregar_orcamentos()
+        self.tabela = MovimentoTable.from_dicts(self.movimentos)
+        self.ultimo_id = max((int(d["id"]) for d in self.movimentos), default=0)
+        self._versoes_base = self._ler_versoes_base()
+
+    def _ler_versoes_base(self):
+        # (versao_dados, versao_reescrita) do storage real: dizem se outro processo gravou, e o quê
+        if not hasattr(self.base, "versao_dados"):
+            return None
+        return self.base.versao_dados(), self.base.versao_reescrita()
+
+    # ------------- leitura (memória) -------------
+    def carregar_movimentos(self):
+        return list(self.movimentos)
+
+    def iter_movimentos(self, inicio=None, fim=None):
+        if not inicio and not fim:
+            return iter(list(self.movimentos))
+        # só as posições do intervalo (bisect na ordem por data da tabela)
+        movimentos = self.movimentos
+        return iter([movimentos[i] for i in self.tabela.posicoes(inicio, fim)])
+
+    def iter_movimentos_desde(self, ultimo_id):
+        # os movimentos estão pela ordem dos ids: só o fim da lista
+        movimentos = self.movimentos
+        i = len(movimentos)
+        while i and int(movimentos[i - 1]["id"]) > ultimo_id:
+            i -= 1
+        return iter(movimentos[i:])
+
+    def carregar_tabela(self):
+        return self.tabela
+
+    def carregar_orcamentos(self):
+        return [dict(o) for o in self.orcamentos]
+
+    def proximo_id(self):
+        return self.ultimo_id + 1
+
+    def proximo_id_orcamento(self):
+        return max((int(o["id"]) for o in self.orcamentos), default=0) + 1
+
+    def carregar_indice(self, nome):
+        if nome not in self.indices:
+            self.indices[nome] = self.base.carregar_indice(nome)
+        return self.indices[nome]
+
+    def versao_dados(self):
+        return self.base.versao_dados() if hasattr(self.base, "versao_dados") else None
+
+    def versao_movimentos(self):
+        return self.base.versao_movimentos() if hasattr(self.base, "versao_movimentos") else None
+
+    def versao_reescrita(self):
+        return self.base.versao_reescrita() if hasattr(self.base, "versao_reescrita") else None
+
+    def iter_indice_diario(self, nome):
+        # o diário em disco só conta enquanto o índice não for regravado em memória
+        if nome in self._indices_sujos or not hasattr(self.base, "iter_indice_diario"):
+            return iter(())
+        return self.base.iter_indice_diario(nome)
+
+    # ------------- escrita (no storage real; fsync e índices no flush) -------------
+    def adicionar_movimento(self, movimento_dict):
+        self.adicionar_movimentos([movimento_dict])
+
+    def adicionar_movimentos(self, lista):
+        with self.bloqueio():
+            self.base.adicionar_movimentos(lista)
+            self.movimentos.extend(lista)
+            self.tabela.extend(lista)
+            self.ultimo_id = max([self.ultimo_id] + [int(d["id"]) for d in lista])
+            self._gravado()
+
+    def guardar_movimentos(self, movimentos_lista):
+        with self.bloqueio():
+            self.base.guardar_movimentos(movimentos_lista)  # apaga os índices do storage real
+            self.movimentos = list(movimentos_lista)
+            self.tabela = MovimentoTable.from_dicts(self.movimentos)
+            self.ultimo_id = max((int(d["id"]) for d in self.movimentos), default=0)
+            self.indices = {}
+            self._indices_sujos = {}
+            self._gravado()
+
+    def guardar_orcamentos(self, orcamento_lista):
+        with self.bloqueio():
+            self.base.guardar_orcamentos(orcamento_lista)
+            self.orcamentos = [dict(o) for o in orcamento_lista]
+            self._gravado()
+
+    def _gravado(self):
+        # escrita própria no storage real: não é uma alteração "de fora" (ver _sincronizar_base)
+        self._versoes_base = self._ler_versoes_base()
+        self._por_sincronizar = True
+
+    def guardar_indice(self, nome, dados):
+        self.indices[nome] = dados
+        self._indices_sujos.pop(nome, None)
+        self._indices_sujos[nome] = True
+
+    @contextlib.contextmanager
+    def bloqueio(self):
+        # o storage real fica bloqueado enquanto se atribuem ids e grava: outro processo (ex.: a CLI
+        # com GESTOR_SEM_SERVIDOR=1) pode estar a escrever na mesma pasta
+        with self.base.bloqueio():
+            self._sincronizar_base()
+            yield
+
+    def atualizar(self):
+        """Traz para a memória o que outro processo gravou entretanto (o servidor chama-o antes de cada comando)."""
+        with self.bloqueio():
+            pass
+
+    def _sincronizar_base(self):
+        """
+        Traz para a memória o que outro processo gravou no storage real desde a última leitura
+        ou escrita (chamado sob o bloqueio do storage real). Movimentos acrescentados são lidos
+        a partir do último id conhecido; uma regravação (movimentos editados ou removidos, ex.:
+        migrar) obriga a reler tudo e descarta os índices em memória.
+        """
+        versoes = self._ler_versoes_base()
+        if versoes is None or versoes == self._versoes_base:
+            return
+        if self._versoes_base is None or versoes[1] != self._versoes_base[1]:
+            self._recarregar()
+            self.indices = {}
+            self._indices_sujos = {}
+            return
+        externos = list(self.base.iter_movimentos_desde(self.ultimo_id))
+        if externos:
+            self.movimentos.extend(externos)
+            self.tabela.extend(externos)
+            self.ultimo_id = max(int(d["id"]) for d in externos)
+            self.indices = {}  # relidos do storage real (ou reconstruídos) na próxima utilização
+            self._indices_sujos = {}
+        self.orcamentos = self.base.carregar_orcamentos()
+        self._versoes_base = versoes
+
+    def sincronizar(self):
+        pass
+
+    def pendente(self):
+        return bool(self._por_sincronizar or self._indices_sujos)
+
+    def flush(self):
+        #fsync das escritas feitas desde o ultimo flush e gravacao dos indices alterados em memoria
+        if self._por_sincronizar:
+            self._por_sincronizar = False
+            self.base.sincronizar()
+        with self.bloqueio():
+            # pela ordem de gravação (ex.: IndiceTexto grava as palavras antes do ultimo_id)
+            for nome in self._indices_sujos:
+                self.base.guardar_indice(nome, self.indices[nome])
+            self._indices_sujos = {}
+
+
+class Servidor:
+    """
+    Servidor asyncio em 127.0.0.1. Protocolo: uma linha JSON por pedido
+    {"token": ..., "argv": [...]} e uma linha JSON de resposta {"saida": str, "erro": str|null, "codigo": int}.
+    """
+
+    def __init__(self, service, executar, porta=0, atraso_escrita=0.2):
+        self.service = service
+        self.storage = service.storage
+        self.executar = executar  # função(argv) que corre um comando da CLI
+        self.porta = porta
+        self.atraso_escrita = atraso_escrita
+        self.token = secrets.token_hex(16)
+        self.info_path = os.path.join(self.storage.base_dir, FICHEIRO_SERVIDOR)
+        self._flush_agendado = None
+        self._loop = None
+        self._parar = None
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                resposta = self._processar(linha)
+                writer.write((json.dumps(resposta, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _processar(self, linha):
+        try:
+            pedido = json.loads(linha)
+        except ValueError:
+            return {"saida": "", "erro": "Pedido inválido.", "codigo": 2}
+        if pedido.get("token") != self.token:
+            return {"saida": "", "erro": "Token inválido.", "codigo": 2}
+        saida, erros, codigo = io.StringIO(), io.StringIO(), 0
+        with contextlib.redirect_stdout(saida), contextlib.redirect_stderr(erros):
+            try:
+                if hasattr(self.storage, "atualizar"):
+                    self.storage.atualizar()  # escritas de outros processos (ex.: GESTOR_SEM_SERVIDOR=1)
+                self.executar(pedido.get("argv") or [])
+            except SystemExit as e:  # argparse (--help, argumentos inválidos)
+                codigo = e.code if isinstance(e.code, int) else 2
+            except Exception as e:
+                print(f"Erro: {e}", file=erros)
+                codigo = 1
+        self._agendar_flush()
+        return {"saida": saida.getvalue(), "erro": erros.getvalue() or None, "codigo": codigo}
+
+    def _agendar_flush(self):
+        # várias escritas seguidas dentro de `atraso_escrita` segundos são gravadas juntas
+        if self.storage.pendente() and self._flush_agendado is None:
+            self._flush_agendado = asyncio.get_running_loop().call_later(self.atraso_escrita, self._flush)
+
+    def _flush(self):
+        self._flush_agendado = None
+        self.storage.flush()
+
+    async def correr(self):
+        server = await asyncio.start_server(self._atender, "127.0.0.1", self.porta)
+        self.porta = server.sockets[0].getsockname()[1]
+        self._loop = asyncio.get_running_loop()
+        self._parar = asyncio.Event()
+        # só o dono pode ler o token (0600)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.info_path)
+        fd = os.open(self.info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump({"porta": self.porta, "pid": os.getpid(), "token": self.token}, f)
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            # só possível na thread principal e em sistemas POSIX
+            with contextlib.suppress(NotImplementedError, AttributeError, RuntimeError, ValueError):
+                self._loop.add_signal_handler(sinal, self._parar.set)
+        print(f"Servidor a escutar em 127.0.0.1:{self.porta} (Ctrl+C para parar)", flush=True)
+        try:
+            async with server:
+                await self._parar.wait()
+        finally:
+            if self._flush_agendado is not None:
+                self._flush_agendado.cancel()
+            self.storage.flush()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.info_path)
+
+    def parar(self):
+        #Pode ser chamado de outra thread
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._parar.set)
@@ -0,0 +1,250 @@
+#gestor/sqlite_storage.py
+#Alternativa ao Storage em JSON: guarda movimentos e orcamentos numa base de dados SQLite
+#com indices em data, categoria e tipo, para os filtros e somas serem feitos pela base de dados.
+import os
+import sqlite3
+from datetime import date, timedelta
+from .storage import Storage, em_centimos
+from .models import filtrar_periodo, data_canonica
+
+COLUNAS_MOV = ("id", "tipo", "data", "valor_cent", "categoria", "descricao", "metodo")
+COLUNAS_ORC = ("id", "categoria", "limite_cent", "periodo")
+
+# colunas pelas quais se pode agrupar em somar_movimentos ('dia' = YYYY-MM-DD), e o mesmo num dict
+AGRUPAMENTOS = {
+    "categoria": "categoria",
+    "tipo": "tipo",
+    "dia": "substr(data, 1, 10)",
+}
+_CHAVES_DICT = {
+    "categoria": lambda d: d["categoria"],
+    "tipo": lambda d: d["tipo"],
+    "dia": lambda d: d["data"][:10],
+}
+
+def _dia_seguinte(dia):
+    return (date.fromisoformat(dia) + timedelta(days=1)).isoformat()
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS movimentos (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    data TEXT NOT NULL,
+    valor_cent INTEGER NOT NULL,
+    categoria TEXT NOT NULL,
+    descricao TEXT NOT NULL DEFAULT '',
+    metodo TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_mov_data ON movimentos(data);
+CREATE INDEX IF NOT EXISTS idx_mov_categoria ON movimentos(categoria, data);
+CREATE INDEX IF NOT EXISTS idx_mov_tipo ON movimentos(tipo, data);
+CREATE TABLE IF NOT EXISTS orcamentos (
+    id INTEGER PRIMARY KEY,
+    categoria TEXT NOT NULL,
+    limite_cent INTEGER NOT NULL,
+    periodo TEXT NOT NULL DEFAULT 'mensal'
+);
+"""
+
+
+class SqliteStorage(Storage):
+    """
+    Mesma API do Storage (carregar_*/guardar_*/proximo_id*), mas em data/gestor.db.
+
+    Na primeira utilização, se existirem data/movimentos.json e data/orcamentos.json,
+    o conteúdo é importado automaticamente (migração única). Uma base de dados com os
+    valores em euros (colunas valor/limite) é convertida para cêntimos ao abrir.
+    """
+
+    def __init__(self, base_dir):
+        super().__init__(base_dir)
+        self.db_path = os.path.join(self.base_dir, "gestor.db")
+        nova = not os.path.exists(self.db_path)
+        self.con = sqlite3.connect(self.db_path)
+        self.con.row_factory = sqlite3.Row
+        if nova:
+            self.con.executescript(ESQUEMA)
+            self.importar_json()
+        else:
+            self.migrar_centimos()
+
+    def ficheiros_dados(self):
+        return [self.db_path, self.db_path + "-wal"]
+
+    def importar_json(self):
+        #Copia os ficheiros JSON (se existirem) para a base de dados, substituindo o conteudo (em euros: convertido)
+        json_storage = Storage(self.base_dir)
+        self.guardar_movimentos([em_centimos(d, "valor") or d for d in json_storage.carregar_movimentos()])
+        self.guardar_orcamentos([em_centimos(o, "limite") or o for o in json_storage.carregar_orcamentos()])
+
+    def migrar_centimos(self):
+        #Tabelas com as colunas em euros (valor/limite REAL) sao recriadas em centimos, numa so transacao
+        antigas = {t: [dict(r) for r in self.con.execute(f"SELECT * FROM {t} ORDER BY id")]
+                   for t, campo in (("movimentos", "valor"), ("orcamentos", "limite"))
+                   if campo in {r["name"] for r in self.con.execute(f"PRAGMA table_info({t})")}}
+        if not antigas:
+            self.con.executescript(ESQUEMA)  # (base de dados apagada ou sem tabelas)
+            return 0
+        with self.con:
+            self.con.execute("BEGIN")  # o DROP/CREATE também fica na transação
+            for t in antigas:
+                self.con.execute(f"DROP TABLE {t}")
+            for sql in ESQUEMA.split(";"):
+                if sql.strip():
+                    self.con.execute(sql)
+            if "movimentos" in antigas:
+                self.con.executemany("INSERT INTO movimentos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     [self._mov_tuplo(em_centimos(d, "valor")) for d in antigas["movimentos"]])
+            if "orcamentos" in antigas:
+                self.con.executemany("INSERT INTO orcamentos VALUES (?, ?, ?, ?)",
+                                     [self._orc_tuplo(em_centimos(o, "limite")) for o in antigas["orcamentos"]])
+        if "movimentos" in antigas:
+            self._descartar_indices()
+        self._nova_versao(reescrita="movimentos" in antigas)
+        return sum(len(v) for v in antigas.values())
+
+    @staticmethod
+    def _mov_tuplo(d):
+        return (
+            int(d["id"]), d.get("tipo", "despesa"), d.get("data", ""), int(d["valor_cent"]),
+            d.get("categoria", ""), d.get("descricao", ""), d.get("metodo", ""),
+        )
+
+    @staticmethod
+    def _orc_tuplo(o):
+        return (int(o["id"]), o.get("categoria", ""), int(o["limite_cent"]), o.get("periodo", "mensal"))
+
+    # ------------- movimentos -------------
+    def carregar_movimentos(self):
+        cur = self.con.execute(f"SELECT {', '.join(COLUNAS_MOV)} FROM movimentos ORDER BY id")
+        return [dict(r) for r in cur]
+
+    def guardar_movimentos(self, movimentos_lista):
+        #Substitui todos os movimentos: os indices sao descartados (ver Storage.guardar_movimentos)
+        with self.bloqueio():
+            self._descartar_indices()
+            with self.con:
+                self.con.execute("DELETE FROM movimentos")
+                self.con.executemany(
+                    "INSERT INTO movimentos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [self._mov_tuplo(d) for d in movimentos_lista],
+                )
+            self._nova_versao(reescrita=True)
+
+    def adicionar_movimento(self, movimento_dict):
+        with self.con:
+            self.con.execute("INSERT INTO movimentos VALUES (?, ?, ?, ?, ?, ?, ?)", self._mov_tuplo(movimento_dict))
+        self._nova_versao()
+
+    def adicionar_movimentos(self, lista):
+        with self.con:
+            self.con.executemany("INSERT INTO movimentos VALUES (?, ?, ?, ?, ?, ?, ?)", [self._mov_tuplo(d) for d in lista])
+        self._nova_versao()
+
+    def proximo_id(self):
+        return self.con.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM movimentos").fetchone()[0]
+
+    @staticmethod
+    def _where(inicio=None, fim=None, cat=None, tipo=None, ids=None, antes=None):
+        #Constroi a clausula WHERE (as datas sao comparadas como texto ISO; antes = data < antes)
+        condicoes, params = [], []
+        if ids is not None:
+            ids = sorted(ids)
+            condicoes.append(f"id IN ({', '.join('?' * len(ids))})" if ids else "0")
+            params.extend(ids)
+        if inicio:
+            condicoes.append("data >= ?")
+            params.append(inicio)
+        if fim:
+            condicoes.append("data <= ?")
+            params.append(fim)
+        if antes:
+            condicoes.append("data < ?")
+            params.append(antes)
+        if cat:
+            condicoes.append("categoria = ?")
+            params.append(cat)
+        if tipo:
+            condicoes.append("tipo = ?")
+            params.append(tipo)
+        where = (" WHERE " + " AND ".join(condicoes)) if condicoes else ""
+        return where, params
+
+    # acima disto, um filtro por ids faz-se melhor fora da base de dados
+    MAX_IDS = 500
+
+    def consultar_movimentos(self, inicio=None, fim=None, cat=None, tipo=None, ids=None):
+        """
+        Gerador com os movimentos (dicts) filtrados pela base de dados, ordenados por id.
+        `ids` (opcional, até MAX_IDS): só estes movimentos (ex.: candidatos do índice de texto).
+        """
+        where, params = self._where(inicio, fim, cat, tipo, ids)
+        cur = self.con.execute(f"SELECT {', '.join(COLUNAS_MOV)} FROM movimentos{where} ORDER BY id", params)
+        for r in cur:
+            yield dict(r)
+
+    def iter_movimentos(self, inicio=None, fim=None):
+        #Cursor: as linhas vao sendo lidas da base de dados a medida que sao pedidas.
+        #inicio/fim sao so uma indicacao: alarga-se ao dia inteiro para nunca excluir datas noutro formato
+        where, params = self._where(inicio[:10] if inicio else None, (fim[:10] + "\uffff") if fim else None)
+        cur = self.con.execute(f"SELECT {', '.join(COLUNAS_MOV)} FROM movimentos{where} ORDER BY id", params)
+        for r in cur:
+            yield dict(r)
+
+    def iter_movimentos_desde(self, ultimo_id):
+        cur = self.con.execute(f"SELECT {', '.join(COLUNAS_MOV)} FROM movimentos WHERE id > ? ORDER BY id", (ultimo_id,))
+        for r in cur:
+            yield dict(r)
+
+    def somar_movimentos(self, por, inicio=None, fim=None, cat=None, tipo=None):
+        """
+        SUM(valor_cent) agrupado pelas colunas em `por` (ver AGRUPAMENTOS).
+        Retorna lista de tuplos (chave1, chave2, ..., total em cêntimos).
+
+        As datas gravadas podem ter formatos diferentes ('2025-08-01 10:00', '2025-08-02', ...),
+        que como texto não se comparam como datas: a base de dados soma só os dias inteiros do
+        intervalo (o prefixo 'YYYY-MM-DD' compara-se bem) e os movimentos dos dias das pontas
+        são lidos e filtrados como nos outros storages (models.filtrar_periodo).
+        """
+        exprs = [AGRUPAMENTOS[p] for p in por]
+        grupos = ", ".join(exprs)
+        dia_ini = dia_fim = de = None
+        if inicio:
+            c_inicio = data_canonica(inicio)
+            dia_ini = c_inicio[:10]
+            # dias inteiros a partir de `de` (o do início só se começar às 00:00)
+            de = dia_ini if c_inicio.endswith("T00:00:00.000000") else _dia_seguinte(dia_ini)
+        if fim:
+            dia_fim = data_canonica(fim)[:10]
+        ate = dia_fim  # dias inteiros antes deste
+        totais = {}
+        if not (de and ate and de >= ate):
+            where, params = self._where(de, cat=cat, tipo=tipo, antes=ate)
+            sql = f"SELECT {grupos}, SUM(valor_cent) FROM movimentos{where} GROUP BY {grupos} ORDER BY MIN(id)"
+            for r in self.con.execute(sql, params):
+                totais[tuple(r)[:-1]] = r[-1]
+        pontas = sorted({d for d in (dia_ini if de != dia_ini else None, dia_fim) if d})
+        for dia in pontas:
+            where, params = self._where(dia, cat=cat, tipo=tipo, antes=_dia_seguinte(dia))
+            cur = self.con.execute(f"SELECT {', '.join(COLUNAS_MOV)} FROM movimentos{where} ORDER BY id", params)
+            for d in filtrar_periodo((dict(r) for r in cur), inicio, fim):
+                chave = tuple(_CHAVES_DICT[p](d) for p in por)
+                totais[chave] = totais.get(chave, 0) + d["valor_cent"]
+        return [chave + (total,) for chave, total in totais.items()]
+
+    # ------------- orcamentos -------------
+    def carregar_orcamentos(self):
+        cur = self.con.execute(f"SELECT {', '.join(COLUNAS_ORC)} FROM orcamentos ORDER BY id")
+        return [dict(r) for r in cur]
+
+    def guardar_orcamentos(self, orcamento_lista):
+        with self.con:
+            self.con.execute("DELETE FROM orcamentos")
+            self.con.executemany(
+                "INSERT INTO orcamentos VALUES (?, ?, ?, ?)",
+                [self._orc_tuplo(o) for o in orcamento_lista],
+            )
+        self._nova_versao(movimentos=False)
+
+    def proximo_id_orcamento(self):
+        return self.con.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM orcamentos").fetchone()[0]
@@ -5,6 +5,197 @@
 import os
 #Permite trabalhar com dados em formato JSON
 import json
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from .models import MovimentoTable, chave_mes, centimos
+from . import perfil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# umask do processo (lido uma vez: os.umask só o consegue ler alterando-o)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _modo_ficheiro(path):
+    # permissões a dar ao ficheiro temporário: as do ficheiro que vai substituir,
+    # ou as de um ficheiro novo criado com open() (0o666 menos a umask)
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def escrever_atomico(path, escrever, binario=False, sincronizar=True):
+    """
+    Grava um ficheiro de forma atómica: escrever(f) escreve num ficheiro temporário na mesma pasta,
+    que depois substitui o destino com os.replace. Um crash a meio nunca deixa o ficheiro truncado.
+    Com `sincronizar`, faz fsync antes da troca (o conteúdo novo sobrevive a uma falha de energia).
+    """
+    pasta = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=pasta)
+    try:
+        # mkstemp cria com 0600; manter as permissões habituais do ficheiro de dados
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, _modo_ficheiro(path))
+        with (os.fdopen(fd, "wb") if binario else os.fdopen(fd, "w", encoding="utf-8")) as f:
+            escrever(f)
+            if perfil.ATIVO is not None:
+                perfil.contar("bytes_escritos", f.tell())
+            if sincronizar:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def escrever_json(path, dados, indent=2, sincronizar=True):
+    """Grava `dados` em JSON de forma atómica (ver escrever_atomico)."""
+    escrever_atomico(path, lambda f: json.dump(dados, f, ensure_ascii=False, indent=indent), sincronizar=sincronizar)
+
+class _BloqueioPasta:
+    # um por pasta de dados: RLock para as threads do processo + lock do SO (ficheiro .lock) entre processos
+    _todos = {}
+    _criar = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.rlock = threading.RLock()
+        self.nivel = 0
+        self.ficheiro = None
+
+    @classmethod
+    def de(cls, base_dir):
+        path = os.path.join(os.path.abspath(base_dir), ".lock")
+        with cls._criar:
+            if path not in cls._todos:
+                cls._todos[path] = cls(path)
+            return cls._todos[path]
+
+    def adquirir(self):
+        self.rlock.acquire()
+        if self.nivel == 0:
+            try:
+                self.ficheiro = open(self.path, "a+")
+                if fcntl:
+                    fcntl.flock(self.ficheiro.fileno(), fcntl.LOCK_EX)
+                else:
+                    while True:
+                        try:
+                            self.ficheiro.seek(0)
+                            msvcrt.locking(self.ficheiro.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:  # LK_LOCK desiste ao fim de ~10 s; voltar a tentar
+                            pass
+            except BaseException:
+                if self.ficheiro:
+                    self.ficheiro.close()
+                    self.ficheiro = None
+                self.rlock.release()
+                raise
+        self.nivel += 1
+
+    def libertar(self):
+        self.nivel -= 1
+        if self.nivel == 0:
+            if fcntl:
+                fcntl.flock(self.ficheiro.fileno(), fcntl.LOCK_UN)
+            else:
+                self.ficheiro.seek(0)
+                msvcrt.locking(self.ficheiro.fileno(), msvcrt.LK_UNLCK, 1)
+            self.ficheiro.close()
+            self.ficheiro = None
+        self.rlock.release()
+
+class GrupoCommit:
+    """
+    fsync partilhado entre threads ("group commit"): cada escrita recebe um número (escrito());
+    sincronizar(numero, fsync) garante que essa escrita está em disco. Se várias threads pedirem
+    ao mesmo tempo, uma faz o fsync e ele cobre as escritas de todas as outras.
+    Só agrupa threads do mesmo processo (ex.: o servidor); processos diferentes fazem cada um o seu fsync.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._escritos = 0
+        self._sincronizados = 0
+        self._a_sincronizar = False
+
+    def escrito(self):
+        with self._cond:
+            self._escritos += 1
+            return self._escritos
+
+    def sincronizar(self, fsync, numero=None):
+        #numero=None: todas as escritas feitas até agora
+        with self._cond:
+            if numero is None:
+                numero = self._escritos
+            while self._sincronizados < numero:
+                if not self._a_sincronizar:
+                    self._a_sincronizar = True
+                    alvo = self._escritos
+                    break
+                self._cond.wait()
+            else:
+                return
+        ok = False
+        try:
+            fsync()
+            ok = True
+        finally:
+            with self._cond:
+                self._a_sincronizar = False
+                if ok:
+                    self._sincronizados = max(self._sincronizados, alvo)
+                self._cond.notify_all()
+
+_ESPACOS = " \t\r\n"
+
+def iter_json_lista(path, tamanho_bloco=1 << 16):
+    """
+    Gerador sobre os elementos de um ficheiro com uma lista JSON ([{...}, {...}]),
+    lido aos blocos: a memória usada não depende do tamanho do ficheiro.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, inicio_lista, fim_ficheiro = "", 0, False, False
+        while True:
+            # saltar espaços, '[' inicial e vírgulas entre elementos
+            while pos < len(buf) and (buf[pos] in _ESPACOS or buf[pos] == "," or (buf[pos] == "[" and not inicio_lista)):
+                inicio_lista = inicio_lista or buf[pos] == "["
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            if pos < len(buf):
+                try:
+                    elemento, pos = decoder.raw_decode(buf, pos)
+                    yield elemento
+                    continue
+                except json.JSONDecodeError:
+                    if fim_ficheiro:
+                        raise
+            elif fim_ficheiro:
+                return
+            # precisa de mais texto: descarta o que já foi lido e junta o bloco seguinte
+            bloco = f.read(tamanho_bloco)
+            fim_ficheiro = not bloco
+            buf, pos = buf[pos:] + bloco, 0
+
+def em_centimos(registo, campo):
+    """
+    Cópia de `registo` (dict de um movimento/orçamento gravado em euros, antes dos cêntimos) com
+    `campo` ('valor' ou 'limite') convertido para '<campo>_cent'. None se já não estiver em euros.
+    """
+    if campo not in registo or campo + "_cent" in registo:
+        return None
+    return {(k + "_cent" if k == campo else k): (centimos(v) if k == campo else v) for k, v in registo.items()}
 
 class Storage:
     def __init__(self, base_dir):
@@ -12,18 +203,37 @@ class Storage:
         os.makedirs(self.base_dir, exist_ok=True)
         self.movimentos_path = os.path.join(self.base_dir,"movimentos.json")
         self.orcamentos_path = os.path.join(self.base_dir, "orcamentos.json")
+        self.versao_path = os.path.join(self.base_dir, "versao.json")
 
     def carregar_movimentos(self):
         #Devolver uma lista de dicionarios. Se o ficheiro nao existir, deve devolver uma lista vazia
         if not os.path.exists(self.movimentos_path):
             return []
+        perfil.ficheiro_lido(self.movimentos_path)
         with open(self.movimentos_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    def iter_movimentos(self, inicio=None, fim=None):
+        #Gerador com os movimentos um a um (sem json.load do ficheiro todo).
+        #inicio/fim sao apenas uma indicacao para storages que conseguem saltar dados; quem chama continua a filtrar
+        if not os.path.exists(self.movimentos_path):
+            return
+        perfil.ficheiro_lido(self.movimentos_path)
+        yield from iter_json_lista(self.movimentos_path)
+
+    def iter_movimentos_desde(self, ultimo_id):
+        #Movimentos com id > ultimo_id (ex.: os ainda nao vistos por um checkpoint). Aqui implica ler o ficheiro todo
+        for d in self.iter_movimentos():
+            if int(d["id"]) > ultimo_id:
+                yield d
+
     def guardar_movimentos(self,movimentos_lista):
-        #receber a lista de dicionarios e gravar em JSON
-        with open(self.movimentos_path,'w',encoding='utf-8') as f:
-            json.dump(movimentos_lista,f,ensure_ascii=False,indent=2)
+        #receber a lista de dicionarios e gravar em JSON (escrita atomica). Regravar tudo pode editar ou
+        #remover movimentos: os indices (que so acompanham acrescentos) sao descartados antes
+        with self.bloqueio():
+            self._descartar_indices()
+            escrever_json(self.movimentos_path, movimentos_lista)
+            self._nova_versao(reescrita=True)
     def proximo_id(self):
         #Calcular o proximo id com base no maior id ja existente
         movimentos = self.carregar_movimentos()
@@ -36,12 +246,13 @@ class Storage:
     def carregar_orcamentos(self):
         if not os.path.exists(self.orcamentos_path):
              return []
+        perfil.ficheiro_lido(self.orcamentos_path)
         with open(self.orcamentos_path, "r", encoding="utf-8") as f:
             return json.load(f)
         
     def guardar_orcamentos(self, orcamento_lista):
-        with open(self.orcamentos_path, "w", encoding="utf-8") as f:
-            json.dump(orcamento_lista, f, ensure_ascii=False, indent=2)
+        escrever_json(self.orcamentos_path, orcamento_lista)
+        self._nova_versao(movimentos=False)
 
     def proximo_id_orcamento(self):
         orcs = self.carregar_orcamentos()
@@ -49,4 +260,501 @@ class Storage:
         for o in orcs:
             if int(o.get("id",0)) > max_id:
                 max_id = int(o["id"])
-        return max_id + 1
\ No newline at end of file
+        return max_id + 1
+
+    def adicionar_movimento(self, movimento_dict):
+        #Acrescentar um movimento. Aqui ainda implica ler e regravar o ficheiro todo
+        self.adicionar_movimentos([movimento_dict])
+
+    def adicionar_movimentos(self, lista):
+        #Acrescentar varios movimentos com uma so leitura e uma so escrita (ler+gravar sob bloqueio)
+        with self.bloqueio():
+            movimentos = self.carregar_movimentos()
+            movimentos.extend(lista)
+            escrever_json(self.movimentos_path, movimentos)
+            self._nova_versao()
+
+    def carregar_tabela(self):
+        #Movimentos em formato colunar (ver models.MovimentoTable)
+        return MovimentoTable.from_dicts(self.carregar_movimentos())
+
+    def carregar_indice(self, nome):
+        #Indices/agregados auxiliares ficam em data/indices/<nome>.json. Devolve None se nao existir
+        path = os.path.join(self.base_dir, "indices", f"{nome}.json")
+        if not os.path.exists(path):
+            return None
+        perfil.ficheiro_lido(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def guardar_indice(self, nome, dados):
+        #Os indices reconstroem-se a partir dos movimentos: atomico, mas sem fsync
+        pasta = os.path.join(self.base_dir, "indices")
+        os.makedirs(pasta, exist_ok=True)
+        escrever_json(os.path.join(pasta, f"{nome}.json"), dados, indent=None, sincronizar=False)
+        #o ficheiro completo inclui o que estava no diario do indice (se houver)
+        diario = os.path.join(pasta, f"{nome}.jsonl")
+        if os.path.exists(diario):
+            os.remove(diario)
+
+    def acrescentar_indice(self, nome, registos):
+        #Diario de um indice (data/indices/<nome>.jsonl): uma linha JSON por registo
+        pasta = os.path.join(self.base_dir, "indices")
+        os.makedirs(pasta, exist_ok=True)
+        texto = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registos)
+        with open(os.path.join(pasta, f"{nome}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(texto)
+        if perfil.ATIVO is not None:
+            perfil.contar("bytes_escritos", len(texto.encode("utf-8")))
+
+    def iter_indice_diario(self, nome):
+        path = os.path.join(self.base_dir, "indices", f"{nome}.jsonl")
+        if not os.path.exists(path):
+            return
+        perfil.ficheiro_lido(path)
+        with open(path, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registo = json.loads(linha) if linha.endswith("\n") else None
+                except ValueError:
+                    registo = None
+                if registo is None:
+                    break  # escrita interrompida: o resto fica por indexar (o indice e reconstruido)
+                yield registo
+
+    def _descartar_indices(self):
+        #Apaga data/indices (chamado sob o bloqueio quando os movimentos sao regravados): sao reconstruidos quando precisos
+        pasta = os.path.join(self.base_dir, "indices")
+        if not os.path.isdir(pasta):
+            return
+        for nome in os.listdir(pasta):
+            try:
+                os.remove(os.path.join(pasta, nome))
+            except FileNotFoundError:
+                pass
+
+    def ficheiros_dados(self):
+        #Ficheiros com os movimentos e orcamentos (a cache de resultados usa o tamanho/data de modificacao)
+        return [self.movimentos_path, self.orcamentos_path]
+
+    def versao_dados(self):
+        """
+        Versão dos dados (movimentos e orçamentos): muda a cada escrita, nunca se repete.
+        'identificador:contador' de data/versao.json; o identificador é aleatório e criado com o
+        ficheiro, por isso uma pasta nova (ou sem o ficheiro) não reaproveita versões antigas.
+        Usada para invalidar resultados guardados em cache (ver cache.py).
+        """
+        v = self._ler_versao()
+        if v is None:
+            return self._nova_versao()
+        return f"{v['id']}:{v['versao']}"
+
+    def versao_reescrita(self):
+        """
+        Versão da última regravação dos movimentos (guardar_movimentos): ao contrário de versao_dados,
+        não muda com acrescentos nem com os orçamentos. Enquanto for a mesma, os índices incrementais
+        já carregados continuam válidos (basta comparar o ultimo_id).
+        """
+        v = self._ler_versao()
+        if v is None:
+            self._nova_versao()
+            v = self._ler_versao()
+        return f"{v['id']}:{v['reescrita']}"
+
+    def versao_movimentos(self):
+        """Versão da última escrita dos movimentos (como versao_dados, mas não muda com os orçamentos)."""
+        v = self._ler_versao()
+        if v is None:
+            self._nova_versao()
+            v = self._ler_versao()
+        return f"{v['id']}:{v['movimentos']}"
+
+    def _ler_versao(self):
+        try:
+            with open(self.versao_path, "r", encoding="utf-8") as f:
+                v = json.load(f)
+            return {"id": str(v["id"]), "versao": int(v["versao"]),
+                    "movimentos": int(v.get("movimentos", 0)), "reescrita": int(v.get("reescrita", 0))}
+        except (FileNotFoundError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _nova_versao(self, reescrita=False, movimentos=True):
+        #Incrementa o contador (depois de gravar os dados: quem leu a versao antiga nunca guarda em cache dados antigos com a nova)
+        #`movimentos`: a escrita foi dos movimentos (versao_movimentos); `reescrita`: foram regravados,
+        #nao so acrescentados (versao_reescrita)
+        with self.bloqueio():
+            v = self._ler_versao() or {"id": os.urandom(8).hex(), "versao": 0, "movimentos": 0, "reescrita": 0}
+            v["versao"] += 1
+            if movimentos or reescrita:
+                v["movimentos"] = v["versao"]
+            if reescrita:
+                v["reescrita"] = v["versao"]
+            escrever_json(self.versao_path, v, indent=None, sincronizar=False)
+        return f"{v['id']}:{v['versao']}"
+
+    @contextmanager
+    def bloqueio(self):
+        """
+        Exclusão mútua sobre a pasta de dados (entre threads e entre processos).
+        Usado pelo FinanceService à volta de "calcular próximo id + gravar". Reentrante.
+        """
+        lock = _BloqueioPasta.de(self.base_dir)
+        lock.adquirir()
+        try:
+            yield
+        finally:
+            lock.libertar()
+
+    def sincronizar(self):
+        #Garante que as escritas anteriores estao em disco. Aqui cada escrita ja faz fsync
+        pass
+
+    def _movimentos_a_migrar(self):
+        return self.carregar_movimentos()
+
+    def migrar_centimos(self):
+        """
+        Converte os movimentos e orçamentos gravados em euros ('valor'/'limite', float) para
+        cêntimos ('valor_cent'/'limite_cent', int). Só regrava o que tiver registos por converter;
+        pode ser repetida. Retorna o nº de registos convertidos.
+        """
+        n = 0
+        with self.bloqueio():
+            for carregar, guardar, campo in ((self._movimentos_a_migrar, self.guardar_movimentos, "valor"),
+                                             (self.carregar_orcamentos, self.guardar_orcamentos, "limite")):
+                registos = carregar()
+                novos = [em_centimos(r, campo) for r in registos]
+                convertidos = sum(r is not None for r in novos)
+                if convertidos:
+                    guardar([novo or r for novo, r in zip(novos, registos)])
+                    n += convertidos
+        return n
+
+
+class JournalStorage(Storage):
+    """
+    Armazenamento append-only dos movimentos.
+
+    - movimentos.json: snapshot (mesmo formato do Storage normal)
+    - movimentos.jsonl: diário com um movimento JSON por linha, acrescentado a cada add-mov
+    - movimentos.meta.json: maior id já atribuído (high-water mark) e nº de linhas no diário
+
+    Quando o diário atinge `limite_diario` linhas é compactado para o snapshot.
+    Os orçamentos continuam a usar o ficheiro normal (são poucos).
+
+    As linhas do diário são escritas sem fsync; sincronizar() faz um fsync que cobre todas
+    as escritas pendentes (group commit entre threads). Uma última linha incompleta
+    (crash a meio da escrita) é ignorada na leitura.
+    """
+
+    LIMITE_DIARIO = 1000
+
+    def __init__(self, base_dir, limite_diario=None):
+        super().__init__(base_dir)
+        self.diario_path = os.path.join(self.base_dir, "movimentos.jsonl")
+        self.meta_path = os.path.join(self.base_dir, "movimentos.meta.json")
+        self.limite_diario = limite_diario or self.LIMITE_DIARIO
+        self._grupo = GrupoCommit()
+
+    def _carregar_snapshot(self):
+        return super().carregar_movimentos()
+
+    def ficheiros_dados(self):
+        return super().ficheiros_dados() + [self.diario_path]
+
+    def _guardar_snapshot(self, movimentos_lista):
+        escrever_json(self.movimentos_path, movimentos_lista)
+
+    def _carregar_diario(self):
+        return list(self._iter_diario())
+
+    def _iter_diario(self):
+        if not os.path.exists(self.diario_path):
+            return
+        perfil.ficheiro_lido(self.diario_path)
+        with open(self.diario_path, "r", encoding="utf-8") as f:
+            for linha in f:
+                if not linha.endswith("\n"):
+                    break  # escrita interrompida: a linha nunca foi confirmada
+                linha = linha.strip()
+                if linha:
+                    yield json.loads(linha)
+
+    def _ultimo_id_diario(self):
+        #id da ultima linha completa do diario (le so o fim do ficheiro)
+        if not os.path.exists(self.diario_path):
+            return 0
+        with open(self.diario_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 65536))
+            linhas = f.read().split(b"\n")[:-1]
+        for linha in reversed(linhas):
+            try:
+                return int(json.loads(linha).get("id", 0))
+            except ValueError:
+                continue
+        return 0
+
+    def _carregar_meta(self):
+        if not os.path.exists(self.meta_path):
+            #Primeira utilizacao (ou meta perdida): calcular a partir dos dados existentes, numa so leitura
+            max_id = 0
+            for movimento in self._carregar_snapshot():
+                max_id = max(max_id, int(movimento.get("id", 0)))
+            linhas = 0
+            for movimento in self._iter_diario():
+                max_id = max(max_id, int(movimento.get("id", 0)))
+                linhas += 1
+            return {"ultimo_id": max_id, "linhas_diario": linhas}
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _guardar_meta(self, meta):
+        #Sem fsync: se se perder, proximo_id() recorre a ultima linha do diario
+        escrever_json(self.meta_path, meta, indent=None, sincronizar=False)
+
+    def carregar_movimentos(self):
+        #Snapshot + movimentos ainda no diario, lidos sob o bloqueio (uma compactacao entre as duas
+        #leituras passaria as linhas do diario para um snapshot que ja nao seria lido)
+        with self.bloqueio():
+            return self._carregar_snapshot() + self._carregar_diario()
+
+    def iter_movimentos(self, inicio=None, fim=None):
+        #Sob o bloqueio abre-se o snapshot e le-se o diario (curto); uma compactacao depois disso
+        #substitui os ficheiros mas nao o que ja esta aberto, por isso a vista e sempre coerente
+        with self.bloqueio():
+            snapshot = super().iter_movimentos(inicio, fim)
+            primeiro = next(snapshot, None)
+            diario = self._carregar_diario()
+        if primeiro is not None:
+            yield primeiro
+            yield from snapshot
+        yield from diario
+
+    def iter_movimentos_desde(self, ultimo_id):
+        #So o diario, se os movimentos novos ainda estiverem todos la (os ids sao atribuidos por ordem)
+        if ultimo_id >= self.proximo_id() - 1:
+            return
+        diario = self._carregar_diario()
+        fonte = diario if diario and int(diario[0]["id"]) <= ultimo_id + 1 else self.iter_movimentos()
+        for d in fonte:
+            if int(d["id"]) > ultimo_id:
+                yield d
+
+    def guardar_movimentos(self, movimentos_lista):
+        #Regravar tudo (ver Storage.guardar_movimentos): os indices sao descartados
+        with self.bloqueio():
+            self._descartar_indices()
+            self._regravar(movimentos_lista)
+            self._nova_versao(reescrita=True)
+
+    def _regravar(self, movimentos_lista):
+        #O snapshot passa a conter tudo e o diario fica vazio
+        with self.bloqueio():
+            self._guardar_snapshot(movimentos_lista)
+            if os.path.exists(self.diario_path):
+                os.remove(self.diario_path)
+            meta = self._carregar_meta()
+            for movimento in movimentos_lista:
+                meta["ultimo_id"] = max(meta["ultimo_id"], int(movimento.get("id", 0)))
+            meta["linhas_diario"] = 0
+            self._guardar_meta(meta)
+
+    def proximo_id(self):
+        #Sem ler os movimentos: usa o high-water mark guardado (ou a ultima linha do diario, se for maior)
+        return max(int(self._carregar_meta()["ultimo_id"]), self._ultimo_id_diario()) + 1
+
+    def adicionar_movimento(self, movimento_dict):
+        self.adicionar_movimentos([movimento_dict])
+
+    def adicionar_movimentos(self, lista):
+        with self.bloqueio():
+            meta = self._carregar_meta()
+            self._reparar_diario()
+            texto = "".join(json.dumps(d, ensure_ascii=False) + "\n" for d in lista)
+            with open(self.diario_path, "a", encoding="utf-8") as f:
+                f.write(texto)
+            if perfil.ATIVO is not None:
+                perfil.contar("bytes_escritos", len(texto.encode("utf-8")))
+            self._grupo.escrito()
+            self._nova_versao()
+            for d in lista:
+                meta["ultimo_id"] = max(int(meta["ultimo_id"]), int(d.get("id", 0)))
+            meta["linhas_diario"] = int(meta.get("linhas_diario", 0)) + len(lista)
+            self._guardar_meta(meta)
+            if meta["linhas_diario"] >= self.limite_diario:
+                self.compactar()
+
+    def _reparar_diario(self):
+        #Corta uma ultima linha incompleta, para a proxima escrita nao ficar colada a ela
+        if not os.path.exists(self.diario_path):
+            return
+        with open(self.diario_path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            tamanho = f.tell()
+            if tamanho == 0:
+                return
+            f.seek(tamanho - 1)
+            if f.read(1) == b"\n":
+                return
+            inicio = max(0, tamanho - 65536)
+            f.seek(inicio)
+            resto = f.read()
+            fim = resto.rfind(b"\n")
+            f.truncate(inicio + fim + 1 if fim >= 0 else 0)
+
+    def _fsync_diario(self):
+        try:
+            fd = os.open(self.diario_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return  # compactado entretanto: o snapshot ja foi gravado com fsync
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def sincronizar(self):
+        self._grupo.sincronizar(self._fsync_diario)
+
+    def compactar(self):
+        #Junta o diario ao snapshot (os mesmos movimentos: os indices continuam validos)
+        with self.bloqueio():
+            self._regravar(self.carregar_movimentos())
+            self._nova_versao()
+
+
+class ParticionadoStorage(Storage):
+    """
+    Movimentos partidos por mês: data/movimentos/YYYY-MM.json (cada ficheiro no formato do Storage normal).
+
+    - consultas com inicio/fim só abrem os meses que se sobrepõem ao intervalo
+    - adicionar um movimento só lê e regrava o ficheiro do seu mês
+    - data/movimentos/meta.json guarda o maior id atribuído e o menor/maior id de cada mês
+      (iter_movimentos_ids só abre os meses que podem conter os ids pedidos)
+
+    Na primeira utilização, um data/movimentos.json existente é repartido pelos meses (sob o
+    bloqueio; o meta.json é gravado no fim e marca a repartição como concluída).
+    Os orçamentos continuam em data/orcamentos.json.
+
+    Ao contrário dos outros storages, iter_movimentos devolve os movimentos por mês (e por id
+    dentro de cada mês), não pela ordem global dos ids; carregar_movimentos ordena por id.
+    """
+
+    def __init__(self, base_dir):
+        super().__init__(base_dir)
+        self.particoes_dir = os.path.join(self.base_dir, "movimentos")
+        self.meta_path = os.path.join(self.particoes_dir, "meta.json")
+        if not os.path.exists(self.meta_path):
+            with self.bloqueio():
+                if not os.path.exists(self.meta_path):
+                    os.makedirs(self.particoes_dir, exist_ok=True)
+                    self.guardar_movimentos(super().carregar_movimentos())
+
+    def _path(self, mes):
+        return os.path.join(self.particoes_dir, f"{mes}.json")
+
+    def ficheiros_dados(self):
+        return [self._path(mes) for mes in self.meses()] + [self.orcamentos_path]
+
+    def meses(self, inicio=None, fim=None):
+        #Meses com ficheiro, por ordem, limitados ao intervalo [inicio, fim] se indicado
+        meses = sorted(n[:-5] for n in os.listdir(self.particoes_dir) if n.endswith(".json") and n != "meta.json")
+        if inicio:
+            meses = [m for m in meses if m >= chave_mes(inicio)]
+        if fim:
+            meses = [m for m in meses if m <= chave_mes(fim)]
+        return meses
+
+    def _ler(self, mes):
+        path = self._path(mes)
+        if not os.path.exists(path):
+            return []
+        perfil.ficheiro_lido(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _escrever(self, mes, movimentos):
+        escrever_json(self._path(mes), movimentos)
+
+    @staticmethod
+    def _por_mes(lista):
+        grupos = {}
+        for d in lista:
+            grupos.setdefault(chave_mes(d["data"]), []).append(d)
+        return grupos
+
+    def _carregar_meta(self):
+        if not os.path.exists(self.meta_path):
+            return {"ultimo_id": 0}
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _atualizar_meta(self, lista, meta=None):
+        meta = meta or self._carregar_meta()
+        ids = meta.get("ids")  # {mes: [menor id, maior id]} (ausente num meta.json de uma versão anterior)
+        for d in lista:
+            i = int(d.get("id", 0))
+            meta["ultimo_id"] = max(int(meta["ultimo_id"]), i)
+            if ids is not None:
+                intervalo = ids.setdefault(chave_mes(d["data"]), [i, i])
+                intervalo[0], intervalo[1] = min(intervalo[0], i), max(intervalo[1], i)
+        escrever_json(self.meta_path, meta, indent=None)
+
+    def carregar_movimentos(self):
+        #Todos os meses, pela ordem dos ids (= ordem de insercao)
+        movimentos = []
+        for mes in self.meses():
+            movimentos.extend(self._ler(mes))
+        movimentos.sort(key=lambda d: int(d["id"]))
+        return movimentos
+
+    def iter_movimentos(self, inicio=None, fim=None):
+        #So os ficheiros dos meses que se sobrepoem a [inicio, fim], mes a mes (nao pela ordem global dos ids)
+        for mes in self.meses(inicio, fim):
+            yield from iter_json_lista(self._path(mes))
+
+    def iter_movimentos_ids(self, ids, inicio=None, fim=None):
+        #Movimentos com id em `ids`: so os meses (de [inicio, fim]) cujo intervalo de ids contem algum deles
+        intervalos = self._carregar_meta().get("ids")
+        ordenados = sorted(ids)
+        for mes in self.meses(inicio, fim):
+            if intervalos is not None:
+                menor, maior = intervalos.get(mes, (0, -1))
+                k = bisect_left(ordenados, menor)
+                if k == len(ordenados) or ordenados[k] > maior:
+                    continue
+            for d in self._ler(mes):
+                if int(d["id"]) in ids:
+                    yield d
+
+    def iter_meses(self, meses):
+        #Movimentos dos meses indicados ('YYYY-MM'); cada ficheiro e lido de uma vez (so um mes em memoria)
+        for mes in meses:
+            yield from self._ler(mes)
+
+    def guardar_movimentos(self, movimentos_lista):
+        grupos = self._por_mes(movimentos_lista)
+        with self.bloqueio():
+            self._descartar_indices()  # (ver Storage.guardar_movimentos)
+            for mes in self.meses():
+                if mes not in grupos:
+                    os.remove(self._path(mes))
+            for mes, movimentos in grupos.items():
+                self._escrever(mes, movimentos)
+            self._atualizar_meta(movimentos_lista, {"ultimo_id": 0, "ids": {}})
+            self._nova_versao(reescrita=True)
+
+    def adicionar_movimento(self, movimento_dict):
+        self.adicionar_movimentos([movimento_dict])
+
+    def adicionar_movimentos(self, lista):
+        #Le e regrava apenas os meses dos movimentos novos
+        with self.bloqueio():
+            for mes, novos in self._por_mes(lista).items():
+                self._escrever(mes, self._ler(mes) + novos)
+            self._atualizar_meta(lista)
+            self._nova_versao()
+
+    def proximo_id(self):
+        return int(self._carregar_meta()["ultimo_id"]) + 1
+
@@ -0,0 +1,57 @@
+import random
+import tempfile
+import pytest
+from gestor.storage import Storage, JournalStorage, ParticionadoStorage
+from gestor.sqlite_storage import SqliteStorage
+from gestor.servidor import MemoriaStorage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+
+
+def _chaves(alertas):
+    return {(a["categoria"], a["periodo"], a["referencia"]): (a["limite"], a["gasto"]) for a in alertas}
+
+
+@pytest.mark.parametrize("criar", [Storage, lambda d: JournalStorage(d, limite_diario=7), ParticionadoStorage,
+                                   SqliteStorage, lambda d: MemoriaStorage(Storage(d))])
+def test_alertas_incrementais_acompanham_o_relatorio_completo(criar):
+    rnd = random.Random(3)
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(criar(d))
+        r = Reports(s.storage)
+        s.add_orcamento("a", 20000, "semanal")
+        s.add_orcamento("b", 50000, "mensal")
+        emitidos = {}
+        for ronda in range(6):
+            for _ in range(40):
+                s.add_movimento(rnd.choice(["despesa", "despesa", "receita"]), rnd.randint(100, 9000), rnd.choice("abc"),
+                                data_iso=f"2025-{rnd.randint(6, 8):02d}-{rnd.randint(1, 28):02d}T08:30:00")
+            if ronda == 3:
+                s.add_orcamento("a", 30000, "semanal")  # só a categoria 'a' é reavaliada
+            novos = r.alertas_desde_checkpoint()
+            completo = _chaves(r.alertas())
+            # cada alerta emitido agora é novo ou mudou; juntos com os anteriores dão o relatório completo
+            assert all(emitidos.get(k) != v for k, v in _chaves(novos).items())
+            emitidos = {k: v for k, v in {**emitidos, **_chaves(novos)}.items() if k in completo}
+            assert emitidos == completo
+            assert r.alertas_desde_checkpoint() == []
+
+
+def test_checkpoint_so_le_os_movimentos_novos():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(JournalStorage(d))
+        s.add_orcamento("cafe", 500)
+        s.add_movimento("despesa", 400, "cafe", data_iso="2025-08-01T10:00:00")
+        r = Reports(s.storage)
+        assert r.alertas_desde_checkpoint() == []
+        s.add_movimento("despesa", 200, "cafe", data_iso="2025-08-02T10:00:00")
+        lidos = []
+        original = s.storage.iter_movimentos_desde
+        s.storage.iter_movimentos_desde = lambda ultimo_id: (lidos.append(m) or m for m in original(ultimo_id))
+        assert r.alertas_desde_checkpoint() == [{"categoria": "cafe", "periodo": "mensal", "limite": 500, "gasto": 600,
+                                                 "excesso": 100, "referencia": "2025-08"}]
+        assert [m["id"] for m in lidos] == [2]
+        s.add_orcamento("cafe", 550)  # alterado: volta a ser emitido com o novo limite
+        assert [a["limite"] for a in r.alertas_desde_checkpoint()] == [550]
+        s.add_orcamento("cafe", 1000)
+        assert r.alertas_desde_checkpoint() == []
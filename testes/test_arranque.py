@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# não devem ser importados só para arrancar a CLI ou correr um comando simples
+PESADOS = {"asyncio", "sqlite3", "multiprocessing", "concurrent.futures", "csv", "gzip",
+           "gestor.reports", "gestor.servidor", "gestor.sqlite_storage", "gestor.binario"}
+# orçamento para o import de gestor.cli, sem contar o argparse (microssegundos)
+ORCAMENTO_US = 50_000
+
+
+def _importtime(*args, **env):
+    res = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=RAIZ, capture_output=True, text=True,
+                         env={**os.environ, "GESTOR_SEM_SERVIDOR": "1", **env}, check=True)
+    tempos = {}
+    for linha in res.stderr.splitlines():
+        partes = linha.split("|")
+        if len(partes) == 3 and partes[1].strip().isdigit():
+            tempos[partes[2].strip()] = int(partes[1])
+    return tempos
+
+
+def test_import_da_cli_e_leve():
+    tempos = _importtime("-c", "import gestor.cli")
+    assert not PESADOS & set(tempos)
+    assert tempos["gestor.cli"] - tempos.get("argparse", 0) < ORCAMENTO_US
+
+
+def test_comando_simples_sem_efeitos_nem_imports_pesados():
+    with tempfile.TemporaryDirectory() as d:
+        tempos = _importtime("-m", "gestor.cli", "list-orc", GESTOR_DATA=d)
+        assert "gestor.service" in tempos
+        assert not PESADOS & set(tempos)
+        assert not os.path.exists(os.path.join(d, "relatorios"))
@@ -0,0 +1,17 @@
+import json
+import os
+import tempfile
+from benchmarks import run
+
+
+def test_benchmarks_correm_com_poucos_movimentos():
+    with tempfile.TemporaryDirectory() as d:
+        saida = os.path.join(d, "res.json")
+        run.main(["--tamanhos", "50", "--storage", "json", "particionado", "--repeticoes", "1", "--jobs", "2",
+                  "--saida", saida])
+        with open(saida, encoding="utf-8") as f:
+            res = json.load(f)
+        assert [r["storage"] for r in res["resultados"]] == ["json", "particionado"]
+        assert "service.add_movimento" in res["resultados"][0]["operacoes"]
+        assert "reports.todos[jobs=2]" not in res["resultados"][0]["operacoes"]
+        assert "reports.todos[jobs=2]" in res["resultados"][1]["operacoes"]
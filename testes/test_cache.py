@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import time
+from gestor.cache import CacheResultados
+from gestor.storage import Storage, JournalStorage, ParticionadoStorage
+from gestor.service import FinanceService
+from gestor.servidor import MemoriaStorage
+from gestor.reports import Reports
+from gestor.models import TipoMovimento
+
+
+def _contar_agregacoes(r):
+    chamadas = []
+    agregar = r._agregar
+    r._agregar = lambda *a, **kw: chamadas.append(1) or agregar(*a, **kw)
+    return chamadas
+
+
+def test_versao_muda_a_cada_escrita():
+    for cls in (Storage, JournalStorage, ParticionadoStorage):
+        with tempfile.TemporaryDirectory() as d:
+            s = FinanceService(cls(d))
+            v0 = s.storage.versao_dados()
+            assert s.storage.versao_dados() == v0
+            s.add_movimento(TipoMovimento.DESPESA, 500, "cafe", data_iso="2025-08-01T10:00:00")
+            v1 = s.storage.versao_dados()
+            s.add_orcamento("cafe", 5000)
+            assert len({v0, v1, s.storage.versao_dados()}) == 3
+            assert cls(d).versao_dados() == s.storage.versao_dados()
+
+
+def test_relatorio_em_cache_ate_os_dados_mudarem():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(JournalStorage(d))
+        s.add_movimento(TipoMovimento.DESPESA, 500, "cafe", data_iso="2025-08-01T10:00:00")
+        r = Reports(s.storage, cache=True)
+        chamadas = _contar_agregacoes(r)
+        kw = dict(inicio="2025-08-01", fim="2025-08-31")
+        primeiro = r.totais_por_cat(**kw)
+        assert Reports(JournalStorage(d), cache=True).totais_por_cat(**kw) == primeiro  # outro processo/comando
+        assert r.totais_por_cat(**kw) == primeiro and len(chamadas) == 1
+        r.totais_por_cat(inicio="2025-08-02")  # outros parâmetros
+        assert len(chamadas) == 2
+        s.add_movimento(TipoMovimento.DESPESA, 700, "cafe", data_iso="2025-08-02T10:00:00")
+        assert r.totais_por_cat(**kw)[0]["despesa"] == 1200 and len(chamadas) == 3
+        assert r.alertas() == [] and r.alertas() == []  # resultado vazio também fica em cache
+        assert len(chamadas) == 3  # sem orçamentos não há agregação
+        # modo servidor: escritas em memória mudam a versão; depois do flush volta a ser a do disco
+        mem = MemoriaStorage(JournalStorage(d))
+        v = mem.versao_dados()
+        mem.adicionar_movimentos([{"id": 3, "tipo": "despesa", "valor_cent": 100, "categoria": "cafe", "data": "2025-08-03T10:00:00"}])
+        assert mem.versao_dados() != v
+        assert Reports(mem, cache=True).totais_por_cat(**kw)[0]["despesa"] == 1300
+        mem.flush()
+        assert mem.versao_dados() == JournalStorage(d).versao_dados()
+
+
+def test_lru_limitado():
+    with tempfile.TemporaryDirectory() as d:
+        c = CacheResultados(d, max_entradas=3)
+        for i in range(3):
+            c.guardar(["k", i], i)
+            time.sleep(0.01)
+        assert c.obter(["k", 0]) == 0  # usada: passa a ser a mais recente
+        time.sleep(0.01)
+        c.guardar(["k", 3], 3)
+        assert c.obter(["k", 1]) is None
+        assert [c.obter(["k", i]) for i in (0, 2, 3)] == [0, 2, 3]
+        assert len(os.listdir(c.pasta)) == 3
+
+
+def test_exportar_nao_regrava_resultado_igual():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_movimento(TipoMovimento.DESPESA, 500, "cafe", data_iso="2025-08-01T10:00:00")
+        r = Reports(s.storage, cache=True)
+        path = r.exportar(r.totais_por_cat(), "totais-por-cat", formato="csv")
+        mtime = os.stat(path).st_mtime_ns
+        assert r.exportar(r.totais_por_cat(), "totais-por-cat", formato="csv") == path
+        assert os.stat(path).st_mtime_ns == mtime
+        assert r.exportar(r.totais_por_cat(), "totais-por-cat", formato="json") != path
+        paths = r.exportar_todos(r.todos(), formato="csv")
+        assert r.exportar_todos(r.todos(), formato="csv") == paths
+        os.remove(path)  # apagado: volta a ser gravado
+        assert os.path.exists(r.exportar(r.totais_por_cat(), "totais-por-cat", formato="csv"))
+
+
+def test_cache_distingue_storages_e_edicoes_a_mao():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_movimento(TipoMovimento.DESPESA, 500, "cafe", data_iso="2025-08-01T10:00:00")
+        FinanceService(JournalStorage(d)).add_movimento(TipoMovimento.DESPESA, 700, "cafe", data_iso="2025-08-02T10:00:00")
+        # a mesma pasta (e a mesma versão) com dois storages: cada um tem os seus resultados
+        assert Reports(Storage(d), cache=True).top_categorias() == [{"categoria": "cafe", "total": 500}]
+        assert Reports(JournalStorage(d), cache=True).top_categorias() == [{"categoria": "cafe", "total": 1200}]
+        # edição à mão do movimentos.json (sem mudar a versão)
+        st = Storage(d)
+        movs = st.carregar_movimentos()
+        movs[0]["valor_cent"] = 900
+        time.sleep(0.01)
+        with open(st.movimentos_path, "w", encoding="utf-8") as f:
+            json.dump(movs, f)
+        assert Reports(Storage(d), cache=True).top_categorias() == [{"categoria": "cafe", "total": 900}]
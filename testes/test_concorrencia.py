@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+import stat
+import tempfile
+import threading
+from gestor.storage import Storage, JournalStorage, ParticionadoStorage, escrever_json
+from gestor.service import FinanceService
+from gestor.models import TipoMovimento
+
+STORAGES = {"json": Storage, "journal": JournalStorage, "particionado": ParticionadoStorage}
+
+
+def _escritor(nome, d, n, barreira):
+    s = FinanceService(STORAGES[nome](d))
+    barreira.wait()
+    for i in range(n):
+        s.add_movimento(TipoMovimento.DESPESA, 1, "cafe", data_iso=f"2025-08-{1 + i % 28:02d}T10:00:00")
+
+
+def _escritor_novo(nome, d, n, barreira):
+    # o storage é criado depois da barreira: todos os processos fazem a 1.ª utilização ao mesmo tempo
+    barreira.wait()
+    s = FinanceService(STORAGES[nome](d))
+    for i in range(n):
+        s.add_movimento(TipoMovimento.DESPESA, 1, "cafe", data_iso=f"2025-08-{1 + i % 28:02d}T10:00:00")
+
+
+def _verificar(d, nome, total):
+    s = FinanceService(STORAGES[nome](d))
+    ids = [m.id for m in s.listar()]
+    assert sorted(ids) == list(range(1, total + 1))  # nada perdido, ids únicos e seguidos
+    assert s.storage.proximo_id() == total + 1
+    # o índice de gastos continua coerente com os movimentos
+    assert s.indice_gastos().gasto("cafe", "mensal", "2025-08") == total
+    assert s.indice_gastos().verificar(s.storage.carregar_movimentos())
+
+
+def test_escritores_em_paralelo_processos():
+    ctx = multiprocessing.get_context("spawn")
+    for nome in STORAGES:
+        with tempfile.TemporaryDirectory() as d:
+            processos, n = 4, 15
+            barreira = ctx.Barrier(processos)
+            ps = [ctx.Process(target=_escritor, args=(nome, d, n, barreira)) for _ in range(processos)]
+            for p in ps:
+                p.start()
+            for p in ps:
+                p.join(60)
+                assert p.exitcode == 0
+            _verificar(d, nome, processos * n)
+
+
+def test_particionado_primeira_utilizacao_em_paralelo():
+    # a repartição do movimentos.json existente corre uma só vez e não perde escritas simultâneas
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        for i in range(5):
+            s.add_movimento(TipoMovimento.DESPESA, 1, "cafe", data_iso=f"2025-08-{1 + i:02d}T10:00:00")
+        processos, n = 6, 5
+        barreira = ctx.Barrier(processos)
+        ps = [ctx.Process(target=_escritor_novo, args=("particionado", d, n, barreira)) for _ in range(processos)]
+        for p in ps:
+            p.start()
+        for p in ps:
+            p.join(60)
+            assert p.exitcode == 0
+        _verificar(d, "particionado", 5 + processos * n)
+
+
+def test_escritores_em_paralelo_threads_journal():
+    with tempfile.TemporaryDirectory() as d:
+        threads, n = 8, 25
+        s = FinanceService(JournalStorage(d, limite_diario=40))
+        barreira = threading.Barrier(threads)
+        erros = []
+
+        def escrever():
+            barreira.wait()
+            try:
+                for _ in range(n):
+                    s.add_movimento(TipoMovimento.DESPESA, 1, "cafe", data_iso="2025-08-01T10:00:00")
+            except Exception as e:  # pragma: no cover - só em caso de falha
+                erros.append(e)
+
+        ts = [threading.Thread(target=escrever) for _ in range(threads)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        assert not erros
+        _verificar(d, "journal", threads * n)
+
+
+def test_journal_ignora_linha_incompleta():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(JournalStorage(d))
+        s.add_movimento(TipoMovimento.DESPESA, 500, "cafe", data_iso="2025-08-01T10:00:00")
+        with open(s.storage.diario_path, "a", encoding="utf-8") as f:
+            f.write('{"id": 2, "tipo": "desp')  # crash a meio de uma escrita
+        assert [m.id for m in s.listar()] == [1]
+        mov, _ = s.add_movimento(TipoMovimento.DESPESA, 700, "cafe", data_iso="2025-08-02T10:00:00")
+        assert mov.id == 2
+        assert [m.valor_cent for m in FinanceService(JournalStorage(d)).listar()] == [500, 700]
+
+
+def test_escrita_atomica_mantem_permissoes():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "dados.json")
+        escrever_json(path, [])
+        umask = os.umask(0)
+        os.umask(umask)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+        os.chmod(path, 0o640)
+        escrever_json(path, [1])
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
@@ -0,0 +1,52 @@
+import os
+import tempfile
+from gestor.storage import Storage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+import pytest
+from gestor.importador import ler_extrato, _valor
+
+CSV = """data;tipo;valor;categoria;descricao
+01/08/2025;;-12,50;cafe;pequeno-almoço
+2025-08-02T10:00:00;despesa;40;cafe;
+2025-08-03;receita;1.200,00;salario;agosto
+"""
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250804120000<TRNAMT>-30.00<NAME>Mercado<MEMO>compras
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250805<TRNAMT>15.5<NAME>Reembolso
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def test_importar_csv_e_ofx_com_alertas():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_orcamento("cafe", 5000, "mensal")
+        s.add_movimento("despesa", 500, "cafe", data_iso="2025-08-01T08:00:00")
+        for nome, conteudo in (("extrato.csv", CSV), ("extrato.ofx", OFX)):
+            with open(os.path.join(d, nome), "w", encoding="utf-8") as f:
+                f.write(conteudo)
+
+        movs, alertas = s.add_movimentos_bulk(ler_extrato(os.path.join(d, "extrato.csv")))
+        assert [m.id for m in movs] == [2, 3, 4]
+        assert [(m.tipo.value, m.valor_cent) for m in movs] == [("despesa", 1250), ("despesa", 4000), ("receita", 120000)]
+        assert movs[0].data_iso == "2025-08-01T00:00:00"
+        assert alertas == [a for a in Reports(s.storage).alertas() if a["periodo"] == "mensal"]
+        assert alertas[0]["gasto"] == 5750
+
+        movs, _ = s.add_movimentos_bulk(ler_extrato(os.path.join(d, "extrato.ofx"), categoria_padrao="banco"))
+        assert [(m.tipo.value, m.valor_cent, m.categoria, m.metodo_pagamento) for m in movs] == [
+            ("despesa", 3000, "banco", "DEBIT"), ("receita", 1550, "banco", "CREDIT")]
+        assert movs[0].descricao == "Mercado - compras"
+        assert s.indice_gastos().verificar(s.storage.carregar_movimentos())
+
+
+def test_valor_separador_decimal_e_o_ultimo():
+    assert _valor("1,234.56") == 123456
+    assert _valor("1.234,56") == 123456
+    assert _valor("1234,5") == 123450
+    assert _valor("-12.50 €") == -1250
+    with pytest.raises(ValueError):
+        _valor("1,234,56")
@@ -0,0 +1,26 @@
+import random
+import tempfile
+from gestor.storage import Storage
+from gestor.service import FinanceService
+from gestor.models import Movimento
+
+
+def test_indice_gastos_igual_ao_recalculo_completo():
+    rnd = random.Random(3)
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_orcamento("cafe", 3000, "semanal")
+        s.add_orcamento("cafe", 9000, "mensal")
+        s.add_orcamento("casa", 20000, "mensal")
+        for _ in range(150):
+            mov, alerta = s.add_movimento(rnd.choice(["despesa", "receita"]), rnd.randint(100, 4000),
+                                          rnd.choice(["cafe", "casa"]), data_iso=f"2025-08-{rnd.randint(1, 31):02d}T09:00:00")
+            assert alerta == s.verificar_overspend_completo(mov)
+        assert s.indice_gastos().verificar(s.storage.carregar_movimentos())
+
+        # movimentos alterados por fora do serviço: o índice é reconstruído
+        movs = s.storage.carregar_movimentos()
+        movs.append(Movimento(999, "despesa", 50000, "casa", data_iso="2025-08-02").to_dict())
+        s.storage.guardar_movimentos(movs)
+        novo = FinanceService(Storage(d))
+        assert novo.indice_gastos().gasto("casa", "mensal", "2025-08") >= 50000
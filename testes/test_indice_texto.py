@@ -0,0 +1,82 @@
+import os
+import random
+import tempfile
+from gestor.storage import Storage, JournalStorage, ParticionadoStorage
+from gestor.service import FinanceService
+from gestor.indices import IndiceTexto
+
+DESCRICOES = ["Café da manhã", "Uber Eats jantar", "Supermercado Pingo Doce", "renda casa", "UBER viagem", ""]
+METODOS = ["MBWay", "cartao", "dinheiro", ""]
+
+
+def test_pesquisa_por_texto_usa_indice_e_coincide_com_varrimento():
+    rnd = random.Random(3)
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(JournalStorage(d))
+        for _ in range(200):
+            s.add_movimento("despesa", 5, rnd.choice(["comida", "transporte", "casa"]), rnd.choice(DESCRICOES),
+                            rnd.choice(METODOS), data_iso="2025-08-01T10:00:00")
+        # os movimentos novos vão para o diário do índice; a reconstrução grava o ficheiro completo
+        assert os.path.exists(os.path.join(d, "indices", "texto.jsonl"))
+        indice = IndiceTexto(s.storage)
+        assert indice.ultimo_id == 200
+        s.reconstruir_indices()
+        assert not os.path.exists(os.path.join(d, "indices", "texto.jsonl"))
+        assert IndiceTexto(s.storage)._estado() == indice._estado()
+        todos = s.storage.carregar_movimentos()
+        for texto in ["uber", "ber ea", "CAFÉ", "mbw", "transp", "ca", "doce x", "!!"]:
+            t = texto.lower()
+            esperado = [m["id"] for m in todos
+                        if any(t in (m.get(c) or "").lower() for c in ("descricao", "categoria", "metodo"))]
+            assert [m.id for m in s.iter_filtrado(texto=texto)] == esperado
+        # o índice só devolve candidatos que contêm todas as palavras procuradas
+        assert indice.candidatos("uber") < {m["id"] for m in todos}
+
+
+def test_movimentos_ainda_nao_indexados_sao_encontrados():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_movimento("despesa", 500, "comida", "pizza")
+        # escrita direta no storage, sem passar pelo serviço (o índice fica para trás)
+        s.storage.adicionar_movimento({"id": 2, "tipo": "despesa", "valor_cent": 300, "categoria": "comida",
+                                       "descricao": "Pizza fria", "metodo": "", "data": "2025-08-02T10:00:00"})
+        assert [m.id for m in s.iter_filtrado(texto="pizza")] == [1, 2]
+
+
+def test_relevancia():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_movimento("despesa", 100, "uber", "viagem")         # só na categoria
+        s.add_movimento("despesa", 100, "transporte", "uber uber")  # duas vezes na descrição
+        s.add_movimento("despesa", 100, "transporte", "uberlândia")  # substring, sem palavra inteira
+        assert [m.id for _, m in s.pesquisar("uber")] == [2, 1, 3]
+
+
+def test_pesquisa_por_texto_sqlite():
+    from gestor.sqlite_storage import SqliteStorage
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(SqliteStorage(d))
+        for i, desc in enumerate(DESCRICOES * 3):
+            s.add_movimento("despesa", 100 * (1 + i), "comida", desc, data_iso="2025-08-01T10:00:00")
+        s.storage.adicionar_movimento({"id": 19, "tipo": "despesa", "valor_cent": 300, "categoria": "comida",
+                                       "descricao": "uber", "metodo": "", "data": "2025-08-02T10:00:00"})
+        assert [m.id for m in s.iter_filtrado(texto="uber")] == [2, 5, 8, 11, 14, 17, 19]
+        s.storage.con.close()
+
+
+def test_pesquisa_por_texto_particionado_so_le_os_meses_dos_candidatos():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(ParticionadoStorage(d))
+        for mes in range(1, 7):
+            for i in range(5):
+                s.add_movimento("despesa", 100, "comida", "pizza" if mes == 4 and i == 2 else "pão",
+                                data_iso=f"2025-{mes:02d}-{1 + i:02d}T10:00:00")
+        # um movimento fora de ordem (mês antigo, id novo) e outro ainda não indexado
+        s.add_movimento("despesa", 100, "comida", "pizza grande", data_iso="2025-01-20T10:00:00")
+        s.storage.adicionar_movimento({"id": 32, "tipo": "despesa", "valor_cent": 100, "categoria": "comida",
+                                       "descricao": "Pizza", "metodo": "", "data": "2025-06-30T10:00:00"})
+        lidos = []
+        ler = s.storage._ler
+        s.storage._ler = lambda mes: lidos.append(mes) or ler(mes)
+        assert [m.id for m in s.iter_filtrado(texto="pizza")] == [31, 18, 32]
+        assert lidos == ["2025-01", "2025-04", "2025-06"]
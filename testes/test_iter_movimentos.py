@@ -0,0 +1,27 @@
+import json
+import os
+import tempfile
+from gestor.storage import Storage, JournalStorage, iter_json_lista
+
+
+def test_iter_json_lista_com_blocos_pequenos():
+    dados = [{"id": i, "descricao": "a ]}[, \" b" * (i % 7), "valor_cent": 150} for i in range(300)]
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "x.json")
+        for indent in (None, 2):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(dados, f, indent=indent)
+            for bloco in (1, 13, 4096):
+                assert list(iter_json_lista(path, bloco)) == dados
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([], f)
+        assert list(iter_json_lista(path)) == []
+
+
+def test_iter_movimentos_igual_a_carregar():
+    with tempfile.TemporaryDirectory() as d:
+        for storage in (Storage(d), JournalStorage(d)):
+            for i in range(1, 6):
+                storage.adicionar_movimento({"id": storage.proximo_id(), "tipo": "despesa", "data": f"2025-08-0{i}",
+                                             "valor_cent": i * 100, "categoria": "x", "descricao": "", "metodo": ""})
+            assert list(storage.iter_movimentos()) == storage.carregar_movimentos()
@@ -0,0 +1,87 @@
+import random
+import tempfile
+from gestor.models import MovimentoTable, data_canonica, filtrar_periodo
+from gestor.storage import Storage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+from gestor.servidor import MemoriaStorage
+
+
+def _movs(n, seed):
+    rnd = random.Random(seed)
+    movs = []
+    for i in range(n):
+        # quase sempre por ordem; alguns atrasados e formatos diferentes
+        dia = 1 + i * 27 // n if rnd.random() > 0.1 else rnd.randint(1, 28)
+        fmt = rnd.choice(["2025-08-{:02d}T10:00:00", "2025-08-{:02d}", "2025-08-{:02d} 23:59", "2025-08-{:02d}T00:00:00.5"])
+        movs.append({"id": i + 1, "tipo": "despesa", "valor_cent": 100, "categoria": rnd.choice("ab"),
+                     "descricao": "", "metodo": "", "data": fmt.format(dia)})
+    return movs
+
+
+def test_posicoes_por_bisect_iguais_ao_varrimento():
+    rnd = random.Random(5)
+    movs = _movs(500, 1)
+    tab = MovimentoTable.from_dicts(movs[:300])
+    tab.posicoes("2025-08-02")           # constrói a ordem e depois recebe mais movimentos
+    tab.extend(movs[300:])
+    assert tab.ordem.remendos  # houve movimentos fora de ordem
+    for _ in range(200):
+        a, b = sorted(f"2025-08-{rnd.randint(1, 28):02d}" + rnd.choice(["", "T10:00:00", "T00:00:00.5", " 23:59"])
+                      for _ in range(2))
+        inicio, fim = rnd.choice([(a, b), (a, None), (None, b)])
+        esperado = [i for i, m in enumerate(movs)
+                    if (not inicio or data_canonica(m["data"]) >= data_canonica(inicio))
+                    and (not fim or data_canonica(m["data"]) <= data_canonica(fim))]
+        assert tab.posicoes(inicio, fim) == esperado
+        assert [m["id"] for m in filtrar_periodo(movs, inicio, fim)] == [i + 1 for i in esperado]
+
+
+def test_listagem_e_relatorios_usam_a_mesma_comparacao():
+    with tempfile.TemporaryDirectory() as d:
+        st = Storage(d)
+        st.guardar_movimentos([
+            {"id": 1, "tipo": "despesa", "valor_cent": 500, "categoria": "a", "descricao": "", "metodo": "",
+             "data": "2025-08-01 10:00:00"},  # separador espaço: como texto seria < '2025-08-01T09:00'
+            {"id": 2, "tipo": "despesa", "valor_cent": 700, "categoria": "a", "descricao": "", "metodo": "",
+             "data": "2025-08-01T08:00:00"},
+        ])
+        kw = dict(inicio="2025-08-01T09:00", fim="2025-08-01T23:00")
+        for storage in (st, MemoriaStorage(st)):
+            assert [m.id for m in FinanceService(storage).iter_filtrado(**kw)] == [1]
+            assert Reports(storage).totais_por_cat(**kw)[0]["despesa"] == 500
+
+
+def test_total_periodo_por_somas_acumuladas_igual_ao_varrimento():
+    rnd = random.Random(8)
+    movs = _movs(600, 2)
+    for m in movs:
+        m["valor_cent"] = rnd.randint(1, 10_000)
+        m["tipo"] = rnd.choice(["despesa", "despesa", "receita"])
+    tab = MovimentoTable.from_dicts(movs[:200])
+    vistos = 200
+    for lote in range(200, 601, 100):
+        tab.extend(movs[vistos:lote])  # acrescentados entre consultas (alguns fora de ordem)
+        vistos = lote
+        for _ in range(50):
+            a, b = sorted(f"2025-08-{rnd.randint(1, 28):02d}" + rnd.choice(["", "T10:00:00", " 23:59"]) for _ in range(2))
+            inicio, fim = rnd.choice([(a, b), (a, None), (None, b), (None, None)])
+            cat, tipo = rnd.choice([None, "a", "b", "z"]), rnd.choice(["despesa", "receita"])
+            esperado = sum(m["valor_cent"] for m in filtrar_periodo(movs[:vistos], inicio, fim)
+                           if m["tipo"] == tipo and (cat is None or m["categoria"] == cat))
+            assert tab.total_periodo(inicio, fim, cat=cat, tipo=tipo) == esperado
+
+
+def test_total_periodo_no_servico():
+    with tempfile.TemporaryDirectory() as d:
+        st = Storage(d)
+        s = FinanceService(st)
+        s.add_movimento("despesa", 1000, "a", data_iso="2025-08-10T10:00:00")
+        s.add_movimento("despesa", 250, "b", data_iso="2025-08-20T10:00:00")
+        assert s.total_periodo("2025-08-01", "2025-08-31") == 1250
+        s.add_movimento("despesa", 300, "a", data_iso="2025-08-05T10:00:00")  # fora de ordem, nova versão dos dados
+        assert s.total_periodo("2025-08-01", "2025-08-15", cat="a") == 1300
+        mem = FinanceService(MemoriaStorage(st))
+        assert mem.total_periodo(fim="2025-08-15") == 1300
+        mem.add_movimento("despesa", 50, "b", data_iso="2025-08-01T00:00:00")
+        assert mem.total_periodo(cat="b") == 300 and mem.total_periodo(tipo="receita") == 0
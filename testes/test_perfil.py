@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+from gestor import perfil
+from gestor.storage import JournalStorage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+from gestor.models import TipoMovimento
+
+
+def test_perfil_mede_operacoes_e_contadores():
+    original = Reports.todos
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(JournalStorage(d))
+        with perfil.perfilar() as p:
+            for i in range(5):
+                s.add_movimento(TipoMovimento.DESPESA, 2, "cafe", data_iso=f"2025-08-0{i + 1}T10:00:00")
+            Reports(s.storage, usar_rollups=False).todos()
+        assert p.operacoes["FinanceService.add_movimento"][0] == 5
+        assert p.operacoes["Reports.todos"][0] == 1
+        assert p.contadores["movimentos_escritos"] == 5
+        assert p.contadores["movimentos_lidos"] >= 5
+        assert p.contadores["bytes_escritos"] > 0 and p.contadores["bytes_lidos"] > 0
+        assert "Reports.todos" in p.resumo()
+        trace = json.loads(json.dumps(p.trace()))
+        assert {e["name"] for e in trace["traceEvents"]} >= {"FinanceService.add_movimento", "Reports.todos"}
+    # desligada: métodos originais e contadores sem efeito
+    assert Reports.todos is original and perfil.ATIVO is None
+    perfil.contar("bytes_lidos", 10)
+
+
+def test_perfil_conta_geradores_uma_vez():
+    with tempfile.TemporaryDirectory() as d:
+        st = JournalStorage(d)
+        st.adicionar_movimentos([{"id": i, "tipo": "despesa", "valor_cent": 100, "categoria": "a", "data": "2025-08-01T10:00:00"}
+                                 for i in range(1, 8)])
+        with perfil.perfilar() as p:
+            assert len(list(st.iter_movimentos())) == 7
+        # JournalStorage.iter_movimentos chama Storage.iter_movimentos: só a mais exterior conta
+        assert p.contadores["movimentos_lidos"] == 7
+        assert p.operacoes["JournalStorage.iter_movimentos"][0] == 1
+        assert os.path.exists(st.diario_path)
@@ -0,0 +1,70 @@
+import random
+import tempfile
+from gestor.storage import Storage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+
+
+def test_todos_igual_aos_relatorios_individuais():
+    rnd = random.Random(7)
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        for _ in range(300):
+            s.add_movimento(rnd.choice(["despesa", "receita"]), rnd.randint(100, 12000), rnd.choice("abcde"),
+                            data_iso=f"2025-{rnd.randint(6, 9):02d}-{rnd.randint(1, 28):02d}T08:30:00")
+        s.add_orcamento("a", 15000, "semanal")
+        s.add_orcamento("b", 40000, "mensal")
+        r = Reports(s.storage)
+        kw = dict(inicio="2025-07-01", fim="2025-08-31T23:59:59")
+        todos = r.todos(n=3, tipo="receita", **kw)
+        assert todos == {
+            "totais-por-cat": r.totais_por_cat(**kw),
+            "cashflow-semanal": r.cashflow_semanal(**kw),
+            "top-categorias": r.top_categorias(n=3, tipo="receita", **kw),
+            "alertas": r.alertas(**kw),
+        }
+        paths = r.exportar_todos(todos, formato="csv")
+        assert sorted(paths) == sorted(todos)
+
+
+def test_relatorios_em_paralelo_iguais_aos_em_serie():
+    from gestor.storage import ParticionadoStorage
+    rnd = random.Random(11)
+    movs = [{"id": i + 1, "tipo": rnd.choice(["despesa", "despesa", "receita"]), "valor_cent": rnd.randint(1, 9999),
+             "categoria": rnd.choice("abcdef"), "descricao": "", "metodo": "",
+             "data": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T{rnd.randint(0, 23):02d}:15:00"}
+            for i in range(2000)]
+    for cls in (Storage, ParticionadoStorage):
+        with tempfile.TemporaryDirectory() as d:
+            st = cls(d)
+            st.guardar_movimentos(movs)
+            st.guardar_orcamentos([{"id": 1, "categoria": "a", "limite_cent": 10000, "periodo": "semanal"}])
+            for kw in ({}, {"inicio": "2025-03-10", "fim": "2025-10-20T12:00:00"}):
+                serie = Reports(st, usar_rollups=False).todos(**kw)
+                # o resultado não pode depender da divisão
+                for jobs in (2, 3):
+                    assert Reports(st, usar_rollups=False, jobs=jobs).todos(**kw) == serie
+
+
+def test_exportar_em_streaming_com_esquema_fixo():
+    import csv, gzip, json
+    with tempfile.TemporaryDirectory() as d:
+        r = Reports(Storage(d))
+        linhas = ({"saldo": -105 * i, "categoria": f"c{i}", "receita": 0, "despesa": 105 * i} for i in range(3))
+        path = r.exportar(linhas, "totais-por-cat", formato="csv", comprimir=True)
+        assert path.endswith(".csv.gz")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            leitor = csv.reader(f)
+            assert next(leitor) == ["categoria", "despesa", "receita", "saldo"]
+            assert list(leitor)[1] == ["c1", "1.05", "0.00", "-1.05"]  # cêntimos exportados em euros
+        movs = [{"id": i, "data": "2025-08-01T10:00:00", "tipo": "despesa", "valor_cent": 150, "categoria": "a",
+                 "descricao": "x", "metodo": ""} for i in range(1, 4)]
+        esperado = [dict(m, valor=1.5) for m in movs]
+        for m in esperado:
+            del m["valor_cent"]
+        with open(r.exportar(iter(movs), "movimentos", formato="json"), encoding="utf-8") as f:
+            assert json.load(f) == esperado
+        with open(r.exportar(iter(movs), "movimentos", formato="ndjson"), encoding="utf-8") as f:
+            assert [json.loads(l) for l in f] == esperado
+        with open(r.exportar(iter([]), "alertas", formato="json"), encoding="utf-8") as f:
+            assert json.load(f) == []
@@ -0,0 +1,48 @@
+import random
+import tempfile
+import pytest
+from gestor.storage import Storage
+from gestor.binario import BinarioStorage
+from gestor.servidor import MemoriaStorage
+from gestor.reports import Reports, _somas_colunas
+
+np = pytest.importorskip("numpy")
+
+
+def _movs(n, seed=21):
+    rnd = random.Random(seed)
+    return [{"id": i + 1, "tipo": rnd.choice(["despesa", "despesa", "receita"]), "valor_cent": rnd.randint(1, 99999),
+             "categoria": rnd.choice("abcdefg"), "descricao": "", "metodo": "",
+             "data": f"202{rnd.randint(4, 5)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T{rnd.randint(0, 23):02d}:00:00"}
+            for i in range(n)]
+
+
+def _com_orcamentos(st):
+    st.guardar_orcamentos([{"id": 1, "categoria": "a", "limite_cent": 90000, "periodo": "mensal"},
+                           {"id": 2, "categoria": "b", "limite_cent": 15000, "periodo": "semanal"}])
+    return st
+
+
+def test_somas_iguais_com_e_sem_numpy():
+    rnd = random.Random(5)
+    n = 3000
+    colunas = ([rnd.randrange(4) for _ in range(n)], [rnd.randrange(2) for _ in range(n)],
+               [rnd.choice([1, 2, 3, 10 ** 15, -10 ** 15, rnd.randint(-500, 500)]) for _ in range(n)],
+               [rnd.randrange(3) for _ in range(n)], [rnd.randrange(3, 9) for _ in range(n)])
+    nomes, chaves = list("wxyz"), [f"k{i}" for i in range(9)]
+    assert _somas_colunas(*colunas, nomes, chaves, numpy=True) == _somas_colunas(*colunas, nomes, chaves, numpy=False)
+
+
+@pytest.mark.parametrize("cls", [Storage, BinarioStorage])
+def test_relatorios_iguais_com_e_sem_numpy(cls):
+    with tempfile.TemporaryDirectory() as d:
+        st = _com_orcamentos(cls(d))
+        st.guardar_movimentos(_movs(5000))
+        for kw in ({}, {"inicio": "2024-03-10", "fim": "2025-02-01T12:00:00"}):
+            python = Reports(st, usar_rollups=False, numpy=False).todos(**kw)
+            assert Reports(st, usar_rollups=False, numpy=True).todos(**kw) == python
+            assert Reports(st, usar_rollups=False, numpy=True, jobs=2).todos(**kw) == python
+        # modo servidor: posições do intervalo por bisect, recolhidas com NumPy
+        mem = MemoriaStorage(st)
+        kw = {"inicio": "2024-06-01", "fim": "2024-06-30T23:59:59"}
+        assert Reports(mem, numpy=True).todos(**kw) == Reports(mem, numpy=False).todos(**kw)
@@ -0,0 +1,67 @@
+import random
+import tempfile
+from gestor.storage import Storage, JournalStorage, ParticionadoStorage
+from gestor.binario import BinarioStorage
+from gestor.sqlite_storage import SqliteStorage
+from gestor.servidor import MemoriaStorage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+
+
+def test_rollups_dao_o_mesmo_que_os_movimentos():
+    rnd = random.Random(11)
+    for cls in (Storage, ParticionadoStorage):
+        with tempfile.TemporaryDirectory() as d:
+            s = FinanceService(cls(d))
+            s.add_movimentos_bulk([
+                dict(tipo=rnd.choice(["despesa", "receita"]), valor_cent=rnd.randint(1, 400) * 25, categoria=rnd.choice("abcde"),
+                     data_iso=f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T{rnd.randint(0, 23):02d}:00:00")
+                for _ in range(1500)])
+            s.add_movimento("despesa", 1000, "a", data_iso="2025-06-30T23:59:59")
+            s.add_orcamento("a", 20000, "semanal")
+            s.add_orcamento("b", 60000, "mensal")
+            com, sem = Reports(s.storage), Reports(s.storage, usar_rollups=False)
+            assert com._rollups() is not None
+            intervalos = [(None, None), ("2025-03-01", "2025-05-31T23:59:59"), ("2025-03-05T10:00", "2025-03-20"),
+                          (None, "2025-06-30T23:59:59"), ("2025-11-02", None)]
+            for inicio, fim in intervalos:
+                assert com.todos(inicio, fim) == sem.todos(inicio, fim)
+
+
+def test_rollups_atualizados_sem_contar_os_movimentos():
+    with tempfile.TemporaryDirectory() as d:
+        s = FinanceService(Storage(d))
+        s.add_movimento("despesa", 1000, "a", data_iso="2025-03-10T10:00:00")
+        s.add_orcamento("a", 500)  # os orçamentos não mudam a versão dos movimentos
+        r = Reports(s.storage)
+        assert r._rollups() is not None
+        s.storage.proximo_id = lambda: (_ for _ in ()).throw(AssertionError("leu os movimentos todos"))
+        assert r._rollups() is not None
+        assert r.totais_por_cat("2025-03-01", "2025-03-31T23:59:59")[0]["despesa"] == 1000
+
+
+def test_regravar_movimentos_invalida_rollups_e_indice_de_gastos():
+    # editar um movimento existente (mesmos ids) não pode deixar totais antigos nos índices
+    storages = (Storage, JournalStorage, ParticionadoStorage, BinarioStorage, SqliteStorage,
+                lambda d: MemoriaStorage(Storage(d)))
+    for cls in storages:
+        with tempfile.TemporaryDirectory() as d:
+            s = FinanceService(cls(d))
+            s.add_orcamento("a", 5000, "mensal")
+            s.add_movimento("despesa", 100, "a", data_iso="2025-03-10T10:00:00")
+            mov, alerta = s.add_movimento("despesa", 200, "a", data_iso="2025-03-11T10:00:00")
+            assert alerta is None
+            r = Reports(s.storage)
+            assert r.totais_por_cat("2025-03-01", "2025-03-31T23:59:59")[0]["despesa"] == 300
+
+            movimentos = s.storage.carregar_movimentos()
+            movimentos[1] = dict(movimentos[1], valor_cent=5100)
+            s.storage.guardar_movimentos(movimentos)
+
+            com, sem = Reports(s.storage), Reports(s.storage, usar_rollups=False)
+            assert com.todos("2025-03-01", "2025-03-31T23:59:59") == sem.todos("2025-03-01", "2025-03-31T23:59:59")
+            assert com.totais_por_cat("2025-03-01", "2025-03-31T23:59:59")[0]["despesa"] == 5200
+            mov.valor_cent = 5100
+            esperado = s.verificar_overspend_completo(mov)
+            assert esperado is not None and esperado["gasto"] == 5200
+            assert s.verificar_overspend(mov) == esperado
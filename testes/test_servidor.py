@@ -0,0 +1,102 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+import asyncio
+from gestor import cli
+from gestor.storage import JournalStorage
+from gestor.service import FinanceService
+from gestor.indices import INDICES
+from gestor.servidor import MemoriaStorage, Servidor
+from gestor.cliente import encaminhar
+
+
+def test_servidor_executa_comandos_e_agrupa_escritas():
+    with tempfile.TemporaryDirectory() as d:
+        servico = FinanceService(MemoriaStorage(JournalStorage(d)))
+        cli._SERVICO_ATIVO = servico
+        servidor = Servidor(servico, lambda argv: cli.main(argv, encaminhar_servidor=False), atraso_escrita=0.05)
+        t = threading.Thread(target=asyncio.run, args=(servidor.correr(),), daemon=True)
+        t.start()
+        try:
+            for _ in range(100):
+                if os.path.exists(servidor.info_path):
+                    break
+                time.sleep(0.02)
+            for i in range(5):
+                saida, erro, codigo = encaminhar(d, ["add-mov", "--tipo", "despesa", "--valor", f"{i + 1},50", "--cat", "cafe"])
+                assert codigo == 0 and f"Criado movimento #{i + 1}: despesa {i + 1}.50 " in saida
+            saida, _, _ = encaminhar(d, ["list-mov", "--cat", "cafe"])
+            assert len(saida.splitlines()) == 5
+            _, erro, codigo = encaminhar(d, ["add-mov", "--tipo", "x"])
+            assert codigo == 2 and erro
+            time.sleep(0.3)
+            # as escritas chegaram ao disco
+            assert [m["valor_cent"] for m in JournalStorage(d).carregar_movimentos()] == [150, 250, 350, 450, 550]
+        finally:
+            servidor.parar()
+            t.join(5)
+            cli._SERVICO_ATIVO = None
+        assert not os.path.exists(servidor.info_path)
+        assert encaminhar(d, ["list-mov"]) is None
+
+
+def test_escritas_diretas_com_o_servidor_a_correr_nao_repetem_ids():
+    with tempfile.TemporaryDirectory() as d:
+        servidor = FinanceService(MemoriaStorage(JournalStorage(d)))
+        direto = FinanceService(JournalStorage(d))  # ex.: GESTOR_SEM_SERVIDOR=1
+        mov, _ = servidor.add_movimento("despesa", 100, "cafe", data_iso="2025-08-01T10:00:00")
+        assert mov.id == 1  # já gravado no storage real (só o fsync e os índices esperam pelo flush)
+        mov, _ = direto.add_movimento("despesa", 200, "casa", data_iso="2025-08-02T10:00:00")
+        assert mov.id == 2
+        servidor.storage.flush()
+        direto.add_movimento("despesa", 300, "casa", data_iso="2025-08-03T10:00:00")     # #3
+        mov, _ = servidor.add_movimento("despesa", 400, "cafe", data_iso="2025-08-04T10:00:00")
+        assert mov.id == 4  # o servidor viu o #3 ao atribuir o id
+        servidor.storage.flush()
+        gravados = JournalStorage(d).carregar_movimentos()
+        assert [(m["id"], m["valor_cent"]) for m in gravados] == [(1, 100), (2, 200), (3, 300), (4, 400)]
+        assert [(m.id, m.valor_cent) for m in servidor.listar()] == [(1, 100), (2, 200), (3, 300), (4, 400)]
+        for cls in INDICES:  # os índices gravados pelo servidor incluem os movimentos de fora
+            indice = cls(JournalStorage(d))
+            assert indice.ultimo_id == 4 and indice.verificar(gravados), cls.NOME
+
+
+def test_servidor_rele_movimentos_regravados_por_outro_processo():
+    with tempfile.TemporaryDirectory() as d:
+        memoria = MemoriaStorage(JournalStorage(d))
+        servidor = FinanceService(memoria)
+        servidor.add_orcamento("cafe", 1000)
+        servidor.add_movimento("despesa", 100, "cafe", data_iso="2025-08-01T10:00:00")
+        servidor.add_movimento("despesa", 200, "cafe", data_iso="2025-08-02T10:00:00")
+        # outro processo edita o movimento #2 (mesmos ids) antes de os índices do servidor irem para o disco
+        direto = JournalStorage(d)
+        movimentos = direto.carregar_movimentos()
+        movimentos[1]["valor_cent"] = 5000
+        direto.guardar_movimentos(movimentos)
+        memoria.atualizar()
+        assert [m.valor_cent for m in servidor.listar()] == [100, 5000]
+        assert servidor.indice_gastos().gasto("cafe", "mensal", "2025-08") == 5100
+        memoria.flush()
+        for cls in INDICES:
+            indice = cls(JournalStorage(d))
+            assert indice.ultimo_id in (0, 2)
+            if indice.ultimo_id:
+                assert indice.verificar(movimentos), cls.NOME
+
+
+def test_ficheiro_do_servidor_so_legivel_pelo_dono():
+    with tempfile.TemporaryDirectory() as d:
+        servidor = Servidor(FinanceService(MemoriaStorage(JournalStorage(d))), lambda argv: None)
+        t = threading.Thread(target=asyncio.run, args=(servidor.correr(),), daemon=True)
+        t.start()
+        try:
+            for _ in range(100):
+                if os.path.exists(servidor.info_path):
+                    break
+                time.sleep(0.02)
+            assert stat.S_IMODE(os.stat(servidor.info_path).st_mode) == 0o600
+        finally:
+            servidor.parar()
+            t.join(5)
@@ -0,0 +1,57 @@
+import random
+import tempfile
+from gestor.storage import Storage
+from gestor.sqlite_storage import SqliteStorage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+
+
+def _popular(d):
+    rnd = random.Random(1)
+    s = FinanceService(Storage(d))
+    for i in range(200):
+        s.add_movimento(rnd.choice(["despesa", "receita"]), rnd.randint(1, 80), rnd.choice(["cafe", "casa", "lazer"]),
+                        descricao=f"mov {i}", data_iso=f"2025-0{rnd.randint(7, 9)}-{rnd.randint(1, 28):02d}T12:00:00")
+    s.add_orcamento("cafe", 100, "semanal")
+    s.add_orcamento("casa", 300, "mensal")
+
+
+def test_sqlite_migra_json_e_da_os_mesmos_resultados():
+    with tempfile.TemporaryDirectory() as d:
+        _popular(d)
+        js, sq = Storage(d), SqliteStorage(d)
+        assert sq.carregar_movimentos() == js.carregar_movimentos()
+        assert sq.carregar_orcamentos() == js.carregar_orcamentos()
+
+        filtro = dict(inicio="2025-08-01", fim="2025-08-31T23:59:59", cat="cafe", tipo="despesa")
+        a = [m.to_dict() for m in FinanceService(js).listar_filtrado(**filtro)]
+        b = [m.to_dict() for m in FinanceService(sq).listar_filtrado(**filtro)]
+        assert a == b and a
+
+        rj, rs = Reports(js), Reports(sq)
+        for nome in ("totais_por_cat", "cashflow_semanal", "top_categorias", "alertas"):
+            assert getattr(rj, nome)(inicio="2025-07-10", fim="2025-09-15") == getattr(rs, nome)(inicio="2025-07-10", fim="2025-09-15")
+        assert sq.proximo_id() == js.proximo_id()
+
+
+def test_sqlite_compara_datas_em_formatos_diferentes_como_os_outros_storages():
+    rnd = random.Random(4)
+    formatos = ["2025-08-{:02d}T10:00:00", "2025-08-{:02d}", "2025-08-{:02d} 23:59", "2025-08-{:02d} 08:00:00",
+                "2025-08-{:02d}T00:00:00.5"]
+    movs = [{"id": i + 1, "tipo": rnd.choice(["despesa", "receita"]), "valor_cent": rnd.randint(1, 999),
+             "categoria": rnd.choice("ab"), "descricao": "", "metodo": "",
+             "data": rnd.choice(formatos).format(rnd.randint(1, 10))} for i in range(300)]
+    with tempfile.TemporaryDirectory() as d:
+        Storage(d).guardar_movimentos(movs)
+        js, sq = Storage(d), SqliteStorage(d)
+        for _ in range(40):
+            a, b = sorted(f"2025-08-{rnd.randint(1, 10):02d}" + rnd.choice(["", "T09:00", "T00:00:00", " 23:59", "T12:00:00.25"])
+                          for _ in range(2))
+            inicio, fim = rnd.choice([(a, b), (a, None), (None, b)])
+            kw = dict(inicio=inicio, fim=fim)
+            assert ([m.id for m in FinanceService(sq).iter_filtrado(**kw)]
+                    == [m.id for m in FinanceService(js).iter_filtrado(**kw)])
+            rj, rs = Reports(js, usar_rollups=False), Reports(sq)
+            assert rs.totais_por_cat(**kw) == rj.totais_por_cat(**kw)
+            assert rs.cashflow_semanal(**kw) == rj.cashflow_semanal(**kw)
+            assert rs.total_periodo(cat="a", **kw) == rj.total_periodo(cat="a", **kw)
@@ -0,0 +1,58 @@
+import os
+import random
+import tempfile
+from gestor.storage import Storage
+from gestor.binario import BinarioStorage, SnapshotBinario, escrever_snapshot
+from gestor.reports import Reports
+
+
+def _movs(n, seed=3):
+    rnd = random.Random(seed)
+    return [{"id": i + 1, "tipo": rnd.choice(["despesa", "receita"]), "valor_cent": rnd.randint(1, 9999),
+             "categoria": rnd.choice(["café", "renda", "uber"]), "descricao": rnd.choice(["", "pão", "Táxi 🚕"]),
+             "metodo": rnd.choice(["", "MBWay"]),
+             "data": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T{rnd.randint(0, 23):02d}:15:00"}
+            for i in range(n)]
+
+
+def test_snapshot_ida_e_volta():
+    movs = _movs(500)
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "m.bin")
+        escrever_snapshot(path, movs)
+        snap = SnapshotBinario(path)
+        assert list(snap.dicts()) == movs
+        tab = snap.tabela()
+        assert isinstance(tab.valores, memoryview)  # lido diretamente do ficheiro mapeado
+        assert [m.id for m in tab] == [m["id"] for m in movs]
+        assert tab.datas[-1] == movs[-1]["data"]
+        escrever_snapshot(path, [])
+        assert list(SnapshotBinario(path).dicts()) == []
+
+
+def test_storage_binario_migra_e_acrescenta():
+    movs = _movs(300)
+    with tempfile.TemporaryDirectory() as d:
+        Storage(d).guardar_movimentos(movs)
+        st = BinarioStorage(d, limite_diario=50)
+        assert os.path.exists(st.bin_path)
+        assert st.carregar_movimentos() == movs
+        novos = [dict(m, id=m["id"] + 300) for m in _movs(70, seed=5)]
+        st.adicionar_movimentos(novos[:20])
+        tab = st.carregar_tabela()  # snapshot + diário
+        assert len(tab) == 320 and tab.ids[-1] == 320 and tab.descricoes[-1] == novos[19]["descricao"]
+        st.adicionar_movimentos(novos[20:])  # passa o limite: compacta para o .bin (e o .json)
+        assert not os.path.exists(st.diario_path)
+        assert BinarioStorage(d).carregar_movimentos() == movs + novos
+        assert Storage(d).carregar_movimentos() == movs + novos
+
+
+def test_relatorios_iguais_ao_json():
+    movs = _movs(1000)
+    with tempfile.TemporaryDirectory() as d1, tempfile.TemporaryDirectory() as d2:
+        Storage(d1).guardar_movimentos(movs)
+        BinarioStorage(d2).guardar_movimentos(movs)
+        for kw in ({}, {"inicio": "2025-03-01", "fim": "2025-06-30T23:59:59"}):
+            a, b = Reports(Storage(d1), usar_rollups=False), Reports(BinarioStorage(d2), usar_rollups=False)
+            assert a.todos(**kw) == b.todos(**kw)
+        assert Reports(BinarioStorage(d2), usar_rollups=False, jobs=2).todos() == a.todos()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+from gestor.storage import Storage, ParticionadoStorage
+from gestor.service import FinanceService
+from gestor.reports import Reports
+
+
+def test_particionado_so_le_os_meses_do_intervalo():
+    with tempfile.TemporaryDirectory() as d:
+        base = FinanceService(Storage(d))
+        for mes in (6, 7, 8):
+            base.add_movimento("despesa", 100 * mes, "cafe", data_iso=f"2025-0{mes}-10T10:00:00")
+        st = ParticionadoStorage(d)  # reparte o movimentos.json existente
+        assert st.meses() == ["2025-06", "2025-07", "2025-08"]
+        assert st.carregar_movimentos() == Storage(d).carregar_movimentos()
+
+        s = FinanceService(st)
+        s.add_movimento("receita", 10000, "salario", data_iso="2025-07-31T18:00:00")
+        assert st.proximo_id() == 5
+        assert [m["id"] for m in st.iter_movimentos(inicio="2025-07-01", fim="2025-07-31T23:59:59")] == [2, 4]
+        assert st.meses("2025-07-01", "2025-07-31") == ["2025-07"]
+
+        os.remove(st._path("2025-06"))  # meses fora do intervalo nem são abertos
+        r = Reports(st)
+        assert r.totais_por_cat(inicio="2025-07-01", fim="2025-08-31") == [
+            {"categoria": "salario", "despesa": 0, "receita": 10000, "saldo": 10000},
+            {"categoria": "cafe", "despesa": 1500, "receita": 0, "saldo": -1500},
+        ]
+
+
+def test_reparticao_interrompida_e_refeita():
+    with tempfile.TemporaryDirectory() as d:
+        base = FinanceService(Storage(d))
+        for mes in (6, 7):
+            base.add_movimento("despesa", 100 * mes, "cafe", data_iso=f"2025-0{mes}-10T10:00:00")
+        # crash a meio da 1.ª utilização: a pasta existe, mas o meta.json (gravado no fim) não
+        os.makedirs(os.path.join(d, "movimentos"))
+        st = ParticionadoStorage(d)
+        assert st.meses() == ["2025-06", "2025-07"]
+        assert st.proximo_id() == 3